@@ -0,0 +1,123 @@
+''' Several matches at the same time in one process, one per court.
+
+Every match is a Wedstrijd with its own event store, history.txt export and checkpoint, so that each court
+can be resumed, reported and ended on its own. What the courts share is the process and the clock: one
+Wedstrijdklok and one Planner, a single Tk timer that wakes up right after every whole second and refreshes
+all dashboards at once. The work per wakeup is the diff of each TickEngine, so a court whose tiles do not
+change costs almost nothing, and N courts cost one wakeup instead of N. '''
+import math
+import os
+
+import metrics
+from checkpoint import CHECKPOINT_FILE
+from event_store import EventStore
+from history import HISTORY_FILE
+from klok import Wedstrijdklok, VirtueleKlok, INTERVAL, PAUZE_INTERVAL
+from player_state import PlayerState
+from samenspel import PAREN_FILE, OPSTELLINGEN_FILE
+from wedstrijd import Wedstrijd, OVERZICHT_FILE
+
+
+def paden(naam:str=None) -> dict:
+    ''' The files of the match on court naam. Without a name, the files of a single match as before. '''
+    if naam is None:
+        return {"checkpoint": CHECKPOINT_FILE, "text_log": HISTORY_FILE, "overzicht": OVERZICHT_FILE,
+                "paren": PAREN_FILE, "opstellingen": OPSTELLINGEN_FILE}
+    return {pad: f"{stam}_{naam}{ext}" for pad, (stam, ext) in (("checkpoint", os.path.splitext(CHECKPOINT_FILE)),
+                                                               ("text_log", os.path.splitext(HISTORY_FILE)),
+                                                               ("overzicht", os.path.splitext(OVERZICHT_FILE)),
+                                                               ("paren", os.path.splitext(PAREN_FILE)),
+                                                               ("opstellingen", os.path.splitext(OPSTELLINGEN_FILE)))}
+
+
+class Wedstrijdbeheer:
+    ''' Owns the matches that are played at the same time, by court name, and their shared clock. '''
+
+    def __init__(self, klok:Wedstrijdklok=None):
+        self.klok = klok if klok is not None else Wedstrijdklok()
+        self.wedstrijden = {} # court name (None for a single court) -> Wedstrijd
+
+    def open(self, naam:str, spelers_path:str, hervat=None) -> Wedstrijd:
+        ''' Start the match on court naam with the roster in spelers_path, or resume it when it was interrupted
+        and hervat(naam) agrees. '''
+        if naam in self.wedstrijden:
+            raise ValueError(f"Court {naam} already has a match.")
+        bestanden = paden(naam)
+        wedstrijd = None
+        if os.path.exists(bestanden["checkpoint"]) and (hervat is None or hervat(naam)):
+            wedstrijd = Wedstrijd.resume(checkpoint_path=bestanden["checkpoint"], klok=self.klok)
+        if wedstrijd is None:
+            wedstrijd = Wedstrijd(PlayerState.from_csv(spelers_path), store=EventStore(text_log=bestanden["text_log"]),
+                                  klok=self.klok, checkpoint_path=bestanden["checkpoint"])
+        self.wedstrijden[naam] = wedstrijd
+        return wedstrijd
+
+    def report(self, dpi:float=100):
+        # Save the overview, and the minutes per pair and per lineup, of every match that was started
+        for naam, wedstrijd in self.wedstrijden.items():
+            if wedstrijd.history:
+                bestanden = paden(naam)
+                wedstrijd.report(save=True, dpi=dpi, path=bestanden["overzicht"])
+                wedstrijd.samenspel.exporteer(bestanden["paren"], bestanden["opstellingen"],
+                                              tot=None if wedstrijd.paused else wedstrijd.klok.nu())
+
+    def close(self):
+        # Write the events that are still queued, of every match
+        for wedstrijd in self.wedstrijden.values():
+            wedstrijd.store.close()
+
+
+class Planner:
+    ''' One timer for all dashboards of a Tk root.
+
+    Fires right after every whole second of the clock while any match is running, and only every
+    PAUZE_INTERVAL when all are paused. A paused court is refreshed at the PAUZE_INTERVAL boundaries only,
+    as it would be on its own. '''
+
+    def __init__(self, root, klok:Wedstrijdklok):
+        self.root = root
+        self.klok = klok
+        self.dashboards = []
+        self.timer = None # the pending refresh
+        self.volgende_tick = None # the moment of the pending refresh, in clock time
+
+    def abonneer(self, dashboard):
+        self.dashboards.append(dashboard)
+        self.herplan()
+
+    def opzeggen(self, dashboard):
+        self.dashboards.remove(dashboard)
+        self.herplan()
+
+    def herplan(self):
+        # Schedule the next refresh at the next boundary, e.g. after a court was paused or unpaused
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        if not self.dashboards:
+            return
+        paused = all(dashboard.wedstrijd.paused for dashboard in self.dashboards)
+        self.volgende_tick = self.klok.volgende_tick(paused)
+        self.timer = self.root.after(self.klok.wachttijd_ms(self.volgende_tick), self.tick)
+
+    def tick(self):
+        self.timer = None
+        nu = self.klok.nu()
+        if metrics.actief is not None:
+            metrics.actief.tick(te_laat=nu - self.volgende_tick)
+        nu = max(nu, self.volgende_tick) # the displayed seconds belong to the boundary, even if Tk fired a bit early
+        pauze_tick = math.floor(nu / INTERVAL) * INTERVAL % PAUZE_INTERVAL == 0
+        for dashboard in self.dashboards:
+            if pauze_tick or not dashboard.wedstrijd.paused:
+                dashboard.refresh_dashboard(nu)
+        self.herplan()
+
+
+def herspeel(wedstrijd:Wedstrijd, history, klok:VirtueleKlok, planner:Planner=None):
+    ''' Replay history on wedstrijd, moving the virtual clock to the time of every item, so that the refreshes
+    of the planner fire in between as they did during the match. wedstrijd and planner use klok. '''
+    for item in history:
+        klok.naar(item.time)
+        wedstrijd.pas_toe(item)
+        if planner is not None and item.type in ('unpause', 'pause'):
+            planner.herplan() # as the dashboard does after a start or a pause
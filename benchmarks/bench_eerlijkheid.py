@@ -0,0 +1,77 @@
+''' Benchmark of the live fairness statistics: Eerlijkheid versus recomputing them from the players every tick.
+
+Replays a running match substitution by substitution and, between two substitutions, queries the mean,
+spread and Gini of Gespeeld% and the players at risk once per second, as the dashboard does. Times the update
+per substitution and the query per tick of Eerlijkheid, and the full recomputation over all players (sorted,
+for the Gini) per tick, and checks that both give the same numbers. Every 9th substitution is undone and
+done again, and now and then a bench player is absent for a while, as in a real match; the heap of planned
+crossings must stay small.
+Run from the repository root with
+    python -m benchmarks.bench_eerlijkheid
+'''
+import time
+import numpy as np
+
+from eerlijkheid import Eerlijkheid, MIN_SPEELTIJD, TOLERANTIE, WEDSTRIJDDUUR
+from player_state import PlayerState, ACTIEF, BANK, AFWEZIG
+from benchmarks.synthetic import roster, synthetic_history
+
+
+def opnieuw(spelers, nu:float, speeltijd:float) -> dict:
+    # The statistics from scratch, over all players
+    gespeeld = spelers.gespeeld.copy()
+    actief = spelers.status == ACTIEF
+    gespeeld[actief] += nu - spelers.laatste_wijziging[actief]
+    telt = (spelers.richttijd > 0) & (spelers.status != AFWEZIG)
+    perc = gespeeld[telt] / (60*spelers.richttijd[telt])
+    n, som = len(perc), perc.sum()
+    gesorteerd = np.sort(perc)
+    gini = 2 * np.sum(np.arange(1, n + 1) * gesorteerd) / (n * som) - (n + 1) / n if som > 0 else 0.0
+    drempel = (1 - TOLERANTIE) * min(speeltijd / WEDSTRIJDDUUR, 1)
+    risico = np.flatnonzero(telt)[perc < drempel].tolist() if speeltijd >= MIN_SPEELTIJD else []
+    return {"gemiddeld": perc.mean(), "spreiding": perc.std(), "gini": gini, "risico": risico}
+
+
+def wedstrijd(n_spelers:int, n_wissels:int) -> tuple:
+    spelers = PlayerState(roster(n_spelers).index, richttijd=np.linspace(10, 30, n_spelers))
+    eerlijkheid = Eerlijkheid(spelers)
+    history = synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=5, pauze_elke=0)[:-1] # stays running
+
+    bijwerken, stand, volledig, gelijk, heap = [], [], [], True, 0
+    begin = history[0].time
+    spelers.unpause(begin)
+    eerlijkheid.bijwerken(spelers, spelers.op_volgorde(ACTIEF), begin, running=True)
+    for vorig, item in zip(history, history[1:]):
+        for nu in np.arange(np.floor(vorig.time) + 1, item.time):
+            start = time.perf_counter()
+            snel = eerlijkheid.stand(nu)
+            stand.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            traag = opnieuw(spelers, nu, nu - begin)
+            volledig.append(time.perf_counter() - start)
+            gelijk &= all(np.isclose(snel[k], traag[k]) for k in ("gemiddeld", "spreiding", "gini")) and snel["risico"] == traag["risico"]
+        heap = max(heap, len(eerlijkheid.heap))
+        uit, in_ = spelers.index[item.speler_uit], spelers.index[item.speler_in]
+        if spelers.status[in_] != BANK: # absent: back on the bench first
+            spelers.naar_bank(in_)
+            eerlijkheid.bijwerken(spelers, (in_,), item.time, running=True)
+        snapshot = spelers.snapshot()
+        spelers.wissel(uit, in_, item.time, running=True)
+        start = time.perf_counter()
+        eerlijkheid.bijwerken(spelers, (uit, in_), item.time, running=True)
+        bijwerken.append(time.perf_counter() - start)
+        if len(bijwerken) % 9 == 0: # undo and redo, as Wedstrijd does
+            for _ in range(2):
+                snapshot = spelers.ruil(snapshot)
+                eerlijkheid.bijwerken(spelers, spelers.gewijzigd(snapshot), item.time, running=True)
+        if len(bijwerken) % 13 == 0:
+            spelers.naar_afwezig(spelers.op_volgorde(BANK)[0])
+            eerlijkheid.bijwerken(spelers, (spelers.op_volgorde(AFWEZIG)[-1],), item.time, running=True)
+    return 1e6 * np.mean(bijwerken), 1e6 * np.mean(stand), 1e6 * np.mean(volledig), len(stand), heap, gelijk
+
+
+if __name__ == '__main__':
+    print(f"{'spelers':>8} {'ticks':>7} {'wissel [us]':>12} {'tick [us]':>10} {'opnieuw [us]':>13} {'heap':>5} {'gelijk':>7}")
+    for n_spelers in (12, 30, 100):
+        wissel, tick, volledig, ticks, heap, gelijk = wedstrijd(n_spelers, n_wissels=60)
+        print(f"{n_spelers:>8} {ticks:>7} {wissel:>12.1f} {tick:>10.2f} {volledig:>13.1f} {heap:>5} {str(gelijk):>7}")
@@ -0,0 +1,85 @@
+''' Benchmark of a line change: N separate substitutions versus one Wedstrijd.lijnwissel of N pairs.
+
+Counts the history items, the bench reorders and the widget calls of the tiles, and times the engine and the
+refresh of the tiles as Dashboard.wissel and Dashboard.lijnwissel do them, with the stand-in widgets of
+bench_tegels (so without a display). Checks that both end with the same time played per player.
+Run from the repository root with
+    python -m benchmarks.bench_lijnwissel
+'''
+import time
+import numpy as np
+
+import tegels
+from event_store import EventStore
+from player_state import PlayerState, ACTIEF, BANK
+from wedstrijd import Wedstrijd
+from benchmarks.bench_tegels import Widget
+from benchmarks.synthetic import roster
+
+
+class Scherm:
+    # The field and the bench of the dashboard, with a count of the bench reorders
+    def __init__(self, n_spelers:int):
+        self.wedstrijd = Wedstrijd(PlayerState.from_frame(roster(n_spelers)), clear_history=False, store=EventStore(path=None, text_log=None))
+        self.wedstrijd.logging = False
+        self.reorders = 0
+        order_bench = self.wedstrijd.spelers.order_bench
+        def geteld():
+            self.reorders += 1
+            order_bench()
+        self.wedstrijd.spelers.order_bench = geteld
+        self.field = tegels.Tegels(Widget(), font=None, breedte=60, hoogte=lambda n: 2, select=print)
+        self.bench = tegels.Tegels(Widget(), font=None, breedte=60, hoogte=lambda n: 2, select=print)
+        self.toon()
+
+    def namen(self, status:int) -> list:
+        return [self.wedstrijd.spelers.namen[idx] for idx in self.wedstrijd.spelers.op_volgorde(status)]
+
+    def toon(self):
+        self.field.toon(self.namen(ACTIEF))
+        self.bench.toon(self.namen(BANK))
+
+    def lijn(self, n:int) -> tuple:
+        # The first n spots of the field out and the first n of the bench (the most rested) in
+        spelers = self.wedstrijd.spelers
+        field, bench = list(range(n)), list(range(n))
+        return field, bench, [spelers.namen[spelers.speler_op(ACTIEF, s)] for s in field], [spelers.namen[spelers.speler_op(BANK, s)] for s in bench]
+
+    def los(self, n:int, tijdstip:float):
+        # The former way: one substitution, and one refresh, per pair
+        field, _, spelers_uit, spelers_in = self.lijn(n)
+        for spot, speler_uit, speler_in in zip(field, spelers_uit, spelers_in):
+            self.wedstrijd.wissel(speler_uit, speler_in, tijdstip)
+            self.field.zet(spot, naam=speler_in)
+            self.bench.toon(self.namen(BANK))
+
+    def samen(self, n:int, tijdstip:float):
+        _, _, spelers_uit, spelers_in = self.lijn(n)
+        self.wedstrijd.lijnwissel(spelers_uit, spelers_in, tijdstip)
+        self.toon()
+
+
+def wedstrijd(variant:str, n_spelers:int, n:int, n_lijnen:int) -> tuple:
+    scherm = Scherm(n_spelers)
+    scherm.wedstrijd.unpause(0.0)
+    scherm.reorders = 0
+    Widget.calls = 0
+    tijden = []
+    for k in range(1, n_lijnen + 1):
+        start = time.perf_counter()
+        getattr(scherm, variant)(n, 120.0 * k)
+        tijden.append(time.perf_counter() - start)
+    items = len(scherm.wedstrijd.history) - 1
+    scherm.wedstrijd.pause(120.0 * (n_lijnen + 1))
+    return items / n_lijnen, scherm.reorders / n_lijnen, Widget.calls / n_lijnen, 1e6 * np.median(tijden), np.sort(scherm.wedstrijd.spelers.gespeeld)
+
+
+if __name__ == '__main__':
+    n_spelers, n_lijnen = 14, 200
+    print(f"{'paren':>8} {'variant':>8} {'items':>6} {'reorders':>9} {'calls':>6} {'us/lijn':>8} {'gelijk':>7}")
+    for n in (2, 3, 4):
+        los = wedstrijd("los", n_spelers, n, n_lijnen)
+        samen = wedstrijd("samen", n_spelers, n, n_lijnen)
+        gelijk = np.allclose(los[-1], samen[-1])
+        for naam, (items, reorders, calls, us, _) in (("los", los), ("samen", samen)):
+            print(f"{n:>8} {naam:>8} {items:>6.0f} {reorders:>9.0f} {calls:>6.1f} {us:>8.1f} {str(gelijk):>7}")
@@ -0,0 +1,67 @@
+''' Benchmark of the engine without the dashboard: events per second through Motor, and its memory.
+
+Feeds synthetic matches of growing length to verwerk_stroom as JSON lines, with the state after every event
+written to a sink, and reports the events per second and the memory that is still held at the end of the
+stream (tracemalloc, in a second run), which should not grow with the number of events. Checks that the
+statistics at the end give the same time played per player as the match replayed on Wedstrijd.
+Run from the repository root with
+    python -m benchmarks.bench_motor
+'''
+import io
+import json
+import time
+import tracemalloc
+import numpy as np
+
+from event_store import EventStore
+from motor import Motor, verwerk_stroom
+from player_state import PlayerState
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+class Sink(io.TextIOBase):
+    # Keeps nothing
+    def write(self, tekst:str) -> int:
+        return len(tekst)
+
+
+def regels(history):
+    for item in history:
+        event = {"type": item.type, "time": item.time}
+        if item.type in ('wissel', 'lijnwissel'):
+            event.update(speler_uit=item.speler_uit, speler_in=item.speler_in)
+        yield json.dumps(event)
+
+
+def stroom(n_spelers:int, n_wissels:int) -> tuple:
+    history = synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=3)
+    motor = Motor(PlayerState.from_frame(roster(n_spelers)))
+    start = time.perf_counter()
+    verwerk_stroom(motor, regels(history), Sink())
+    wall = time.perf_counter() - start
+
+    # Once more for the memory, as tracemalloc slows the stream down
+    tracemalloc.start()
+    geteld = Motor(PlayerState.from_frame(roster(n_spelers)))
+    verwerk_stroom(geteld, regels(history), Sink())
+    vast = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    geteld.close()
+
+    direct = Wedstrijd(PlayerState.from_frame(roster(n_spelers)), clear_history=False, store=EventStore(path=None, text_log=None))
+    direct.logging = False
+    for item in history:
+        direct.pas_toe(item)
+    gespeeld = [speler["gespeeld"] for speler in motor.statistieken()["spelers"]]
+    gelijk = np.allclose(gespeeld, direct.spelers.gespeeld, atol=0.05)
+    motor.close()
+    return len(history), len(history) / wall, vast / 1024, gelijk
+
+
+if __name__ == '__main__':
+    n_spelers = 12
+    print(f"{'events':>8} {'events/s':>10} {'geheugen [kB]':>14} {'gelijk':>7}")
+    for n_wissels in (100, 1000, 10_000):
+        events, per_seconde, geheugen, gelijk = stroom(n_spelers, n_wissels)
+        print(f"{events:>8} {per_seconde:>10.0f} {geheugen:>14.1f} {str(gelijk):>7}")
@@ -0,0 +1,112 @@
+''' Micro-benchmark: array-backed PlayerState versus the former pandas DataFrame path.
+
+Run from the repository root with
+    python -m benchmarks.bench_player_state
+'''
+import itertools
+import timeit
+import numpy as np
+import pandas as pd
+
+from player_state import PlayerState, ACTIEF, BANK
+
+
+def roster(n:int):
+    namen = [f'Speler{i+1:02d}' for i in range(n)]
+    return pd.DataFrame({"Richttijd": np.full(n, 20.0)}, index=pd.Index(namen, name="Naam"))
+
+
+class DataFramePath:
+    ''' The operations of Wedstrijd as they were implemented on a DataFrame. '''
+    def __init__(self, spelers):
+        self.spelers = spelers.copy()
+        n = len(spelers)
+        self.spelers["Status"] = np.concatenate((5*["Actief"], (n-5)*["Bank"]))
+        self.spelers["Spot"] = np.concatenate((np.arange(5), np.arange(n-5)))
+        self.spelers["Gespeeld"] = 0.0
+        self.spelers["Gespeeld%"] = 0.0
+        self.spelers["Laatste wijziging"] = -np.inf
+
+    def unpause(self, tijdstip):
+        self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"] = tijdstip
+
+    def pause(self, tijdstip):
+        self.spelers.loc[self.spelers["Status"] == "Actief", "Gespeeld"] += tijdstip - self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"]
+        self.spelers["Gespeeld%"] = np.where(self.spelers["Richttijd"] > 0, self.spelers["Gespeeld"] / (60*self.spelers["Richttijd"]), 100 + self.spelers["Gespeeld"])
+        self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"] = tijdstip
+
+    def wissel(self, speler_uit, speler_in, tijdstip):
+        self.spelers.at[speler_uit, "Status"] = "Bank"
+        self.spelers.at[speler_uit, "Gespeeld"] += tijdstip - self.spelers.at[speler_uit, "Laatste wijziging"]
+        self.spelers.at[speler_uit, "Laatste wijziging"] = tijdstip
+        self.spelers.at[speler_in, "Status"] = "Actief"
+        self.spelers.at[speler_in, "Laatste wijziging"] = tijdstip
+        self.spelers.at[speler_in, 'Spot'], self.spelers.at[speler_uit, 'Spot'] = self.spelers.at[speler_uit, 'Spot'], self.spelers.at[speler_in, 'Spot']
+        self.order_bench()
+
+    def order_bench(self):
+        self.spelers["Gespeeld%"] = np.where(self.spelers["Richttijd"] > 0, self.spelers["Gespeeld"] / (60*self.spelers["Richttijd"]), 100 + self.spelers["Gespeeld"])
+        bench = self.spelers.loc[self.spelers["Status"] == "Bank"]
+        argsort = bench["Gespeeld%"].argsort()
+        self.spelers.loc[bench.index[argsort], "Spot"] = np.arange(len(bench))
+
+    def tick(self, now):
+        # cell-by-cell reads as done by Dashboard.update_time_features
+        for speler in self.spelers.index:
+            t = now - self.spelers.at[speler, "Laatste wijziging"]
+            self.spelers.at[speler, "Status"], self.spelers.at[speler, "Spot"], self.spelers.at[speler, "Gespeeld"], t
+
+    def swap(self, now):
+        uit = self.spelers.loc[(self.spelers["Status"] == "Actief") & (self.spelers["Spot"] == 0)].index[0]
+        in_ = self.spelers.loc[(self.spelers["Status"] == "Bank") & (self.spelers["Spot"] == 0)].index[0]
+        self.wissel(uit, in_, now)
+
+
+class ArrayPath:
+    def __init__(self, spelers):
+        self.spelers = PlayerState.from_frame(spelers)
+
+    def unpause(self, tijdstip):
+        self.spelers.unpause(tijdstip)
+
+    def pause(self, tijdstip):
+        self.spelers.pause(tijdstip)
+
+    def order_bench(self):
+        self.spelers.order_bench()
+
+    def tick(self, now):
+        now - self.spelers.laatste_wijziging, self.spelers.status, self.spelers.spot, self.spelers.gespeeld
+
+    def swap(self, now):
+        self.spelers.wissel(uit=self.spelers.speler_op(ACTIEF, 0), in_=self.spelers.speler_op(BANK, 0), tijdstip=now, running=True)
+
+
+def time_per_call(func, number:int) -> float:
+    # best of 5 repetitions, in microseconds per call
+    return 1e6 * min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def bench(n:int, number:int=200):
+    resultaten = {}
+    for naam, cls in (("DataFrame", DataFramePath), ("PlayerState", ArrayPath)):
+        engine = cls(roster(n))
+        klok = itertools.count(1e9)
+        engine.unpause(next(klok))
+        resultaten[naam] = {
+            "wissel": time_per_call(lambda: engine.swap(next(klok)), number),
+            "pause": time_per_call(lambda: engine.pause(next(klok)), number),
+            "unpause": time_per_call(lambda: engine.unpause(next(klok)), number),
+            "order_bench": time_per_call(engine.order_bench, number),
+            "tick": time_per_call(lambda: engine.tick(next(klok)), number),
+        }
+    return resultaten
+
+
+if __name__ == '__main__':
+    print(f"{'spelers':>8} {'operatie':>12} {'DataFrame [µs]':>15} {'PlayerState [µs]':>17} {'factor':>7}")
+    for n in (18, 40, 100, 200):
+        resultaten = bench(n)
+        for operatie in resultaten["DataFrame"]:
+            df, arr = resultaten["DataFrame"][operatie], resultaten["PlayerState"][operatie]
+            print(f"{n:>8} {operatie:>12} {df:>15.1f} {arr:>17.1f} {df/arr:>7.0f}")
@@ -0,0 +1,45 @@
+''' Time per substitution advice: a Python loop over all (field player, bench player) pairs versus the
+vectorized Recommender, for growing rosters. The advice is computed on every one-second tick, so it has
+to stay far below a millisecond.
+
+Run from the repository root with
+    python -m benchmarks.bench_recommender
+'''
+import timeit
+
+from player_state import ACTIEF, BANK
+from recommender import Recommender
+from benchmarks.bench_tick import spelers_midden_in_wedstrijd, time_ref
+
+
+def loop_beste(spelers, now, drempel):
+    # The same score, pair by pair
+    beste, beste_score = None, drempel
+    for i in range(len(spelers)):
+        if spelers.status[i] != ACTIEF:
+            continue
+        t_i = now - spelers.laatste_wijziging[i]
+        health_i = 1 / (1 + (t_i/time_ref)**2)
+        perc_i = (spelers.gespeeld[i] + t_i) / (60*spelers.richttijd[i]) if spelers.richttijd[i] > 0 else None
+        for j in range(len(spelers)):
+            if spelers.status[j] != BANK:
+                continue
+            t_j = now - spelers.laatste_wijziging[j]
+            health_j = 1 - 1 / (1 + (t_j/time_ref)**2)
+            perc_j = spelers.gespeeld[j] / (60*spelers.richttijd[j]) if spelers.richttijd[j] > 0 else None
+            score = health_j - health_i + (perc_i - perc_j if perc_i is not None and perc_j is not None else 0.0)
+            if score >= beste_score and (beste is None or score > beste_score):
+                beste, beste_score = (i, j), score
+    return beste
+
+
+if __name__ == '__main__':
+    recommender = Recommender(time_ref=time_ref)
+    print(f"{'spelers':>8} {'loop [µs]':>10} {'vectorized [µs]':>16} {'same advice':>12}")
+    for n in (12, 30, 60, 100, 200):
+        spelers = spelers_midden_in_wedstrijd(n, half_rested=True)
+        now = 1500.0
+        lus = 1e6 * min(timeit.repeat(lambda: loop_beste(spelers, now, recommender.drempel), number=20, repeat=5)) / 20
+        vec = 1e6 * min(timeit.repeat(lambda: recommender.beste(spelers, paused=False, now=now), number=200, repeat=5)) / 200
+        zelfde = loop_beste(spelers, now, recommender.drempel) == recommender.beste(spelers, paused=False, now=now)
+        print(f"{n:>8} {lus:>10.0f} {vec:>16.1f} {str(zelfde):>12}")
@@ -0,0 +1,38 @@
+''' Throughput of the headless renderer in images per second, serial and with a process pool.
+
+Run from the repository root with
+    python -m benchmarks.bench_render
+'''
+import hashlib
+import os
+import tempfile
+import time
+
+from render import render_matches
+from benchmarks.synthetic import roster, synthetic_history, write_history
+
+
+def bench(n_matches:int, workers:int, folder:str) -> float:
+    bronnen = []
+    for m in range(n_matches):
+        path = os.path.join(folder, f"match{m:03d}.txt")
+        if not os.path.exists(path):
+            write_history(synthetic_history(n_spelers=12, n_wissels=60, seed=m), path)
+        bronnen.append(path)
+    start = time.perf_counter()
+    render_matches(bronnen, os.path.join(folder, f"out{workers}"), roster=roster(12), workers=workers)
+    return n_matches / (time.perf_counter() - start)
+
+
+def digest(path:str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+if __name__ == '__main__':
+    n_matches = 24
+    with tempfile.TemporaryDirectory() as folder:
+        for workers in (1, 2, os.cpu_count()):
+            print(f"{workers:>3} workers: {bench(n_matches, workers, folder):6.2f} images/s")
+        identical = digest(os.path.join(folder, "out1", "match000.png")) == digest(os.path.join(folder, "out2", "match000.png"))
+        print(f"deterministic output: {identical}")
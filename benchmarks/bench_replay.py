@@ -0,0 +1,75 @@
+''' Benchmark of replaying a whole match on the virtual clock, with the refresh of the dashboard every second.
+
+Replays matches of 40 minutes of play (plus a half-time) with VirtueleKlok, the Planner and the work of a
+dashboard refresh without Tk (the TickEngine, the advice of the Recommender and the delta for the stream),
+and reports the wall time against the match time. Checks that the replay ends in the same state as the
+match without refreshes, and that two replays fire the same refreshes with the same advice.
+Run from the repository root with
+    python -m benchmarks.bench_replay
+'''
+import time
+import numpy as np
+
+from beheer import Planner, herspeel
+from display import TickEngine
+from event_store import EventStore
+from klok import VirtueleKlok
+from live_stream import Kanaal
+from player_state import PlayerState
+from recommender import Recommender
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+time_ref = 4*60
+
+
+class Scherm:
+    # What Dashboard.refresh_dashboard computes, without the widgets
+    def __init__(self, wedstrijd:Wedstrijd):
+        self.wedstrijd = wedstrijd
+        self.tick_engine = TickEngine(time_ref=time_ref)
+        self.recommender = Recommender(time_ref=time_ref)
+        self.kanaal = Kanaal(wedstrijd.spelers, wedstrijd.paused)
+        self.refreshes = []
+
+    def refresh_dashboard(self, nu:float):
+        self.tick_engine.tick(self.wedstrijd.spelers, paused=self.wedstrijd.paused, now=nu)
+        suggestie = None if self.wedstrijd.paused else self.recommender.beste(self.wedstrijd.spelers, paused=False, now=nu)
+        self.kanaal.publiceer(self.wedstrijd.spelers, self.wedstrijd.paused, nu)
+        self.refreshes.append((nu, suggestie))
+
+
+def nieuwe_wedstrijd(n_spelers:int, klok=None) -> Wedstrijd:
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(n_spelers)), clear_history=False, store=EventStore(path=None, text_log=None), klok=klok)
+    wedstrijd.logging = False
+    return wedstrijd
+
+
+def replay(history, n_spelers:int) -> tuple:
+    klok = VirtueleKlok(start=history[0].time - 60)
+    wedstrijd = nieuwe_wedstrijd(n_spelers, klok)
+    planner = Planner(klok, klok)
+    scherm = Scherm(wedstrijd)
+    planner.abonneer(scherm)
+    start = time.perf_counter()
+    herspeel(wedstrijd, history, klok, planner)
+    klok.verder(60)
+    return time.perf_counter() - start, wedstrijd, scherm.refreshes
+
+
+if __name__ == '__main__':
+    n_spelers = 12
+    print(f"{'wedstrijd [min]':>16} {'refreshes':>10} {'replay [ms]':>12} {'versnelling':>12} {'gelijk':>7} {'herhaalbaar':>12}")
+    for seed in range(3):
+        # 2 x 20 minutes of play, a substitution every minute on average, and 10 minutes of half-time
+        history = synthetic_history(n_spelers=n_spelers, n_wissels=40, seed=seed, pauze_elke=20)
+        duur = history[-1].time - history[0].time + 120
+        wall, wedstrijd, refreshes = replay(history, n_spelers)
+
+        direct = nieuwe_wedstrijd(n_spelers)
+        for item in history:
+            direct.pas_toe(item)
+        gelijk = np.array_equal(wedstrijd.spelers.status, direct.spelers.status) and np.allclose(wedstrijd.spelers.gespeeld, direct.spelers.gespeeld)
+        herhaalbaar = replay(history, n_spelers)[2] == refreshes
+        print(f"{duur / 60:>16.1f} {len(refreshes):>10} {1e3 * wall:>12.1f} {duur / wall:>11.0f}x {str(gelijk):>7} {str(herhaalbaar):>12}")
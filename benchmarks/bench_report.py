@@ -0,0 +1,66 @@
+''' Time to draw the match overview against the number of stints: the batched timeline of report.py versus
+one barh and one text call per stint, as the report used to draw it.
+
+Run from the repository root with
+    python -m benchmarks.bench_report
+'''
+import time
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from display import time_to_string
+from render import spelers_uit_history
+from report import teken_overzicht, draw_stints, kleuren
+from stints import speelbeurten
+from benchmarks.synthetic import roster, synthetic_history
+
+
+def figuur():
+    fig = Figure(figsize=(19.2, 10.8), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.invert_yaxis()
+    ax.axis('off')
+    return fig, ax
+
+def per_stint(ax, beurten, colours):
+    for speler, lane, start, end, colour in zip(beurten.speler, beurten.lane, beurten.begin, beurten.einde, colours):
+        ax.barh(y=lane, width=end-start, left=start, color=colour)
+        ax.text(x=(start+end)/2, y=lane, s=f'{speler}\n{time_to_string(end-start)}', ha='center', va='center')
+
+def bench_timeline(teken, beurten, colours, herhalingen:int=2) -> float:
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        fig, ax = figuur()
+        ax.set_xlim(beurten.begin.min(), beurten.einde.max())
+        teken(ax, beurten, colours)
+        fig.canvas.draw()
+        tijden.append(time.perf_counter() - start)
+    return min(tijden)
+
+def bench_overzicht(history, n_spelers:int, herhalingen:int=2) -> float:
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        fig = Figure(figsize=(19.2, 10.8), dpi=100)
+        FigureCanvasAgg(fig)
+        teken_overzicht(fig, spelers=spelers_uit_history(history, roster(n_spelers)), history=history)
+        fig.canvas.draw()
+        tijden.append(time.perf_counter() - start)
+    return min(tijden)
+
+
+if __name__ == '__main__':
+    n_spelers = 12
+    kleur = dict(zip(roster(n_spelers).index, kleuren(n_spelers)))
+    print(f"{'stints':>7} {'per stint':>10} {'batched':>10} {'speedup':>8} {'overview':>10}")
+    for n_wissels in (50, 200, 800, 2000):
+        history = synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=1)
+        beurten = speelbeurten(history)
+        colours = [kleur[speler] for speler in beurten.speler]
+        oud = bench_timeline(per_stint, beurten, colours)
+        nieuw = bench_timeline(lambda ax, b, c: draw_stints(ax, b, c), beurten, colours)
+        overzicht = bench_overzicht(history, n_spelers)
+        print(f"{len(beurten.duur):>7} {oud*1e3:>8.0f}ms {nieuw*1e3:>8.0f}ms {oud/nieuw:>7.1f}x {overzicht*1e3:>8.0f}ms")
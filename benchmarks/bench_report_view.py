@@ -0,0 +1,65 @@
+''' Benchmark of the data of a report opened mid-match: deepcopy of the match and pause() of the copy versus
+the view of PlayerState.to_frame(tot) and SpeelbeurtenIndex.tot(tot), which change and copy nothing.
+
+Times the preparation only (the drawing is the same for both) and the peak of the memory it allocates,
+for growing histories. Run from the repository root with
+    python -m benchmarks.bench_report_view
+'''
+import time
+import tracemalloc
+from copy import deepcopy
+import numpy as np
+
+from event_store import EventStore
+from player_state import PlayerState
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+def lopende_wedstrijd(n_spelers:int, n_wissels:int) -> Wedstrijd:
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(n_spelers)), clear_history=False, store=EventStore(path=None, text_log=None))
+    wedstrijd.logging = False
+    for item in synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=1)[:-1]: # stays running
+        if item.type == 'unpause':
+            wedstrijd.unpause(item.time)
+        elif item.type == 'pause':
+            wedstrijd.pause(item.time)
+        elif item.type == 'wissel':
+            wedstrijd.wissel(item.speler_uit, item.speler_in, item.time)
+    return wedstrijd
+
+
+def kopie(wedstrijd:Wedstrijd, tot:float):
+    # The former Wedstrijd.report
+    self_ = deepcopy(wedstrijd, memo={id(wedstrijd.luisteraars): []})
+    self_.pause(tijdstip=tot)
+    return self_.spelers.to_frame(), self_.stints.gesloten()
+
+def view(wedstrijd:Wedstrijd, tot:float):
+    # The current Wedstrijd.report
+    return wedstrijd.spelers.to_frame(tot=tot), wedstrijd.stints.tot(tot)
+
+
+def meet(functie, herhalingen:int=5) -> tuple:
+    # Median time in ms and peak of the allocated memory in MB
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        functie()
+        tijden.append(time.perf_counter() - start)
+    tracemalloc.start()
+    functie()
+    piek = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return 1e3 * np.median(tijden), piek / 1e6
+
+
+if __name__ == '__main__':
+    print(f"{'wissels':>8} {'kopie [ms]':>11} {'view [ms]':>10} {'kopie [MB]':>11} {'view [MB]':>10}")
+    for n_wissels in (1_000, 10_000, 100_000):
+        wedstrijd = lopende_wedstrijd(20, n_wissels)
+        tot = wedstrijd.history[-1].time + 30.0
+        ms_kopie, mb_kopie = meet(lambda: kopie(wedstrijd, tot))
+        ms_view, mb_view = meet(lambda: view(wedstrijd, tot))
+        print(f"{n_wissels:>8} {ms_kopie:>11.1f} {ms_view:>10.1f} {mb_kopie:>11.1f} {mb_view:>10.1f}")
+        wedstrijd.store.close()
@@ -0,0 +1,156 @@
+''' Benchmark of resuming an interrupted match, and a check that the resumed match is the match that was live.
+
+Plays synthetic matches with undos and redos on the virtual clock, logged to history.txt, to an event
+database that is not the default one, or to both, and "crashes" them after the last event was written:
+the match is resumed from its checkpoint and the tail of the log, plays on, crashes and is resumed once
+more. Times a checkpoint on the caller's thread near the end of the match, the resume, and the reading of
+the history before the checkpoint that the resume leaves for later (Wedstrijd.laad). Checks that the player
+state, the history, the stints, the minutes per pair and the fairness statistics equal those of the live
+match, and that no default database was created on the way. Resuming a match whose database is gone must
+fail instead of starting an empty one, and substitutions that were replayed on resume and then undone must
+leave the database and history.txt as they leave the match.
+Run from the repository root with
+    python -m benchmarks.bench_resume
+'''
+import os
+import tempfile
+import time
+import numpy as np
+
+from event_store import EventStore, EVENT_DB, wissels
+from history import read_history, zonder_undo
+from klok import VirtueleKlok
+from player_state import PlayerState, TOESTAND
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+VARIANTEN = {"history.txt": ("anders.sqlite", "history.txt"),
+             "database": ("anders.sqlite", None),
+             "geen database": (None, "history.txt")}
+
+
+def speel(wedstrijd:Wedstrijd, history, eerste:int=0):
+    # Every 7th substitution is undone and tapped again, every 11th undone and redone
+    for k, item in enumerate(history, start=eerste):
+        wedstrijd.klok.naar(item.time)
+        wedstrijd.pas_toe(item)
+        if item.type == 'wissel' and k % 7 == 0:
+            wedstrijd.undo()
+            wedstrijd.pas_toe(item)
+        elif item.type == 'wissel' and k % 11 == 0:
+            wedstrijd.undo()
+            wedstrijd.redo()
+    wedstrijd.klok.verder(1.5)
+    wedstrijd.store.flush() # the crash comes after the last event was written
+
+
+def gemeten_checkpoints(wedstrijd:Wedstrijd) -> list:
+    # The time of every checkpoint on the caller's thread
+    tijden = []
+    checkpoint = wedstrijd.checkpoint
+    def gemeten():
+        start = time.perf_counter()
+        checkpoint()
+        tijden.append(time.perf_counter() - start)
+    wedstrijd.checkpoint = gemeten
+    return tijden
+
+
+def toestand(wedstrijd:Wedstrijd) -> list:
+    # Everything that resuming rebuilds, as numbers
+    nu = wedstrijd.klok.nu()
+    stints = wedstrijd.stints.tot(nu)
+    stand = wedstrijd.eerlijkheid.stand(nu)
+    return [np.asarray(getattr(wedstrijd.spelers, veld), dtype=float) for veld in TOESTAND] + [
+        np.array([item.time for item in wedstrijd.history]), stints.begin, stints.einde, stints.lane,
+        wedstrijd.samenspel.paren_tot(nu), np.array([stand["gemiddeld"], stand["spreiding"], stand["gini"]])]
+
+
+def sleutel(item) -> tuple:
+    return item.type, list(getattr(item, "spelers", [])), getattr(item, "speler_uit", None), getattr(item, "speler_in", None)
+
+
+def gelijk(a:Wedstrijd, b:Wedstrijd) -> bool:
+    return (a.paused == b.paused and [sleutel(item) for item in a.history] == [sleutel(item) for item in b.history]
+            and list(a.stints.tot(a.klok.nu()).speler) == list(b.stints.tot(b.klok.nu()).speler)
+            and a.eerlijkheid.stand(a.klok.nu())["risico"] == b.eerlijkheid.stand(b.klok.nu())["risico"]
+            and all(x.shape == y.shape and np.allclose(x, y, atol=0.01, equal_nan=True) for x, y in zip(toestand(a), toestand(b))))
+
+
+def hervat(n_wissels:int, path:str, text_log:str) -> tuple:
+    history = synthetic_history(n_spelers=12, n_wissels=n_wissels, seed=n_wissels)[:-1] # stays running
+    voor, na = history[:-12], history[-12:]
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(12)), store=EventStore(path=path, text_log=text_log), klok=VirtueleKlok(start=history[0].time))
+    checkpoints = gemeten_checkpoints(wedstrijd)
+    speel(wedstrijd, voor)
+
+    start = time.perf_counter()
+    hervatte = Wedstrijd.resume(klok=VirtueleKlok(start=wedstrijd.klok.nu()))
+    wall = time.perf_counter() - start
+
+    # Both play on, the crashed match only as the reference; the resumed match without having read its
+    # history, and it crashes again
+    wedstrijd.logging = False
+    speel(wedstrijd, na, eerste=len(voor))
+    speel(hervatte, na, eerste=len(voor))
+    tweede = Wedstrijd.resume(klok=VirtueleKlok(start=hervatte.klok.nu()))
+    start = time.perf_counter()
+    tweede.laad()
+    laad = time.perf_counter() - start
+
+    resultaat = (len(wedstrijd.history), 1e6 * np.median(checkpoints[-len(checkpoints) // 4:]), 1e3 * wall, 1e3 * laad,
+                 gelijk(wedstrijd, hervatte) and gelijk(wedstrijd, tweede))
+    for match in (tweede, hervatte, wedstrijd):
+        match.store.close()
+    return resultaat
+
+
+def zonder_database() -> str:
+    # Resume a match whose database was removed
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(12)), store=EventStore(path="weg.sqlite", text_log=None), klok=VirtueleKlok(start=0.0))
+    speel(wedstrijd, synthetic_history(n_spelers=12, n_wissels=40)[:-1])
+    wedstrijd.store.close()
+    for bestand in ("weg.sqlite", "weg.sqlite-wal", "weg.sqlite-shm"):
+        if os.path.exists(bestand):
+            os.remove(bestand)
+    try:
+        Wedstrijd.resume().store.close()
+    except FileNotFoundError:
+        return "FileNotFoundError"
+    return "hervat zonder events"
+
+
+def undo_na_resume(text_log:str) -> bool:
+    # Undo two substitutions that were logged after the last checkpoint and replayed on resume
+    history = synthetic_history(n_spelers=12, n_wissels=45, seed=2)[:-1]
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(12)), store=EventStore(path="undo.sqlite", text_log=text_log), klok=VirtueleKlok(start=history[0].time))
+    speel(wedstrijd, history)
+    wedstrijd.store.close()
+    hervatte = Wedstrijd.resume(klok=VirtueleKlok(start=wedstrijd.klok.nu()))
+    ongedaan = hervatte.undo() and hervatte.undo()
+    hervatte.store.flush()
+    verwacht = [(item.speler_uit, item.speler_in) for item in hervatte.history if item.type == 'wissel']
+    in_database = [(uit, in_) for _, _, uit, in_ in wissels(path="undo.sqlite")]
+    in_log = [(item.speler_uit, item.speler_in) for item in zonder_undo(read_history(path=text_log)) if item.type == 'wissel'] if text_log else verwacht
+    hervatte.store.close()
+    for bestand in ("undo.sqlite", "undo.sqlite-wal", "undo.sqlite-shm", text_log):
+        if bestand is not None and os.path.exists(bestand):
+            os.remove(bestand)
+    return ongedaan and len(verwacht) == sum(item.type == 'wissel' for item in history) - 2 and in_database == verwacht and in_log == verwacht
+
+
+if __name__ == '__main__':
+    repository = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder) # the logs and the checkpoints are written here
+        try:
+            print(f"{'log':>14} {'events':>7} {'checkpoint [us]':>16} {'resume [ms]':>12} {'laad [ms]':>10} {'gelijk':>7} {'default db':>11}")
+            for naam, (path, text_log) in VARIANTEN.items():
+                for n_wissels in (47, 1000, 10_000):
+                    events, checkpoint, wall, laad, is_gelijk = hervat(n_wissels, path, text_log)
+                    print(f"{naam:>14} {events:>7} {checkpoint:>16.1f} {wall:>12.1f} {laad:>10.1f} {str(is_gelijk):>7} {str(os.path.exists(EVENT_DB)):>11}")
+            print(f"database weg: {zonder_database()}")
+            print(f"undo na resume: {undo_na_resume('undo.txt')} (history.txt), {undo_na_resume(None)} (database)")
+        finally:
+            os.chdir(repository)
@@ -0,0 +1,53 @@
+''' Benchmark of the time per pair and per lineup: the incremental Samenspel versus replaying the history.
+
+Times the update of Samenspel per history item, and a live query of all pairs and all lineups: from the
+incremental tables, by replaying the whole history (what a report would do without the index), and for the
+pairs also with SpeelbeurtenIndex.overlap() per pair. Checks that all give the same minutes.
+Run from the repository root with
+    python -m benchmarks.bench_samenspel
+'''
+import itertools
+import time
+import timeit
+import numpy as np
+
+from player_state import PlayerState
+from samenspel import Samenspel
+from stints import SpeelbeurtenIndex
+from benchmarks.synthetic import roster, synthetic_history
+
+
+def replay(namen, history, tot:float):
+    samenspel = Samenspel.uit_history(namen, history)
+    return samenspel.paren_tot(tot), samenspel.opstellingen_tot(tot)
+
+def overlap(namen, stints, tot:float) -> np.ndarray:
+    paren = np.zeros((len(namen), len(namen)))
+    for (a, speler_a), (b, speler_b) in itertools.combinations(enumerate(namen), 2):
+        paren[a, b] = paren[b, a] = stints.overlap(speler_a, speler_b, tot=tot)
+    return paren
+
+
+if __name__ == '__main__':
+    n_spelers = 12
+    namen = PlayerState.from_frame(roster(n_spelers)).namen
+    print(f"{'wissels':>8} {'update [us]':>12} {'query [us]':>11} {'replay [ms]':>12} {'overlap [ms]':>13} {'opstellingen':>13} {'gelijk':>7}")
+    for n_wissels in (100, 1_000, 10_000):
+        history = synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=4)[:-1] # stays running
+        tot = history[-1].time + 30.0
+
+        samenspel = Samenspel(namen)
+        start = time.perf_counter()
+        for item in history:
+            samenspel.voeg_toe(item)
+        update = (time.perf_counter() - start) / len(history)
+        stints = SpeelbeurtenIndex.uit_history(history)
+
+        query = timeit.timeit(lambda: (samenspel.paren_tot(tot), samenspel.opstellingen_tot(tot)), number=100) / 100
+        herhalingen = 3
+        opnieuw = timeit.timeit(lambda: replay(namen, history, tot), number=herhalingen) / herhalingen
+        per_paar = timeit.timeit(lambda: overlap(namen, stints, tot), number=herhalingen) / herhalingen
+
+        paren, opstellingen = samenspel.paren_tot(tot), samenspel.opstellingen_tot(tot)
+        gelijk = np.allclose(paren, overlap(namen, stints, tot)) and opstellingen.keys() == replay(namen, history, tot)[1].keys()
+        print(f"{n_wissels:>8} {1e6 * update:>12.2f} {1e6 * query:>11.1f} {1e3 * opnieuw:>12.2f} {1e3 * per_paar:>13.2f} {len(opstellingen):>13} {str(gelijk):>7}")
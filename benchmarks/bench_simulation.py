@@ -0,0 +1,58 @@
+''' Throughput of the Monte Carlo simulation in matches per second, and a check that it plays the same match
+as the dashboard does.
+
+Simulation keeps its own vectorized copy of the state of PlayerState. To check that it follows the same
+rules, a block of matches is simulated with logging for every policy, and a sample of them is replayed from
+Simulatie.history() through Wedstrijd on the virtual clock: the time played and the status at the end of
+every player must equal those of the simulation, and so must the number of substitutions.
+Run from the repository root with
+    python -m benchmarks.bench_simulation
+'''
+import time
+import numpy as np
+
+from event_store import EventStore
+from klok import VirtueleKlok
+from player_state import PlayerState, AFWEZIG
+from simulation import simuleer, simuleer_blok, LangsteUit, Lijnwissel, Advies
+from wedstrijd import Wedstrijd
+
+
+def naspelen(sim, wedstrijd:int, namen) -> Wedstrijd:
+    # The simulated match replayed on Wedstrijd: the starting players first, then the bench, then the absent
+    volgorde = np.concatenate([np.flatnonzero(sim.start[wedstrijd]),
+                               np.flatnonzero(~sim.start[wedstrijd] & (sim.status[wedstrijd] != AFWEZIG)),
+                               np.flatnonzero(sim.status[wedstrijd] == AFWEZIG)])
+    spelers = PlayerState([namen[idx] for idx in volgorde], sim.richttijd[volgorde])
+    replay = Wedstrijd(spelers, clear_history=False, store=EventStore(path=None, text_log=None), klok=VirtueleKlok(start=0.0))
+    replay.logging = False
+    for idx in np.flatnonzero(sim.status[wedstrijd] == AFWEZIG):
+        replay.naar_afwezig(namen[idx])
+    for item in sim.history(wedstrijd, namen):
+        replay.klok.naar(item.time)
+        replay.pas_toe(item)
+    replay.store.close()
+    return replay
+
+
+def gelijk(sim, wedstrijd:int, namen) -> bool:
+    replay = naspelen(sim, wedstrijd, namen)
+    volgorde = [replay.spelers.index[naam] for naam in namen]
+    wissels = sum(item.type == 'wissel' for item in replay.history)
+    return (np.allclose(replay.spelers.gespeeld[volgorde], sim.gespeeld[wedstrijd], atol=1e-6)
+            and np.array_equal(replay.spelers.status[volgorde], sim.status[wedstrijd])
+            and wissels == sim.wissels[wedstrijd])
+
+
+if __name__ == '__main__':
+    n_spelers, richttijd = 12, np.full(12, 16.0)
+    namen = [f'Speler{i+1:02d}' for i in range(n_spelers)]
+    print(f"{'policy':>22} {'wedstrijden/s':>14} {'gelijk':>7}")
+    for policy in (LangsteUit(3*60), Lijnwissel(4*60), Advies()):
+        start = time.perf_counter()
+        simuleer(policy, richttijd, n_wedstrijden=2000, workers=1, keeper=0)
+        per_seconde = 2000 / (time.perf_counter() - start)
+
+        sim = simuleer_blok(policy, richttijd, n_wedstrijden=50, seed=1, keeper=0, log=True)
+        is_gelijk = all(gelijk(sim, wedstrijd, namen) for wedstrijd in range(50))
+        print(f"{repr(policy):>22} {per_seconde:>14.0f} {str(is_gelijk):>7}")
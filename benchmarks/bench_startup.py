@@ -0,0 +1,58 @@
+''' Benchmark of the startup: the time until the dashboard can be built, in a fresh interpreter per run.
+
+Compares the current startup path (import main, read spelers.txt, create the Wedstrijd) with the same
+path preceded by the imports that main.py used to do at load (pandas, matplotlib.pyplot and the Tk
+backend), and shows what opening the first report adds. With a display, creating the Tk window is timed
+too. Run from the repository root with
+    python -m benchmarks.bench_startup
+'''
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+
+STARTUP = '''
+import main
+from player_state import PlayerState
+from wedstrijd import Wedstrijd
+wedstrijd = Wedstrijd(PlayerState.from_csv('spelers.txt'))
+'''
+
+VARIANTEN = {
+    "python": "pass",
+    "dashboard (lazy)": STARTUP,
+    "dashboard (eager)": "import pandas, matplotlib.pyplot, matplotlib.backends.backend_tkagg\n" + STARTUP,
+    "+ eerste report": STARTUP + "import live_report\n",
+    "+ Tk venster": STARTUP + "import tkinter as tk\nroot = tk.Tk()\nroot.update()\n",
+}
+
+
+def meet(code:str, folder:str, herhalingen:int) -> list:
+    # Wall time of a fresh interpreter that runs code, in s
+    omgeving = dict(os.environ, PYTHONPATH=os.getcwd(), MPLBACKEND="Agg")
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        resultaat = subprocess.run([sys.executable, "-c", code], cwd=folder, env=omgeving, capture_output=True, text=True)
+        tijden.append(time.perf_counter() - start)
+        if resultaat.returncode != 0:
+            return None
+    return tijden
+
+
+if __name__ == '__main__':
+    herhalingen = 7
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copy("spelers_voorbeeld.txt", os.path.join(folder, "spelers.txt"))
+        shutil.copy("spelers_voorbeeld.txt", folder)
+        print(f"{'':>20} {'mediaan [ms]':>13} {'min [ms]':>9}")
+        for naam, code in VARIANTEN.items():
+            tijden = meet(code, folder, herhalingen)
+            if tijden is None:
+                print(f"{naam:>20} {'n/a':>13}") # e.g. no display for Tk
+            else:
+                print(f"{naam:>20} {1e3*np.median(tijden):>13.0f} {1e3*np.min(tijden):>9.0f}")
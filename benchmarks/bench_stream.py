@@ -0,0 +1,94 @@
+''' Benchmark of the live delta stream, with local clients only.
+
+Replays a synthetic match against a DeltaStream on 127.0.0.1, one publiceer() per second of the match and
+one after every substitution, as fast as possible. Local clients follow the stream, one of them throttled to
+2 s. Reports the time of publiceer() per client count, the bytes of all deltas (what a client receives when
+the match is played in real time) against a full snapshot every second, the bytes and messages the clients
+actually received (the fast replay is coalesced), and checks that the state rebuilt from the snapshot and
+the deltas equals the match.
+Run from the repository root with
+    python -m benchmarks.bench_stream
+'''
+import json
+import math
+import threading
+import time
+import numpy as np
+
+from event_store import EventStore
+from live_stream import DeltaStream, volg, rij, toestand
+from player_state import PlayerState
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+class Client:
+    ''' Follows the stream in a thread and rebuilds the state from it, like the page on the tablet. '''
+
+    def __init__(self, url:str):
+        self.url = url
+        self.staat = None
+        self.bytes = 0
+        self.berichten = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        for event, data in volg(self.url):
+            self.bytes += len(json.dumps(data, separators=(',', ':')))
+            self.berichten += 1
+            if event == "snapshot":
+                self.staat = data
+            else:
+                for i, speler in data.get("spelers", {}).items():
+                    self.staat["spelers"][int(i)] = speler
+                self.staat["paused"] = data.get("paused", self.staat["paused"])
+                self.staat["t"] = data["t"]
+
+
+def speel(kanaal, n_spelers:int, n_wissels:int) -> tuple:
+    # Replay the match, publishing every whole second; returns the match, the times of publiceer() and the bytes of the deltas
+    wedstrijd = Wedstrijd(PlayerState.from_frame(roster(n_spelers)), clear_history=False, store=EventStore(path=None, text_log=None))
+    wedstrijd.logging = False
+    history = synthetic_history(n_spelers=n_spelers, n_wissels=n_wissels, seed=2)
+    tijden, delta_bytes = [], 0
+    nu = history[0].time
+    for item in history:
+        while nu + 1 <= item.time:
+            nu = math.floor(nu) + 1
+            start = time.perf_counter()
+            delta = kanaal.publiceer(wedstrijd.spelers, wedstrijd.paused, nu)
+            tijden.append(time.perf_counter() - start)
+            delta_bytes += len(json.dumps(delta, separators=(',', ':')))
+        if item.type == 'unpause':
+            wedstrijd.unpause(item.time)
+        elif item.type == 'pause':
+            wedstrijd.pause(item.time)
+        elif item.type == 'wissel':
+            wedstrijd.wissel(item.speler_uit, item.speler_in, item.time)
+        nu = item.time
+        delta_bytes += len(json.dumps(kanaal.publiceer(wedstrijd.spelers, wedstrijd.paused, nu), separators=(',', ':')))
+    return wedstrijd, tijden, delta_bytes
+
+
+if __name__ == '__main__':
+    n_spelers, n_wissels = 12, 60
+    print(f"{'clients':>8} {'publiceer [us]':>15} {'deltas [B]':>11} {'snapshots [B]':>14} {'ontvangen [B]':>14} {'berichten':>10} {'gelijk':>7}")
+    for n_clients in (0, 1, 10, 50):
+        stream = DeltaStream(host="127.0.0.1", port=0)
+        kanaal = stream.kanaal(None, PlayerState.from_frame(roster(n_spelers)))
+        clients = [Client(f"http://127.0.0.1:{stream.port}/stream" + ("?interval=2" if k == 0 else "")) for k in range(n_clients)]
+        while any(client.staat is None for client in clients):
+            time.sleep(0.01)
+        wedstrijd, tijden, delta_bytes = speel(kanaal, n_spelers, n_wissels)
+        time.sleep(2.5) # the throttled client receives the last merged delta
+
+        # A full snapshot every second, as a polling client would fetch it
+        abonnee, snapshot = kanaal.abonneer()
+        kanaal.opzeggen(abonnee)
+        snapshots = len(tijden) * len(json.dumps(snapshot, separators=(',', ':')))
+        gelijk = all(client.staat["spelers"] == [rij(t) for t in toestand(wedstrijd.spelers)] for client in clients)
+        gemiddeld = np.mean([client.bytes for client in clients]) if clients else 0
+        berichten = np.mean([client.berichten for client in clients]) if clients else 0
+        print(f"{n_clients:>8} {1e6 * np.median(tijden):>15.1f} {delta_bytes:>11} {snapshots:>14} {gemiddeld:>14.0f} {berichten:>10.0f} {str(gelijk):>7}")
+        stream.close()
@@ -0,0 +1,108 @@
+''' Benchmark of moving players between the bench and the absent list: destroy-and-rebuild versus pooled tiles.
+
+Counts the widgets that are created, the widgets that are still alive and the widget calls per move, and times
+a move, with stand-in widgets instead of Tk (so without a display). A move is one bench player to the absent
+list or back, as Dashboard.move_to_absent and move_to_bench do, for a tournament day of moves.
+Run from the repository root with
+    python -m benchmarks.bench_tegels
+'''
+import time
+import types
+import numpy as np
+
+import tegels
+from player_state import PlayerState, BANK, AFWEZIG
+from benchmarks.synthetic import roster
+
+
+class Widget:
+    gemaakt = 0
+    levend = 0
+    calls = 0
+
+    def __init__(self, master=None, **kwargs):
+        Widget.gemaakt += 1
+        Widget.levend += 1
+        self.kinderen = []
+        if master is not None:
+            master.kinderen.append(self)
+
+    def destroy(self):
+        for kind in self.kinderen:
+            kind.destroy()
+        Widget.levend -= 1
+
+    def _call(self, *args, **kwargs):
+        Widget.calls += 1
+
+    config = grid = grid_remove = pack = place = bind = set = grid_rowconfigure = grid_columnconfigure = _call
+
+tk = types.SimpleNamespace(Frame=Widget, Button=Widget, Label=Widget, Scrollbar=Widget,
+                           VERTICAL='vertical', FLAT='flat', SOLID='solid', BOTH='both')
+tegels.tk = tk
+
+
+class Rebuild:
+    # The former create_bench and create_absent: a new frame with new tiles after every move
+    def __init__(self, spelers, master):
+        self.spelers, self.master = spelers, master
+        self.update()
+
+    def tiles(self, status:int, frame, labels:bool):
+        for idx in self.spelers.op_volgorde(status):
+            player_frame = tk.Frame(frame)
+            player_frame.grid(row=self.spelers.spot[idx], column=0)
+            tk.Button(player_frame, text=self.spelers.namen[idx]).pack()
+            if labels:
+                tk.Label(player_frame).place()
+
+    def update(self):
+        if hasattr(self, 'frame_bench'):
+            self.frame_bench.destroy()
+        self.frame_bench = tk.Frame(self.master)
+        self.tiles(BANK, self.frame_bench, labels=True)
+        self.frame_absent = tk.Frame(self.master) # the old frame was never destroyed
+        self.tiles(AFWEZIG, self.frame_absent, labels=False)
+
+
+class Pooled:
+    # The current update_bench_names and update_absent_names
+    def __init__(self, spelers, master):
+        self.spelers = spelers
+        self.bench = tegels.Tegels(master, font=None, breedte=60, hoogte=lambda n: int(np.clip(27 // n, 1, 3)), select=print)
+        self.absent = tegels.Tegels(master, font=None, breedte=30, hoogte=lambda n: 2 if n < 13 else 1, select=print, met_label=False)
+        self.update()
+
+    def update(self):
+        namen = lambda status: [self.spelers.namen[idx] for idx in self.spelers.op_volgorde(status)]
+        self.bench.toon(namen(BANK))
+        self.absent.toon(namen(AFWEZIG))
+
+
+def dag(variant, n_spelers:int, n_moves:int, seed:int=0) -> tuple:
+    # Move random players between the bench and the absent list; returns per move the widget calls and the time
+    rng = np.random.default_rng(seed)
+    spelers = PlayerState.from_frame(roster(n_spelers))
+    Widget.gemaakt = Widget.levend = Widget.calls = 0
+    scherm = variant(spelers, Widget())
+    calls, tijden = [], []
+    for _ in range(n_moves):
+        if spelers.aantal(AFWEZIG) == 0 or (spelers.aantal(BANK) > 1 and rng.random() < .5):
+            spelers.naar_afwezig(spelers.speler_op(BANK, rng.integers(spelers.aantal(BANK))))
+        else:
+            spelers.naar_bank(spelers.speler_op(AFWEZIG, rng.integers(spelers.aantal(AFWEZIG))))
+        voor = Widget.calls
+        start = time.perf_counter()
+        scherm.update()
+        tijden.append(time.perf_counter() - start)
+        calls.append(Widget.calls - voor)
+    return Widget.gemaakt, Widget.levend, np.mean(calls), np.max(calls), 1e6 * np.median(tijden)
+
+
+if __name__ == '__main__':
+    n_moves = 2000 # a tournament day
+    print(f"{'spelers':>8} {'variant':>8} {'gemaakt':>9} {'levend':>8} {'calls/move':>11} {'max calls':>10} {'us/move':>9}")
+    for n_spelers in (12, 30, 100):
+        for naam, variant in (("rebuild", Rebuild), ("pooled", Pooled)):
+            gemaakt, levend, calls, max_calls, us = dag(variant, n_spelers, n_moves)
+            print(f"{n_spelers:>8} {naam:>8} {gemaakt:>9} {levend:>8} {calls:>11.1f} {max_calls:>10} {us:>9.1f}")
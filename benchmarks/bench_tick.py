@@ -0,0 +1,106 @@
+''' Benchmark of the dashboard tick: per-player loop versus the vectorized TickEngine.
+
+Counts the widget .config() calls per tick and the time per tick, with stand-in widgets instead of Tk.
+Run from the repository root with
+    python -m benchmarks.bench_tick
+'''
+import timeit
+import numpy as np
+
+from player_state import PlayerState, ACTIEF, BANK
+from display import TickEngine, health_to_colour, time_to_string
+
+
+time_ref = 4*60
+
+
+class Widget:
+    calls = 0
+    def config(self, **kwargs):
+        Widget.calls += 1
+
+
+def loop_tick(spelers, paused, now, field_buttons, field_labels, bench_buttons, bench_labels):
+    # The former Dashboard.update_time_features
+    for idx in range(len(spelers)):
+        spot = spelers.spot[idx]
+        t = now - spelers.laatste_wijziging[idx]
+        if spelers.status[idx] == ACTIEF:
+            if t == np.inf:
+                health = 1
+                text = ''
+            elif paused:
+                health = 1 - 1 / (1 + (t/time_ref)**2)
+                if spelers.richttijd[idx] > 0:
+                    text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(spelers.gespeeld[idx])} ({spelers.gespeeld_perc[idx]:.0%})'
+                else:
+                    text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(spelers.gespeeld[idx])}'
+            else:
+                health = 1 / (1 + (t/time_ref)**2)
+                text = time_to_string(t)
+            colour = health_to_colour(health=health, low=144, high=238)
+            field_buttons[spot].config(bg=colour)
+            field_labels[spot].config(bg=colour, text=text)
+        elif spelers.status[idx] == BANK:
+            health = 1 - 1 / (1 + (t/time_ref)**2)
+            if t == np.inf:
+                text = ''
+            else:
+                if spelers.richttijd[idx] > 0:
+                    text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(spelers.gespeeld[idx])} ({spelers.gespeeld_perc[idx]:.0%})'
+                else:
+                    text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(spelers.gespeeld[idx])}'
+            colour = health_to_colour(health=health, low=200, high=238)
+            bench_buttons[spot].config(bg=colour)
+            bench_labels[spot].config(bg=colour, text=text)
+
+
+def engine_tick(engine, spelers, paused, now, field_buttons, field_labels, bench_buttons, bench_labels):
+    # The current Dashboard.update_time_features
+    wijzigingen = engine.tick(spelers, paused=paused, now=now)
+    for status, buttons, labels in ((ACTIEF, field_buttons, field_labels), (BANK, bench_buttons, bench_labels)):
+        for spot, colour, text in wijzigingen[status]:
+            if colour is None:
+                labels[spot].config(text=text)
+            else:
+                buttons[spot].config(bg=colour)
+                if text is None:
+                    labels[spot].config(bg=colour)
+                else:
+                    labels[spot].config(bg=colour, text=text)
+
+
+def spelers_midden_in_wedstrijd(n:int, half_rested:bool):
+    # A match that has been running for 20 minutes; half of the bench has played before.
+    spelers = PlayerState(namen=[f'Speler{i+1:02d}' for i in range(n)], richttijd=np.full(n, 20.0))
+    spelers.unpause(0.0)
+    for k in range(n - 5 if half_rested else 0):
+        if k % 2 == 0:
+            spelers.wissel(uit=spelers.speler_op(ACTIEF, 0), in_=spelers.speler_op(BANK, n - 6), tijdstip=10.0*(k+1), running=True)
+    return spelers
+
+
+def bench(n:int, paused:bool, ticks:int=60):
+    spelers = spelers_midden_in_wedstrijd(n, half_rested=True)
+    if paused:
+        spelers.pause(1200.0)
+    widgets = [[Widget() for _ in range(n)] for _ in range(4)]
+    engine = TickEngine(time_ref=time_ref)
+
+    resultaten = {}
+    for naam, tick in (("loop", lambda now: loop_tick(spelers, paused, now, *widgets)),
+                       ("TickEngine", lambda now: engine_tick(engine, spelers, paused, now, *widgets))):
+        tick(1200.0) # first tick fills all tiles
+        Widget.calls = 0
+        tijden = [timeit.timeit(lambda: tick(1201.0 + s), number=1) for s in range(ticks)]
+        resultaten[naam] = {"calls_per_tick": Widget.calls / ticks, "us_per_tick": 1e6*np.median(tijden)}
+    return resultaten
+
+
+if __name__ == '__main__':
+    print(f"{'spelers':>8} {'gepauzeerd':>11} {'loop calls':>11} {'engine calls':>13} {'loop [µs]':>10} {'engine [µs]':>12}")
+    for n in (18, 40, 100):
+        for paused in (False, True):
+            r = bench(n, paused)
+            print(f"{n:>8} {str(paused):>11} {r['loop']['calls_per_tick']:>11.1f} {r['TickEngine']['calls_per_tick']:>13.1f} "
+                  f"{r['loop']['us_per_tick']:>10.0f} {r['TickEngine']['us_per_tick']:>12.0f}")
@@ -0,0 +1,184 @@
+''' Headless benchmark suite of the match engine and the report pipeline, with results in JSON.
+
+Times Wedstrijd.wissel, pause, unpause, order_bench and report (up to the creation of the figure, nothing is
+drawn) and verwijder_keeper_outliers, for synthetic rosters and histories of growing size. Needs neither Tk
+nor win32api. Run from the repository root with
+    python -m benchmarks.suite --out resultaten.json
+and compare with the results of another commit with
+    python -m benchmarks.suite --out nieuw.json --compare resultaten.json
+which exits with status 1 when a benchmark got slower than --tolerantie. The times are compared relative to
+a calibration workload that is timed in both runs, so that a slower or busier machine is not a regression.
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from event_store import EventStore
+from player_state import ACTIEF, BANK
+from report import verwijder_keeper_outliers
+from wedstrijd import Wedstrijd
+from benchmarks.synthetic import roster, synthetic_history
+
+
+SPELERS = (10, 30, 100, 200)
+EVENTS = (10, 1000, 10_000, 100_000)
+
+
+def wedstrijd_met_history(n_spelers:int, n_events:int) -> Wedstrijd:
+    ''' A running match of n_spelers players that already has about n_events events. '''
+    wedstrijd = Wedstrijd(roster(n_spelers), clear_history=False, store=EventStore(path=None, text_log=None))
+    history = synthetic_history(n_spelers=n_spelers, n_wissels=max(1, n_events - 2*(n_events // 31) - 2), seed=n_spelers)
+    wedstrijd.logging = False
+    for item in history[:-1]: # stays running
+        if item.type == 'unpause':
+            wedstrijd.unpause(item.time)
+        elif item.type == 'pause':
+            wedstrijd.pause(item.time)
+        elif item.type == 'wissel':
+            wedstrijd.wissel(item.speler_uit, item.speler_in, item.time)
+    wedstrijd.logging = True
+    return wedstrijd
+
+def meet(functie, herhalingen:int, voor=None) -> list:
+    # Time of every call of functie, in seconds; voor() runs before every call, untimed
+    tijden = []
+    for _ in range(herhalingen):
+        if voor is not None:
+            voor()
+        start = time.perf_counter()
+        functie()
+        tijden.append(time.perf_counter() - start)
+    return tijden
+
+
+def bench_engine(wedstrijd:Wedstrijd, herhalingen:int) -> dict:
+    spelers = wedstrijd.spelers
+    tijdstip = [wedstrijd.history[-1].time]
+    def volgende():
+        tijdstip[0] += 1.0
+        return tijdstip[0]
+
+    def wissel():
+        uit = spelers.namen[spelers.speler_op(ACTIEF, 0)]
+        in_ = spelers.namen[spelers.speler_op(BANK, 0)]
+        wedstrijd.wissel(uit, in_, volgende())
+
+    resultaten = {"wissel": meet(wissel, herhalingen), "order_bench": meet(wedstrijd.order_bench, herhalingen)}
+    wedstrijd.store.flush()
+    pauses, unpauses = [], []
+    for _ in range(herhalingen):
+        pauses += meet(lambda: wedstrijd.pause(volgende()), 1)
+        unpauses += meet(lambda: wedstrijd.unpause(volgende()), 1)
+        wedstrijd.store.flush() # the checkpoint of the pause is written outside of the timing
+    resultaten["pause"], resultaten["unpause"] = pauses, unpauses
+    return resultaten
+
+def bench_report(wedstrijd:Wedstrijd, herhalingen:int) -> dict:
+    import matplotlib.pyplot as plt
+    wedstrijd.logging = False
+    wedstrijd.pause(wedstrijd.history[-1].time + 1.0)
+    report = meet(lambda: plt.close(wedstrijd.report()), herhalingen)
+
+    # The frame as teken_overzicht hands it to verwijder_keeper_outliers
+    beurten = wedstrijd.stints.gesloten()
+    spelers = wedstrijd.spelers.to_frame()
+    spelers = spelers.loc[spelers['Gespeeld'] > 0].copy()
+    spelers['Speelbeurten_begin'] = [list(beurten.begin[beurten.speler == speler]) for speler in spelers.index]
+    spelers['Speelbeurten_einde'] = [list(beurten.einde[beurten.speler == speler]) for speler in spelers.index]
+    spelers['Speelduren'] = [np.array(einde) - np.array(begin) for begin, einde in zip(spelers['Speelbeurten_begin'], spelers['Speelbeurten_einde'])]
+    kopie = [None]
+    outliers = meet(lambda: verwijder_keeper_outliers(kopie[0]), herhalingen, voor=lambda: kopie.__setitem__(0, spelers.copy(deep=True)))
+    return {"report": report, "verwijder_keeper_outliers": outliers}
+
+
+def samenvatting(naam:str, n_spelers:int, n_events:int, tijden:list) -> dict:
+    tijden = 1e6 * np.asarray(tijden)
+    return {"naam": naam, "spelers": n_spelers, "events": n_events, "herhalingen": len(tijden),
+            "mediaan_us": float(np.median(tijden)), "min_us": float(np.min(tijden)), "p90_us": float(np.percentile(tijden, 90))}
+
+def kalibratie(herhalingen:int=200) -> float:
+    # Fastest run of a fixed mix of Python and small NumPy operations, in µs: the speed of the machine
+    x = np.arange(30.0)
+    def werk():
+        for _ in range(20):
+            y = np.argsort(x[::-1], kind='stable')
+            x[y[:5]] += 0.0
+            sum(float(v) for v in x[:10])
+    return 1e6 * min(meet(werk, herhalingen))
+
+def omgeving() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "tijdstip": time.time(), "python": sys.version.split()[0], "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+def run(spelers=SPELERS, events=EVENTS, herhalingen:int=200, report_herhalingen:int=3) -> list:
+    resultaten = []
+    for n_spelers in spelers:
+        for n_events in events:
+            wedstrijd = wedstrijd_met_history(n_spelers, n_events)
+            gemeten = bench_engine(wedstrijd, herhalingen)
+            gemeten.update(bench_report(wedstrijd, report_herhalingen))
+            wedstrijd.store.close()
+            for naam, tijden in gemeten.items():
+                resultaten.append(samenvatting(naam, n_spelers, n_events, tijden))
+                print(f"{naam:>26} {n_spelers:>4} spelers {n_events:>7} events {resultaten[-1]['mediaan_us']:>12.1f} µs", flush=True)
+    return resultaten
+
+def vergelijk(nieuw:dict, oud:dict, tolerantie:float) -> bool:
+    ''' Prints the ratio of the fastest runs per benchmark, which is the least sensitive to a busy machine,
+    relative to the calibration of each run; returns False if one got slower than tolerantie. '''
+    oude = {(r["naam"], r["spelers"], r["events"]): r for r in oud["resultaten"]}
+    schaal = oud["kalibratie_us"] / nieuw["kalibratie_us"]
+    in_orde = True
+    print(f"{'benchmark':>26} {'spelers':>7} {'events':>7} {'oud [µs]':>12} {'nieuw [µs]':>12} {'ratio':>6}")
+    for r in nieuw["resultaten"]:
+        sleutel = (r["naam"], r["spelers"], r["events"])
+        if sleutel not in oude:
+            continue
+        ratio = schaal * r["min_us"] / oude[sleutel]["min_us"]
+        trager = ratio > 1 + tolerantie
+        in_orde &= not trager
+        print(f"{r['naam']:>26} {r['spelers']:>7} {r['events']:>7} {oude[sleutel]['min_us']:>12.1f} {r['min_us']:>12.1f} {ratio:>6.2f}{'  TRAGER' if trager else ''}")
+    return in_orde
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of the match engine and the report pipeline.")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--spelers", type=int, nargs="+", default=list(SPELERS))
+    parser.add_argument("--events", type=int, nargs="+", default=list(EVENTS))
+    parser.add_argument("--herhalingen", type=int, default=200)
+    parser.add_argument("--compare", help="results of an earlier run")
+    parser.add_argument("--tolerantie", type=float, default=0.5, help="allowed relative slowdown of the fastest run")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    compare = os.path.abspath(args.compare) if args.compare else None
+    resultaten = {"omgeving": omgeving()}
+    repository = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder) # the checkpoints of the engine are written here
+        try:
+            voor = kalibratie()
+            resultaten["resultaten"] = run(args.spelers, args.events, args.herhalingen)
+            resultaten["kalibratie_us"] = min(voor, kalibratie())
+        finally:
+            os.chdir(repository)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(resultaten, file, indent=1)
+
+    if compare is not None:
+        with open(compare, encoding="utf-8") as file:
+            sys.exit(0 if vergelijk(resultaten, json.load(file), args.tolerantie) else 1)
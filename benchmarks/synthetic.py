@@ -0,0 +1,36 @@
+''' Synthetic rosters and match histories for the benchmarks. '''
+import numpy as np
+import pandas as pd
+
+from history import HistoryItem
+
+
+def roster(n:int, richttijd:float=20.0):
+    namen = [f'Speler{i+1:02d}' for i in range(n)]
+    return pd.DataFrame({"Richttijd": np.full(n, richttijd)}, index=pd.Index(namen, name="Naam"))
+
+
+def synthetic_history(n_spelers:int=12, n_wissels:int=60, seed:int=0, start:float=1.7e9, pauze_elke:int=30) -> list:
+    ''' A match with random substitutions every minute on average and a pause every pauze_elke substitutions. '''
+    rng = np.random.default_rng(seed)
+    namen = list(roster(n_spelers).index)
+    actief, bank = namen[:5], namen[5:]
+    t = start
+    history = [HistoryItem(type='unpause', time=t, spelers=list(actief))]
+    for k in range(n_wissels):
+        t += rng.exponential(60) + 1
+        i, j = rng.integers(5), rng.integers(len(bank))
+        history.append(HistoryItem(type='wissel', time=t, speler_uit=actief[i], speler_in=bank[j]))
+        actief[i], bank[j] = bank[j], actief[i]
+        if pauze_elke and (k + 1) % pauze_elke == 0 and k + 1 < n_wissels:
+            t += 1
+            history.append(HistoryItem(type='pause', time=t))
+            t += 600
+            history.append(HistoryItem(type='unpause', time=t, spelers=list(actief)))
+    history.append(HistoryItem(type='pause', time=t + 30))
+    return history
+
+
+def write_history(history, path:str):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(''.join(item.to_line() for item in history))
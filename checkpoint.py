@@ -0,0 +1,123 @@
+''' Crash-safe checkpoints of a running match.
+
+A checkpoint holds the complete player state, the running time and the size of history.txt at the moment
+it was written. The history itself goes to a second file next to it (checkpoint_history.jsonl), in compact
+form, and a checkpoint only appends the items since the previous one: a 'k' row cuts the history back
+when substitutions that were already written were undone. The checkpoint records how far that file
+reaches, so rows appended after it are ignored. Taking a checkpoint costs the caller O(players + new
+items); the JSON is made and written by the writer thread of the EventStore, in order with the logged
+events. Resuming loads the checkpoint and only replays the lines that were logged after it; the history
+before it is only read when the report or the stints ask for it (Wedstrijd.laad). '''
+import json
+import os
+
+from history import HistoryItem, HISTORY_FILE
+
+
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_INTERVAL = 20 # number of logged events between two checkpoints
+
+
+def compact_item(item:HistoryItem, index:dict) -> list:
+    # Player names are stored as their index in the roster
+    if item.type == 'unpause':
+        return ['u', item.time, [index[speler] for speler in item.spelers]]
+    elif item.type == 'pause':
+        return ['p', item.time]
+    elif item.type == 'wissel':
+        return ['w', item.time, index[item.speler_uit], index[item.speler_in]]
+    elif item.type == 'lijnwissel':
+        return ['l', item.time, [index[speler] for speler in item.speler_uit], [index[speler] for speler in item.speler_in]]
+
+def expand_item(row:list, namen:list) -> HistoryItem:
+    if row[0] == 'u':
+        return HistoryItem(type='unpause', time=row[1], spelers=[namen[i] for i in row[2]])
+    elif row[0] == 'p':
+        return HistoryItem(type='pause', time=row[1])
+    elif row[0] == 'w':
+        return HistoryItem(type='wissel', time=row[1], speler_uit=namen[row[2]], speler_in=namen[row[3]])
+    elif row[0] == 'l':
+        return HistoryItem(type='lijnwissel', time=row[1], speler_uit=[namen[i] for i in row[2]], speler_in=[namen[i] for i in row[3]])
+
+
+def history_path(path:str=CHECKPOINT_FILE) -> str:
+    # The history of the checkpoint in path, e.g. checkpoint_veld1_history.jsonl for checkpoint_veld1.json
+    return os.path.splitext(path)[0] + "_history.jsonl"
+
+
+def checkpoint_data(wedstrijd, kap, nieuw:list, lengte:int) -> dict:
+    # Taken on the caller's thread: copies of the player arrays and the history items that are not in the
+    # history file yet (nieuw), to be appended after cutting the history back to kap items (None: no cut);
+    # lengte is the length of the history after that
+    return {"paused": wedstrijd.paused,
+            "wedstrijd_id": wedstrijd.store.wedstrijd_id,
+            "path": wedstrijd.store.path, # the event database, None without one
+            "seq": wedstrijd.store.seq, # the first event in the database that is not in the checkpoint
+            "text_log": wedstrijd.store.text_log,
+            "speeltijd": wedstrijd.speeltijd,
+            "sinds": wedstrijd.sinds,
+            "spelers": (wedstrijd.spelers, wedstrijd.spelers.snapshot()),
+            "lengte": lengte,
+            "kap": kap,
+            "nieuw": nieuw}
+
+def save_checkpoint(data:dict, path:str=CHECKPOINT_FILE, log_path:str=HISTORY_FILE):
+    # Called by the writer thread of the EventStore, after the events that precede the checkpoint were logged
+    data["log_offset"] = os.path.getsize(log_path) if (log_path is not None and os.path.exists(log_path)) else None
+    spelers, snapshot = data["spelers"]
+    data["spelers"] = spelers.to_dict(snapshot)
+
+    # Append the new part of the history and fsync it before the checkpoint that refers to it is written
+    kap, nieuw = data.pop("kap"), data.pop("nieuw")
+    rijen = ([['k', kap]] if kap else []) + [compact_item(item, spelers.index) for item in nieuw]
+    bestand = history_path(path)
+    if kap == 0: # a new match: start a new file, next to the one the current checkpoint still uses
+        with open(bestand + ".tmp", "wb") as file:
+            file.write(''.join(json.dumps(rij, separators=(',', ':')) + "\n" for rij in rijen).encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+            data["history_offset"] = file.tell()
+        os.replace(bestand + ".tmp", bestand)
+    elif rijen:
+        with open(bestand, "ab") as file:
+            file.write(''.join(json.dumps(rij, separators=(',', ':')) + "\n" for rij in rijen).encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+            data["history_offset"] = file.tell()
+    else:
+        data["history_offset"] = os.path.getsize(bestand) if os.path.exists(bestand) else 0
+
+    # Write to a temporary file first, so that a crash never leaves a half-written checkpoint behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(',', ':'))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path:str=CHECKPOINT_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data
+
+def load_history(path:str, offset:int, namen:list) -> list:
+    ''' The history of the checkpoint in path: the rows of its history file up to offset. '''
+    history = []
+    with open(history_path(path), "rb") as file:
+        for regel in file.read(offset).splitlines():
+            rij = json.loads(regel)
+            if rij[0] == 'k':
+                del history[rij[1]:]
+            else:
+                history.append(expand_item(rij, namen))
+    return history
+
+def remove_checkpoint(path:str=CHECKPOINT_FILE):
+    for bestand in (path, history_path(path)):
+        if os.path.exists(bestand):
+            os.remove(bestand)
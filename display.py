@@ -0,0 +1,109 @@
+import numpy as np
+
+from player_state import ACTIEF, BANK
+
+
+# Colour ranges of the player tiles: (low, high) per status
+KLEURBEREIK = {ACTIEF: (144, 238), BANK: (200, 238)}
+
+# Label modes
+LEEG, SPEELTIJD, RECUPERATIE, RECUPERATIE_PERC = 0, 1, 2, 3
+
+
+def health_to_colour(health:float, low:str, high:str) -> str:
+    rgb = low + (high - low) * np.array([2*(1-health), 2*health, 0])
+    rgb = np.clip(np.asarray(rgb, dtype=int), low, high)
+    hex = f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
+    return hex
+
+def colour_table(low:int, high:int, levels:int=256) -> list:
+    # Precomputed health_to_colour for health = 0, 1/(levels-1), ..., 1
+    return [health_to_colour(health=health, low=low, high=high) for health in np.linspace(0, 1, levels)]
+
+def health(spelers, paused:bool, now:float, time_ref:float) -> np.ndarray:
+    # Per player: 1/(1+(t/time_ref)^2) for the active players while running (t is the length of the stint),
+    # 1 minus that for everybody else (t is the recuperation time)
+    t = now - spelers.laatste_wijziging
+    vermoeidheid = 1 / (1 + (t/time_ref)**2)
+    health = 1 - vermoeidheid
+    if not paused:
+        actief = (spelers.status == ACTIEF) & np.isfinite(t)
+        health[actief] = vermoeidheid[actief]
+    return health
+
+def time_to_string(t:float) -> str:
+    # Convert time in seconds to a string in the format mm:ss (without leading zero), as the minutes of the hour
+    minuten, seconden = divmod(round(float(t)) % 3600, 60)
+    return f"{minuten}:{seconden:02d}"
+
+
+class TickEngine:
+    ''' Computes the colours and label texts of all player tiles in one vectorized pass.
+
+    The state shown by every tile is remembered per (status, spot), so that tick() only returns the
+    tiles whose colour or text actually changed since the previous tick. '''
+
+    def __init__(self, time_ref:float, levels:int=256):
+        self.time_ref = time_ref
+        self.levels = levels
+        self.kleuren = {status: colour_table(low, high, levels) for status, (low, high) in KLEURBEREIK.items()}
+        self.getoond = {}
+
+    def invalidate(self, status:int=None):
+        # Forget what is shown, e.g. after the tiles were rebuilt
+        if status is None:
+            self.getoond.clear()
+        else:
+            self.getoond.pop(status, None)
+
+    def health(self, spelers, paused:bool, now:float) -> np.ndarray:
+        return health(spelers, paused, now, self.time_ref)
+
+    def tick(self, spelers, paused:bool, now:float) -> dict:
+        ''' Returns, per status, a list of (spot, colour, text) for the tiles that need to be updated.
+        colour or text is None when it did not change. '''
+        t = now - spelers.laatste_wijziging
+        eindig = np.isfinite(t)
+        kleur_idx = np.rint(self.health(spelers, paused, now) * (self.levels - 1)).astype(np.int64)
+
+        # Everything the label text depends on, in whole seconds and percent
+        modus = np.where(spelers.richttijd > 0, RECUPERATIE_PERC, RECUPERATIE)
+        if not paused:
+            modus[spelers.status == ACTIEF] = SPEELTIJD
+        modus[~eindig] = LEEG
+        # Whole seconds of the clock: all timers advance together when now passes a whole second
+        t_sec = np.where(eindig, np.floor(now) - np.floor(spelers.laatste_wijziging), 0).astype(np.int64)
+        gespeeld_sec = np.round(spelers.gespeeld).astype(np.int64)
+        perc = np.round(100*spelers.gespeeld_perc).astype(np.int64)
+        sleutel = np.stack((kleur_idx, modus, t_sec, gespeeld_sec, perc), axis=1)
+
+        wijzigingen = {}
+        for status in (ACTIEF, BANK):
+            idx = spelers.op_volgorde(status)
+            nieuw = sleutel[idx]
+            oud = self.getoond.get(status)
+            if oud is None or len(oud) != len(nieuw):
+                kleur_gewijzigd = np.ones(len(nieuw), dtype=bool)
+                tekst_gewijzigd = np.ones(len(nieuw), dtype=bool)
+            else:
+                kleur_gewijzigd = nieuw[:, 0] != oud[:, 0]
+                tekst_gewijzigd = np.any(nieuw[:, 1:] != oud[:, 1:], axis=1)
+            self.getoond[status] = nieuw
+
+            kleuren = self.kleuren[status]
+            wijzigingen[status] = [(spelers.spot[idx[k]],
+                                    kleuren[nieuw[k, 0]] if kleur_gewijzigd[k] else None,
+                                    self.text(*nieuw[k, 1:]) if tekst_gewijzigd[k] else None)
+                                   for k in np.flatnonzero(kleur_gewijzigd | tekst_gewijzigd)]
+        return wijzigingen
+
+    @staticmethod
+    def text(modus:int, t_sec:int, gespeeld_sec:int, perc:int) -> str:
+        if modus == LEEG:
+            return ''
+        elif modus == SPEELTIJD:
+            return time_to_string(t_sec)
+        elif modus == RECUPERATIE_PERC:
+            return f'Recuperatie: {time_to_string(t_sec)}\nGespeeld: {time_to_string(gespeeld_sec)} ({perc}%)'
+        else:
+            return f'Recuperatie: {time_to_string(t_sec)}\nGespeeld: {time_to_string(gespeeld_sec)}'
@@ -0,0 +1,340 @@
+''' How fairly the playing time is divided during a match, kept up to date event by event.
+
+Gespeeld% (the time played over the Richttijd) of a player grows linearly while they are on the field and
+stands still otherwise, so between two events it is a linear function of the time for every player.
+Eerlijkheid keeps
+
+- the sums of these functions and of their squares, from which the mean and the spread (standard deviation)
+  of Gespeeld% follow at any moment;
+- the players in the order of their Gespeeld%, and from it the sum of the absolute differences of all pairs
+  of players, for the Gini coefficient: sum_k (2k - n + 1) x_k over the sorted Gespeeld% x_0 <= ... <= x_n-1.
+  The order only changes when two neighbours cross; those moments are kept in a heap and handled when the
+  clock passes them, a crossing swaps the two and costs O(log n);
+- which players are at risk: their Gespeeld% at the end of the match, at the pace of the match so far,
+  falls short of 1 - TOLERANTIE. That is Gespeeld% below a threshold that grows with the running time, and
+  the crossings of the threshold are kept in the same heap.
+
+An entry of the heap is outdated when what it was planned for changed; it is skipped when it comes up, and
+the heap is rebuilt without them when they outnumber the valid entries. A substitution costs O(log n) per
+player it changes, plus the players it moves past in the order (an undo); a move to or from the absent
+players O(n); a pause, an unpause and a resume start over, O(n log n). A tick costs O(1) plus the crossings
+since the previous tick, of which a match has only a handful. Only the players with a Richttijd that are
+not absent count. '''
+import heapq
+import math
+import numpy as np
+
+from player_state import ACTIEF, AFWEZIG
+
+
+WEDSTRIJDDUUR = 2*20*60 # s of running time of a match, for the projection
+TOLERANTIE = 0.1 # a player is at risk when the projected Gespeeld% is below 1 - TOLERANTIE
+MIN_SPEELTIJD = 5*60 # s of running time before anyone is flagged; before it, the pace says little
+
+# Kinds of entries in the heap
+_PAAR, _DREMPEL, _EINDE = 0, 1, 2
+
+
+class Eerlijkheid:
+    def __init__(self, spelers, duur:float=WEDSTRIJDDUUR, tolerantie:float=TOLERANTIE):
+        self.duur = duur
+        self.tolerantie = tolerantie
+        with np.errstate(divide='ignore'):
+            self.gewicht = np.where(spelers.richttijd > 0, 1 / (60*spelers.richttijd), 0.0).tolist() # Gespeeld% per second played
+        self.oorsprong = 0.0
+        self.tau = 0.0
+        self.running = False
+        self.speeltijd = 0.0 # the running time at the origin
+        self.herbouw(spelers, running=False, tijd=0.0)
+
+    def herbouw(self, spelers, running:bool, tijd:float, speeltijd:float=None):
+        ''' Start over from the state of spelers at tijd, e.g. after a pause; speeltijd is the running time of the
+        match at tijd (by default the running time so far). O(n log n) for n players. '''
+        if speeltijd is None:
+            speeltijd = self.speeltijd_op(tijd - self.oorsprong)
+        # Times are kept as seconds since the origin, so that the numbers stay small
+        self.oorsprong = tijd
+        self.tau = 0.0
+        self.running = running
+        self.speeltijd = speeltijd
+        self.voorbij = speeltijd >= self.duur # the running time passed the length of the match
+        self.heap = []
+        self.versie = 0
+        self.gepland = {} # (kind, key) -> the version of its valid entry in the heap
+        self.verouderd = 0 # entries in the heap that are no longer valid
+
+        n = len(self.gewicht)
+        self.telt = [False] * n
+        self.b = [0.0] * n # Gespeeld% at the origin
+        self.v = [0.0] * n # Gespeeld% per second
+        self.s0 = 0 # players that count
+        self.s_b = self.s_v = self.s_bb = self.s_bv = self.s_vv = 0.0
+        self.risico = {} # player -> sign of Gespeeld% - threshold
+        self.in_gevaar = set()
+
+        idx = list(range(n))
+        for i in idx:
+            self.zet_speler(spelers, i)
+        # The order of Gespeeld%, on equal Gespeeld% the slowest first, so that no neighbours cross right away
+        self.orde = sorted((i for i in idx if self.telt[i]), key=lambda i: (self.b[i], self.v[i]))
+        self.plek = [-1] * n
+        for k, i in enumerate(self.orde):
+            self.plek[i] = k
+        # The sum of the absolute differences of the pairs: d_b + d_v * tau
+        m = len(self.orde)
+        self.d_b = sum((2*k - m + 1) * self.b[i] for k, i in enumerate(self.orde))
+        self.d_v = sum((2*k - m + 1) * self.v[i] for k, i in enumerate(self.orde))
+        self.herplan(self.orde)
+        self.plan_einde()
+        for i in idx:
+            self.voeg_risico_toe(i)
+
+    def bijwerken(self, spelers, idx, tijd:float, running:bool):
+        ''' The players idx changed at tijd: a substitution, an undo, or a move to or from the absent players. A
+        pause or an unpause (running changes) changes all slopes and starts over, a few times per match. '''
+        if running != self.running:
+            self.herbouw(spelers, running=running, tijd=tijd, speeltijd=self.speeltijd_op(tijd - self.oorsprong))
+            return
+        self.tot(tijd - self.oorsprong)
+        idx = list(dict.fromkeys(int(i) for i in idx))
+        buren = set() # the players whose pair with the next one in the order changed
+        for i in idx:
+            self.verwijder_risico(i)
+            telde = self.telt[i]
+            if telde:
+                b, v = self.b[i], self.v[i]
+                self.verwijder_speler(i)
+            self.zet_speler(spelers, i)
+            if telde and self.telt[i]:
+                # Gespeeld% and its slope change in place, then the player moves to their place in the order
+                c = 2*self.plek[i] - len(self.orde) + 1
+                self.d_b += c * (self.b[i] - b)
+                self.d_v += c * (self.v[i] - v)
+                self.schuif(i, buren)
+            elif telde:
+                self.b[i], self.v[i] = b, v
+                self.uit_orde(i, buren)
+                self.b[i] = self.v[i] = 0.0
+            elif self.telt[i]:
+                self.in_orde(i, buren)
+        self.herplan(buren)
+        for i in idx:
+            self.voeg_risico_toe(i)
+
+    # The players
+    def zet_speler(self, spelers, i:int):
+        self.telt[i] = bool(self.gewicht[i] > 0 and spelers.status[i] != AFWEZIG)
+        if not self.telt[i]:
+            self.b[i] = self.v[i] = 0.0
+            return
+        gespeeld = float(spelers.gespeeld[i])
+        speelt = self.running and spelers.status[i] == ACTIEF
+        self.v[i] = self.gewicht[i] if speelt else 0.0
+        if speelt:
+            gespeeld += self.oorsprong + self.tau - float(spelers.laatste_wijziging[i])
+        self.b[i] = gespeeld * self.gewicht[i] - self.v[i] * self.tau
+        b, v = self.b[i], self.v[i]
+        self.s0 += 1
+        self.s_b += b; self.s_v += v; self.s_bb += b*b; self.s_bv += b*v; self.s_vv += v*v
+
+    def verwijder_speler(self, i:int):
+        if self.telt[i]:
+            b, v = self.b[i], self.v[i]
+            self.s0 -= 1
+            self.s_b -= b; self.s_v -= v; self.s_bb -= b*b; self.s_bv -= b*v; self.s_vv -= v*v
+            self.telt[i] = False
+
+    # The order of Gespeeld%, for the Gini coefficient
+    def sleutel(self, i:int) -> tuple:
+        return self.b[i] + self.v[i] * self.tau, self.v[i]
+
+    def ruil(self, k:int, buren:set):
+        # Swap the neighbours at k and k + 1; the pair moves from the coefficients c, c + 2 to c + 2, c
+        i, j = self.orde[k], self.orde[k + 1]
+        self.d_b += 2 * (self.b[i] - self.b[j])
+        self.d_v += 2 * (self.v[i] - self.v[j])
+        self.orde[k], self.orde[k + 1] = j, i
+        self.plek[i], self.plek[j] = k + 1, k
+        buren.update(self.orde[max(k - 1, 0):k + 2])
+
+    def schuif(self, i:int, buren:set):
+        # Move player i down or up the order, past the players it passed
+        sleutel = self.sleutel(i)
+        k = self.plek[i]
+        if k > 0:
+            buren.add(self.orde[k - 1])
+        buren.add(i)
+        while k > 0 and self.sleutel(self.orde[k - 1]) > sleutel:
+            self.ruil(k - 1, buren)
+            k -= 1
+        while k + 1 < len(self.orde) and self.sleutel(self.orde[k + 1]) < sleutel:
+            self.ruil(k, buren)
+            k += 1
+
+    def afstand(self, i:int) -> tuple:
+        # The sum of the absolute differences of player i with the others in the order, as b and v. O(n)
+        d_b = d_v = 0.0
+        for k, j in enumerate(self.orde):
+            if j == i:
+                continue
+            teken = 1 if k < self.plek[i] else -1
+            d_b += teken * (self.b[i] - self.b[j])
+            d_v += teken * (self.v[i] - self.v[j])
+        return d_b, d_v
+
+    def uit_orde(self, i:int, buren:set):
+        d_b, d_v = self.afstand(i)
+        self.d_b -= d_b
+        self.d_v -= d_v
+        k = self.plek[i]
+        del self.orde[k]
+        for j in self.orde[k:]:
+            self.plek[j] -= 1
+        self.plek[i] = -1
+        self.schrap(_PAAR, i)
+        buren.discard(i)
+        if k > 0:
+            buren.add(self.orde[k - 1])
+
+    def in_orde(self, i:int, buren:set):
+        sleutel = self.sleutel(i)
+        k = 0
+        while k < len(self.orde) and self.sleutel(self.orde[k]) <= sleutel:
+            k += 1
+        self.orde.insert(k, i)
+        for plek, j in enumerate(self.orde[k:], start=k):
+            self.plek[j] = plek
+        d_b, d_v = self.afstand(i)
+        self.d_b += d_b
+        self.d_v += d_v
+        buren.update(self.orde[max(k - 1, 0):k + 1])
+
+    def herplan(self, spelers):
+        # Plan the crossing of every player in spelers with the next one in the order, if they approach
+        for i in spelers:
+            k = self.plek[i]
+            if k < 0:
+                continue
+            if k + 1 < len(self.orde):
+                j = self.orde[k + 1]
+                dv = self.v[i] - self.v[j]
+                if dv > 0:
+                    self.plan(_PAAR, i, (self.b[j] - self.b[i]) / dv)
+                    continue
+            self.schrap(_PAAR, i)
+
+    # The threshold of the players at risk
+    def drempel(self) -> tuple:
+        # The threshold as b + v * tau: (1 - tolerantie) * speeltijd / duur, up to 1 - tolerantie at the end
+        if self.voorbij:
+            return 1 - self.tolerantie, 0.0
+        factor = (1 - self.tolerantie) / self.duur
+        return factor * self.speeltijd, factor if self.running else 0.0
+
+    def voeg_risico_toe(self, i:int):
+        if not self.telt[i]:
+            return
+        drempel_b, drempel_v = self.drempel()
+        db, dv = self.b[i] - drempel_b, self.v[i] - drempel_v
+        teken = self.teken(db + dv * self.tau, dv)
+        self.risico[i] = teken
+        if teken < 0:
+            self.in_gevaar.add(i)
+        if teken * dv < 0:
+            self.plan(_DREMPEL, i, -db / dv)
+
+    def verwijder_risico(self, i:int):
+        self.risico.pop(i, None)
+        self.in_gevaar.discard(i)
+        self.schrap(_DREMPEL, i)
+
+    def plan_einde(self):
+        # The threshold stops growing when the running time reaches the length of the match
+        if self.running and not self.voorbij:
+            self.plan(_EINDE, 0, self.duur - self.speeltijd)
+
+    @staticmethod
+    def teken(waarde:float, helling:float) -> int:
+        # The sign of a difference, or of its slope when it is zero (the sign it is about to have)
+        if waarde > 0 or (waarde == 0 and helling >= 0):
+            return 1
+        return -1
+
+    # The heap
+    def plan(self, soort:int, sleutel:int, moment:float):
+        # An earlier entry for the same kind and key is outdated by the new one
+        self.versie += 1
+        if self.gepland.get((soort, sleutel)) is not None:
+            self.verouderd += 1
+        self.gepland[soort, sleutel] = self.versie
+        heapq.heappush(self.heap, (moment, soort, sleutel, self.versie))
+        self.opruimen()
+
+    def schrap(self, soort:int, sleutel:int):
+        if self.gepland.pop((soort, sleutel), None) is not None:
+            self.verouderd += 1
+            self.opruimen()
+
+    def opruimen(self):
+        # Rebuild the heap without the outdated entries once they outnumber the valid ones
+        if self.verouderd > len(self.gepland):
+            self.heap = [entry for entry in self.heap if self.gepland.get(entry[1:3]) == entry[3]]
+            heapq.heapify(self.heap)
+            self.verouderd = 0
+
+    # Time
+    def speeltijd_op(self, tau:float) -> float:
+        return self.speeltijd + (tau if self.running else 0.0)
+
+    def tot(self, tau:float):
+        # Handle the crossings up to tau
+        while self.heap and self.heap[0][0] <= tau:
+            moment, soort, sleutel, versie = heapq.heappop(self.heap)
+            if self.gepland.get((soort, sleutel)) != versie:
+                self.verouderd -= 1
+                continue
+            del self.gepland[soort, sleutel]
+            self.tau = max(self.tau, moment)
+            if soort == _PAAR:
+                buren = set()
+                self.ruil(self.plek[sleutel], buren)
+                self.herplan(buren)
+            elif soort == _DREMPEL:
+                self.risico[sleutel] = -self.risico[sleutel]
+                if self.risico[sleutel] < 0:
+                    self.in_gevaar.add(sleutel)
+                else:
+                    self.in_gevaar.discard(sleutel)
+            else:
+                self.voorbij = True
+                for i in list(self.risico):
+                    self.verwijder_risico(i)
+                for i in range(len(self.gewicht)):
+                    self.voeg_risico_toe(i)
+        self.tau = max(self.tau, tau)
+
+    # Queries
+    def stand(self, tijd:float) -> dict:
+        ''' The mean, the spread and the Gini coefficient of Gespeeld% at tijd, and the players at risk (their
+        indices). O(1), plus the crossings since the previous call. '''
+        tau = tijd - self.oorsprong
+        self.tot(tau)
+        if self.s0 == 0:
+            return {"gemiddeld": 0.0, "spreiding": 0.0, "gini": 0.0, "risico": []}
+        som = self.s_b + self.s_v * tau
+        kwadraten = self.s_bb + 2 * tau * self.s_bv + tau * tau * self.s_vv
+        gemiddeld = som / self.s0
+        verschillen = self.d_b + self.d_v * tau
+        return {"gemiddeld": gemiddeld,
+                "spreiding": math.sqrt(max(0.0, kwadraten / self.s0 - gemiddeld * gemiddeld)),
+                "gini": verschillen / (self.s0 * som) if som > 0 else 0.0,
+                "risico": sorted(self.in_gevaar) if self.speeltijd_op(tau) >= MIN_SPEELTIJD else []}
+
+    def projectie(self, tijd:float) -> np.ndarray:
+        ''' Per player, the Gespeeld% at the end of the match at the pace so far, minus 1; nan for the players
+        that do not count. O(n). '''
+        tau = tijd - self.oorsprong
+        gespeeld_perc = np.asarray(self.b) + np.asarray(self.v) * tau
+        speeltijd = self.speeltijd_op(tau)
+        factor = max(self.duur, speeltijd) / speeltijd if speeltijd > 0 else np.nan
+        return np.where(self.telt, gespeeld_perc * factor - 1, np.nan)
@@ -0,0 +1,229 @@
+''' Local event store: SQLite in WAL mode, written by a background thread.
+
+The dashboard only puts events on a queue. The writer thread takes everything that is waiting and
+commits it in one transaction (group commit), appends the same events to the optional history.txt export
+and runs queued jobs such as checkpoints in order with the events. All matches share one database, so a
+season's worth of substitutions is a single indexed query. An 'undo' event never changes the events before
+it: the event it undoes is listed in the table ongedaan, which the queries leave out. '''
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+
+from history import HistoryItem, HISTORY_FILE
+
+
+EVENT_DB = "wedstrijden.sqlite"
+MAX_BATCH = 256 # maximal number of events per transaction
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS wedstrijden (
+    id INTEGER PRIMARY KEY,
+    aangemaakt REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    wedstrijd INTEGER NOT NULL REFERENCES wedstrijden(id),
+    seq INTEGER NOT NULL,
+    tijd REAL NOT NULL,
+    type TEXT NOT NULL,
+    PRIMARY KEY (wedstrijd, seq)
+);
+CREATE TABLE IF NOT EXISTS event_spelers (
+    wedstrijd INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    speler TEXT NOT NULL,
+    rol TEXT NOT NULL, -- 'actief' (unpause), 'uit' or 'in' (wissel)
+    FOREIGN KEY (wedstrijd, seq) REFERENCES events(wedstrijd, seq)
+);
+CREATE TABLE IF NOT EXISTS ongedaan (
+    wedstrijd INTEGER NOT NULL,
+    seq INTEGER NOT NULL, -- the event that was undone
+    PRIMARY KEY (wedstrijd, seq)
+);
+CREATE INDEX IF NOT EXISTS events_tijd ON events(tijd);
+CREATE INDEX IF NOT EXISTS events_type ON events(type, tijd);
+CREATE INDEX IF NOT EXISTS event_spelers_event ON event_spelers(wedstrijd, seq);
+CREATE INDEX IF NOT EXISTS event_spelers_speler ON event_spelers(speler, rol);
+'''
+
+_STOP = object()
+
+
+def connect(path:str=EVENT_DB, bestaand:bool=False) -> sqlite3.Connection:
+    # With bestaand, the database must exist already: a match that is resumed never starts an empty one
+    if bestaand:
+        try:
+            connection = sqlite3.connect(f"file:{path}?mode=rw", uri=True, check_same_thread=False)
+        except sqlite3.OperationalError as fout:
+            raise FileNotFoundError(f"The event database {path} of the match cannot be opened: {fout}.") from fout
+    else:
+        connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class EventStore:
+    def __init__(self, path:str=EVENT_DB, text_log:str=HISTORY_FILE, wedstrijd_id:int=None):
+        ''' path=None disables the database and text_log=None disables the history.txt export. '''
+        self.path = path
+        self.text_log = text_log
+        self.seq = 0
+
+        self.connection = None
+        self.wedstrijd_id = wedstrijd_id
+        if path is not None:
+            self.connection = connect(path, bestaand=wedstrijd_id is not None)
+            if wedstrijd_id is None:
+                with self.connection:
+                    self.wedstrijd_id = self.connection.execute("INSERT INTO wedstrijden (aangemaakt) VALUES (?)", (time.time(),)).lastrowid
+            else:
+                # A resumed match continues the sequence numbers of its events
+                laatste = self.connection.execute("SELECT MAX(seq) FROM events WHERE wedstrijd = ?", (wedstrijd_id,)).fetchone()[0]
+                self.seq = laatste + 1 if laatste is not None else 0
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="EventStore", daemon=True)
+        self.thread.start()
+
+    def __deepcopy__(self, memo):
+        # Copies of a match share the store of the original
+        return self
+
+    def append(self, item:HistoryItem, ongedaan:int=None) -> int:
+        # Never blocks: the item is written by the writer thread. An 'undo' carries the sequence number of the
+        # event it undoes in ongedaan. Returns the sequence number of item.
+        seq = self.seq
+        self.queue.put((seq, item, ongedaan))
+        self.seq += 1
+        return seq
+
+    def submit(self, job):
+        ''' Run job() in the writer thread, after all events that were appended before. '''
+        self.queue.put(job)
+
+    def flush(self):
+        ''' Wait until everything that was queued is on disk. '''
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+        if self.connection is not None:
+            self.connection.close()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = []
+            for entry in batch:
+                if isinstance(entry, tuple):
+                    events.append(entry)
+                    continue
+                # Jobs and the stop signal see all events that were queued before them
+                self._write(events)
+                events = []
+                if entry is _STOP:
+                    for _ in batch:
+                        self.queue.task_done()
+                    return
+                try:
+                    entry()
+                except Exception:
+                    traceback.print_exc()
+            self._write(events)
+
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, events:list):
+        if not events:
+            return
+        try:
+            if self.text_log is not None:
+                with open(self.text_log, "a", encoding="utf-8") as file:
+                    file.write(''.join(item.to_line() for _, item, _ in events))
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.executemany("INSERT INTO events (wedstrijd, seq, tijd, type) VALUES (?, ?, ?, ?)",
+                                                [(self.wedstrijd_id, seq, item.time, item.type) for seq, item, _ in events])
+                    self.connection.executemany("INSERT INTO event_spelers (wedstrijd, seq, speler, rol) VALUES (?, ?, ?, ?)",
+                                                [(self.wedstrijd_id, seq, speler, rol) for seq, item, _ in events for speler, rol in _rollen(item)])
+                    self.connection.executemany("INSERT INTO ongedaan (wedstrijd, seq) VALUES (?, ?)",
+                                                [(self.wedstrijd_id, ongedaan) for _, _, ongedaan in events if ongedaan is not None])
+        except Exception:
+            traceback.print_exc()
+
+
+def _rollen(item:HistoryItem):
+    if item.type == 'unpause':
+        return [(speler, 'actief') for speler in item.spelers]
+    elif item.type in ('wissel', 'lijnwissel'):
+        # The k'th 'uit' and the k'th 'in' of an event, in the order of their rowid, form a pair
+        paren = item.paren()
+        return [(uit, 'uit') for uit, _ in paren] + [(in_, 'in') for _, in_ in paren]
+    return []
+
+
+def read_events(path:str=EVENT_DB, wedstrijd_id:int=None, start:int=0):
+    ''' Stream the history items of one match from the database, starting at sequence number start, with the
+    'undo' items as they were logged (see history.zonder_undo). '''
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = connection.execute('''SELECT e.seq, e.tijd, e.type, s.speler, s.rol
+                                     FROM events e LEFT JOIN event_spelers s ON s.wedstrijd = e.wedstrijd AND s.seq = e.seq
+                                     WHERE e.wedstrijd = ? AND e.seq >= ?
+                                     ORDER BY e.seq, s.rowid''', (wedstrijd_id, start))
+        for _, event in itertools.groupby(rows, key=lambda row: row[0]):
+            event = list(event)
+            _, tijd, type, _, _ = event[0]
+            spelers = {rol: [row[3] for row in event if row[4] == rol] for rol in ('actief', 'uit', 'in')}
+            if type == 'unpause':
+                yield HistoryItem(type='unpause', time=tijd, spelers=spelers['actief'])
+            elif type in ('pause', 'undo'):
+                yield HistoryItem(type=type, time=tijd)
+            elif type == 'wissel':
+                yield HistoryItem(type='wissel', time=tijd, speler_uit=spelers['uit'][0], speler_in=spelers['in'][0])
+            elif type == 'lijnwissel':
+                yield HistoryItem(type='lijnwissel', time=tijd, speler_uit=spelers['uit'], speler_in=spelers['in'])
+    finally:
+        connection.close()
+
+
+def wissels(path:str=EVENT_DB, speler:str=None, van:float=None, tot:float=None) -> list:
+    ''' All substitutions in the database that were not undone, as (wedstrijd, tijd, speler_uit, speler_in),
+    optionally only those of one player and/or within a time window. A line change gives one row per pair. '''
+    query = '''WITH paren AS (SELECT wedstrijd, seq, speler, rol,
+                                      ROW_NUMBER() OVER (PARTITION BY wedstrijd, seq, rol ORDER BY rowid) AS k
+                               FROM event_spelers WHERE rol IN ('uit', 'in'))
+               SELECT e.wedstrijd, e.tijd, uit.speler, in_.speler
+               FROM events e
+               JOIN paren uit ON uit.wedstrijd = e.wedstrijd AND uit.seq = e.seq AND uit.rol = 'uit'
+               JOIN paren in_ ON in_.wedstrijd = e.wedstrijd AND in_.seq = e.seq AND in_.rol = 'in' AND in_.k = uit.k
+               WHERE e.type IN ('wissel', 'lijnwissel')
+                 AND NOT EXISTS (SELECT 1 FROM ongedaan o WHERE o.wedstrijd = e.wedstrijd AND o.seq = e.seq) '''
+    parameters = []
+    if speler is not None:
+        query += ''' AND EXISTS (SELECT 1 FROM event_spelers s WHERE s.wedstrijd = e.wedstrijd AND s.seq = e.seq AND s.speler = ?)'''
+        parameters.append(speler)
+    if van is not None:
+        query += " AND e.tijd >= ?"
+        parameters.append(van)
+    if tot is not None:
+        query += " AND e.tijd < ?"
+        parameters.append(tot)
+    query += " ORDER BY e.tijd, uit.k"
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
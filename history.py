@@ -0,0 +1,105 @@
+import calendar
+import re
+import time
+
+
+HISTORY_FILE = "history.txt"
+
+_LINE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?([+-]\d{4})?: (.*)$")
+_UNPAUSE = re.compile(r"^unpause\(spelers = (.*)\)$")
+_WISSEL = re.compile(r"^wissel\(speler_uit=(.*), speler_in=(.*)\)$")
+_LIJNWISSEL = re.compile(r"^lijnwissel\(speler_uit=(.*), speler_in=(.*)\)$")
+
+
+class HistoryItem:
+    def __init__(self, type:str, time, spelers=None, speler_uit=None, speler_in=None):
+        if type == 'unpause':
+            assert (spelers is not None) and (speler_uit is None) and (speler_in is None)
+            self.spelers = spelers
+        elif type in ('pause', 'undo'):
+            assert (spelers is None) and (speler_uit is None) and (speler_in is None)
+        elif type == 'wissel':
+            assert (spelers is None) and (speler_uit is not None) and (speler_in is not None)
+            self.speler_uit = speler_uit
+            self.speler_in = speler_in
+        elif type == 'lijnwissel':
+            # Several substitutions at the same instant: speler_uit[k] is replaced by speler_in[k]
+            assert (spelers is None) and len(speler_uit) == len(speler_in) > 0
+            self.speler_uit = list(speler_uit)
+            self.speler_in = list(speler_in)
+        else:
+            raise ValueError(f"Invalid type. Type should be 'wissel', 'lijnwissel', 'pause', 'unpause' or 'undo', not {type}.")
+        self.type = type
+        self.time = time
+
+    def to_line(self) -> str:
+        # Local time with microseconds and the UTC offset, so that the log is replayed exactly, also across
+        # the hour that is repeated when daylight saving time ends
+        seconden, microseconden = divmod(round(self.time * 1_000_000), 1_000_000)
+        lokaal = time.localtime(seconden)
+        offset = abs(lokaal.tm_gmtoff) // 60
+        datetime = (time.strftime("%Y-%m-%d %H:%M:%S", lokaal) + f".{microseconden:06d}"
+                    + f"{'-' if lokaal.tm_gmtoff < 0 else '+'}{offset // 60:02d}{offset % 60:02d}")
+        if self.type == 'unpause':
+            return f"{datetime}: unpause(spelers = {', '.join(self.spelers)})\n"
+        elif self.type in ('pause', 'undo'):
+            return f"{datetime}: {self.type}\n"
+        elif self.type == 'wissel':
+            return f"{datetime}: wissel(speler_uit={self.speler_uit}, speler_in={self.speler_in})\n"
+        elif self.type == 'lijnwissel':
+            return f"{datetime}: lijnwissel(speler_uit={', '.join(self.speler_uit)}, speler_in={', '.join(self.speler_in)})\n"
+
+    def paren(self) -> list:
+        # The substitutions of a 'wissel' or a 'lijnwissel', as (speler_uit, speler_in)
+        if self.type == 'wissel':
+            return [(self.speler_uit, self.speler_in)]
+        return list(zip(self.speler_uit, self.speler_in))
+
+    @classmethod
+    def from_line(cls, line:str):
+        ''' Parse a line written by to_line(). Returns None for lines that are incomplete or not recognised. '''
+        if not line.endswith("\n"):
+            return None # the write was interrupted
+        match = _LINE.match(line.rstrip("\r\n"))
+        if match is None:
+            return None
+        datetime, fractie, offset, event = match.groups()
+        if offset is not None:
+            uren, minuten = int(offset[1:3]), int(offset[3:5])
+            tijdstip = calendar.timegm(time.strptime(datetime, "%Y-%m-%d %H:%M:%S")) - (1 if offset[0] == '+' else -1) * (3600*uren + 60*minuten)
+        else:
+            tijdstip = time.mktime(time.strptime(datetime, "%Y-%m-%d %H:%M:%S")) # logs without the offset
+        if fractie:
+            tijdstip += int(fractie) / 10**len(fractie)
+
+        if event in ('pause', 'undo'):
+            return cls(type=event, time=tijdstip)
+        if (unpause := _UNPAUSE.match(event)) is not None:
+            return cls(type='unpause', time=tijdstip, spelers=unpause.group(1).split(', '))
+        if (wissel := _WISSEL.match(event)) is not None:
+            return cls(type='wissel', time=tijdstip, speler_uit=wissel.group(1), speler_in=wissel.group(2))
+        if (lijnwissel := _LIJNWISSEL.match(event)) is not None:
+            return cls(type='lijnwissel', time=tijdstip, speler_uit=lijnwissel.group(1).split(', '), speler_in=lijnwissel.group(2).split(', '))
+        return None
+
+
+def read_history(path:str=HISTORY_FILE, offset:int=0):
+    ''' Stream the history items logged in path, starting at byte offset. '''
+    with open(path, "rb") as file:
+        file.seek(offset)
+        for line in file:
+            item = HistoryItem.from_line(line.decode("utf-8", errors="replace"))
+            if item is not None:
+                yield item
+
+
+def zonder_undo(items) -> list:
+    ''' The history as it was corrected: every 'undo' item removes the last item that was not undone yet. '''
+    history = []
+    for item in items:
+        if item.type == 'undo':
+            if history:
+                history.pop()
+        else:
+            history.append(item)
+    return history
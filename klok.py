@@ -0,0 +1,101 @@
+''' The match clock: monotonic time in epoch seconds, and the moments at which the dashboard refreshes.
+
+time.time() jumps when the system clock is corrected. The clock is therefore anchored to time.time() once
+and then follows a monotonic clock, so that durations are exact while the timestamps in the history stay
+comparable with those of earlier sessions (resume, history.txt, the event database).
+
+The dashboard refreshes right after every whole second of the clock, so that all timers advance together by
+exactly one second per refresh, and only every PAUZE_INTERVAL while the match is paused. A faster refresh is
+never needed for the colours: with 256 levels the colour of a tile changes less than once per second.
+
+Everything that needs the time asks the clock, so the clock can be replaced: VirtueleKlok only moves when it
+is told to, for tests and to replay a match faster than real time, and VersneldeKlok runs a given number of
+times faster than real time, for a demo. '''
+import heapq
+import math
+import time
+
+
+INTERVAL = 1.0 # s between two refreshes while the match is running
+PAUZE_INTERVAL = 5.0 # s between two refreshes while the match is paused
+MARGE = 0.005 # s after the boundary, so that a timer that fires a little early still lands past it
+
+# Unlike time.monotonic, CLOCK_BOOTTIME keeps counting while a Linux laptop is suspended
+if hasattr(time, "CLOCK_BOOTTIME"):
+    _monotonic = lambda: time.clock_gettime(time.CLOCK_BOOTTIME)
+else:
+    _monotonic = time.monotonic
+
+
+class Wedstrijdklok:
+    def __init__(self):
+        self.epoch = time.time() - _monotonic()
+
+    def nu(self) -> float:
+        return self.epoch + _monotonic()
+
+    def volgende_tick(self, paused:bool) -> float:
+        ''' The next whole second, or the next multiple of PAUZE_INTERVAL while paused, in clock time. '''
+        interval = PAUZE_INTERVAL if paused else INTERVAL
+        return (math.floor(self.nu() / interval) + 1) * interval
+
+    def wachttijd_ms(self, tijdstip:float) -> int:
+        # Delay for Tk's after() until just past tijdstip
+        return max(1, math.ceil(1000 * (tijdstip - self.nu() + MARGE)))
+
+
+class VersneldeKlok(Wedstrijdklok):
+    ''' The clock running snelheid times faster than real time from the moment it is made, e.g. to demo a
+    whole match in a few minutes. The refreshes stay on the whole seconds of this clock. '''
+
+    def __init__(self, snelheid:float):
+        super().__init__()
+        self.snelheid = snelheid
+        self.start = _monotonic()
+
+    def nu(self) -> float:
+        return self.epoch + self.start + self.snelheid * (_monotonic() - self.start)
+
+    def wachttijd_ms(self, tijdstip:float) -> int:
+        return max(1, math.ceil(1000 * (tijdstip - self.nu() + MARGE) / self.snelheid))
+
+
+class VirtueleKlok(Wedstrijdklok):
+    ''' A clock that stands still until it is moved forward with verder() or naar().
+
+    It also takes the place of the Tk root as the timer of the Planner and the LiveReport, with after() and
+    after_cancel(): moving the clock fires the timers that fall due on the way, in order and each at its own
+    moment, as Tk would in real time. A match of 40 minutes with its refresh every second is thus replayed,
+    deterministically, in a fraction of a second. '''
+
+    def __init__(self, start:float=None):
+        self.tijd = time.time() if start is None else start
+        self.timers = [] # heap of (tijdstip, id, callback, args)
+        self.geannuleerd = set()
+        self.volgnummer = 0
+
+    def nu(self) -> float:
+        return self.tijd
+
+    def after(self, ms:int, callback, *args):
+        # Like Tk's after(): ms is in clock time, the id cancels the timer
+        self.volgnummer += 1
+        heapq.heappush(self.timers, (self.tijd + ms / 1000, self.volgnummer, callback, args))
+        return self.volgnummer
+
+    def after_cancel(self, timer:int):
+        self.geannuleerd.add(timer)
+
+    def naar(self, tijdstip:float):
+        ''' Move the clock to tijdstip, firing the timers up to and including tijdstip. '''
+        while self.timers and self.timers[0][0] <= tijdstip:
+            moment, timer, callback, args = heapq.heappop(self.timers)
+            if timer in self.geannuleerd:
+                self.geannuleerd.discard(timer)
+                continue
+            self.tijd = max(self.tijd, moment)
+            callback(*args)
+        self.tijd = max(self.tijd, tijdstip)
+
+    def verder(self, seconden:float):
+        self.naar(self.tijd + seconden)
@@ -0,0 +1,206 @@
+''' The live match overview: a window next to the dashboard that follows the match as it is played.
+
+The window subscribes to the history of the Wedstrijd and reads the stints from its index. The stints that
+end are appended to the artists of
+the timeline and the scatter, the two small per-player panels are redrawn from their totals, and the figure
+is redrawn with draw_idle once per batch of events. Between events only the stints on the field grow: they
+are animated artists, redrawn every second by blitting the timeline on top of a cached background. '''
+import tkinter as tk
+import numpy as np
+import pandas as pd
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from player_state import gespeeld_percentage
+from metrics import gemeten
+from report import (StintLabels, stint_vertices, stint_teksten, overzicht_assen, kleuren, cyclische_kleuren,
+                    hbar_total_time_per_player, hist_playtimes_per_player, scatter_playdur_evolution)
+from stints import Speelbeurten, inlier_bounds, inliers
+
+
+VOORUIT = 10*60 # the timeline runs this far ahead of the clock, so that it is only rescaled every 10 minutes
+
+
+class LiveReport:
+    def __init__(self, master, wedstrijd, dpi:float=100):
+        self.wedstrijd = wedstrijd
+        self.stints = wedstrijd.stints
+        self.getekend = 0 # the number of ended stints that are drawn
+        self.gepland = None
+
+        # The colours follow the roster, as in the report of a paused match
+        namen = list(wedstrijd.spelers.namen)
+        self.kleur = dict(zip(namen, kleuren(len(namen)) if len(namen) <= 20 else cyclische_kleuren(len(namen))))
+
+        self.window = tk.Toplevel(master)
+        self.window.wm_title("Wedstrijdoverzicht")
+        self.window.geometry(f"{self.window.winfo_screenwidth()}x{self.window.winfo_screenheight()}+0+0")
+        self.window.protocol("WM_DELETE_WINDOW", self.sluit)
+        self.fig = Figure(dpi=dpi, layout='tight')
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.ax_history, self.ax_time_per_player, self.ax_playdur_distr, self.ax_playdur_evolution = overzicht_assen(self.fig)
+
+        # The stints that ended, and the animated stints on the field
+        self.verts = np.empty((0, 4, 2))
+        self.facecolors = []
+        self.gesloten = self.ax_history.add_collection(PolyCollection(self.verts, edgecolors='none'))
+        self.gesloten_labels = self.ax_history.add_artist(StintLabels([], [], []))
+        self.lopend = self.ax_history.add_collection(PolyCollection(self.verts, edgecolors='none', animated=True))
+        self.lopend_labels = self.ax_history.add_artist(StintLabels([], [], []))
+        self.lopend_labels.set_animated(True)
+        self.achtergrond = None
+        self.canvas.mpl_connect('draw_event', self.na_tekenen)
+
+        self.scatter = scatter_playdur_evolution(pd.DataFrame({'Speelbeurten_begin': [[]], 'Speelduren': [[]], 'Colour': ['k']}),
+                                                 ax=self.ax_playdur_evolution)
+        self.begin, self.duur, self.rgba = np.empty(0), np.empty(0), np.empty((0, 4))
+
+        self.timer = None
+        self.bijwerken()
+        wedstrijd.luisteraars.append(self.ontvang)
+
+    def ontvang(self, item):
+        # Called for every item that Wedstrijd logs; the events of one action are drawn together when Tk is idle
+        if item.type == 'undo':
+            self.getekend = min(self.getekend, len(self.stints)) # the stints from there on are drawn again
+        if self.gepland is None:
+            self.gepland = self.window.after_idle(self.verwerk)
+
+    def verwerk(self):
+        self.gepland = None
+        self.bijwerken()
+
+    @gemeten("live_report.bijwerken")
+    def bijwerken(self):
+        if self.stints.tijd is None:
+            return
+        if len(self.verts) > self.getekend: # substitutions were undone
+            self.verwijder_beurten(self.getekend)
+        self.voeg_beurten_toe(self.stints.gesloten(self.getekend))
+        self.getekend = len(self.stints)
+        self.update_panelen()
+
+        if self.ax_history.get_autoscalex_on() or self.stints.tijd > self.ax_history.get_xlim()[1]: # first events or past the end
+            self.ax_history.set_xlim(self.wedstrijd.history[0].time, self.stints.tijd + VOORUIT)
+        n_lanes = max(len(self.stints.actieve_spelers), max(self.stints.lanes, default=-1) + 1)
+        self.ax_history.set_ylim(n_lanes - 0.5, -0.5)
+        self.update_lopend(self.wedstrijd.klok.nu() if self.stints.running else self.stints.tijd, blit=False)
+        self.canvas.draw_idle()
+        self.plan_tick() # every second while running, slowly while paused
+
+    def voeg_beurten_toe(self, beurten:Speelbeurten):
+        if len(beurten) == 0:
+            return
+        self.verts = np.concatenate((self.verts, stint_vertices(beurten)))
+        self.facecolors += [self.kleur[speler] for speler in beurten.speler]
+        self.gesloten.set_verts(self.verts)
+        self.gesloten.set_facecolor(self.facecolors)
+        self.gesloten_labels.voeg_toe((beurten.begin + beurten.einde)/2, beurten.lane, stint_teksten(beurten))
+
+        self.begin = np.append(self.begin, beurten.begin)
+        self.duur = np.append(self.duur, beurten.duur)
+        self.rgba = np.concatenate((self.rgba, to_rgba_array([self.kleur[speler] for speler in beurten.speler])))
+
+    def verwijder_beurten(self, n:int):
+        # Keep only the first n stints that ended
+        self.verts, self.facecolors = self.verts[:n], self.facecolors[:n]
+        self.gesloten.set_verts(self.verts)
+        self.gesloten.set_facecolor(self.facecolors)
+        self.gesloten_labels.kort_in(n)
+        self.begin, self.duur, self.rgba = self.begin[:n], self.duur[:n], self.rgba[:n]
+
+    def update_panelen(self):
+        ''' The keeper outliers, the total time per player and the stint durations. The stints on the field
+        count up to the last event. '''
+        beurten = self.stints.gesloten()
+        lopend = self.stints.lopend(tot=self.stints.tijd)
+        spelers = np.concatenate((beurten.speler, lopend.speler))
+        duren = np.concatenate((beurten.duur, lopend.duur))
+        mask = inliers(duren, inlier_bounds(duren[duren > 0]))
+
+        # The scatter only holds the stints that ended
+        self.scatter.set_offsets(np.column_stack((self.begin, self.duur))[mask[:len(beurten)]])
+        self.scatter.set_facecolor(self.rgba[mask[:len(beurten)]])
+        self.ax_playdur_evolution.ignore_existing_data_limits = True
+        self.ax_playdur_evolution.update_datalim(self.scatter.get_offsets())
+        self.ax_playdur_evolution.autoscale_view()
+
+        per_speler = {}
+        for speler, duur in zip(spelers[mask], duren[mask]):
+            per_speler.setdefault(speler, []).append(duur)
+        if len(per_speler) == 0:
+            return
+        frame = pd.DataFrame({'Speelduren': [np.array(duren) for duren in per_speler.values()]}, index=pd.Index(list(per_speler), name="Naam"))
+        frame['Gespeeld'] = [np.sum(duren) for duren in frame['Speelduren']]
+        frame = frame.loc[frame['Gespeeld'] > 0].sort_values(by='Gespeeld')
+        frame['Colour'] = [self.kleur[speler] for speler in frame.index]
+        frame['Richttijd'] = self.wedstrijd.spelers.richttijd[[self.wedstrijd.spelers.index[speler] for speler in frame.index]]
+        frame['Gespeeld%'] = gespeeld_percentage(frame['Gespeeld'].to_numpy(), frame['Richttijd'].to_numpy())
+
+        # A handful of bars and bins: cheaper to draw again than to update
+        self.ax_time_per_player.cla()
+        hbar_total_time_per_player(frame, ax=self.ax_time_per_player)
+        self.ax_playdur_distr.cla()
+        hist_playtimes_per_player(frame, ax=self.ax_playdur_distr)
+
+    def update_lopend(self, tot:float, blit:bool=True):
+        lopend = self.stints.lopend(tot)
+        self.lopend.set_verts(stint_vertices(lopend))
+        self.lopend.set_facecolor([self.kleur[speler] for speler in lopend.speler])
+        self.lopend_labels.set_data((lopend.begin + lopend.einde)/2, lopend.lane, stint_teksten(lopend))
+        if blit:
+            self.blit()
+
+    def na_tekenen(self, event):
+        # After a full draw: keep the timeline without the stints on the field, then draw these on top
+        self.achtergrond = self.canvas.copy_from_bbox(self.ax_history.bbox)
+        self.ax_history.draw_artist(self.lopend)
+        self.ax_history.draw_artist(self.lopend_labels)
+
+    def blit(self):
+        if self.achtergrond is None:
+            return
+        self.canvas.restore_region(self.achtergrond)
+        self.ax_history.draw_artist(self.lopend)
+        self.ax_history.draw_artist(self.lopend_labels)
+        self.canvas.blit(self.ax_history.bbox)
+
+    def plan_tick(self):
+        # The stints on the field grow with the whole seconds of the match clock, like the dashboard
+        if self.timer is not None:
+            self.window.after_cancel(self.timer)
+        klok = self.wedstrijd.klok
+        self.timer = self.window.after(klok.wachttijd_ms(klok.volgende_tick(paused=not self.stints.running)), self.tick)
+
+    @gemeten("live_report.tick")
+    def tick(self):
+        self.timer = None
+        self.plan_tick()
+        if not self.stints.running:
+            return
+        nu = self.wedstrijd.klok.nu()
+        if nu > self.ax_history.get_xlim()[1]:
+            self.ax_history.set_xlim(self.wedstrijd.history[0].time, nu + VOORUIT)
+            self.update_lopend(nu, blit=False)
+            self.canvas.draw_idle()
+        else:
+            self.update_lopend(nu)
+
+    def toon(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def is_open(self) -> bool:
+        return self.window.winfo_exists()
+
+    def sluit(self):
+        if self.ontvang in self.wedstrijd.luisteraars:
+            self.wedstrijd.luisteraars.remove(self.ontvang)
+        if self.timer is not None:
+            self.window.after_cancel(self.timer)
+        if self.gepland is not None:
+            self.window.after_cancel(self.gepland)
+        self.window.destroy()
@@ -0,0 +1,270 @@
+''' Local delta stream of the match, for assistant coaches who follow the timers on a tablet or a second screen.
+
+A small HTTP server (standard library only) publishes the state of every court as server-sent events. A
+client first receives a snapshot: the names, the Richttijd and per player the status, spot, seconds played
+and the time of the last change. After that it only receives deltas: the players whose state changed
+(substitution, undo, move to or from the absent players) and, every second, the clock time. The timers are
+computed in the browser from the clock time, exactly like TickEngine does, so a running match costs one
+number per second per client instead of all the labels.
+
+Every client has a slot with the delta that is waiting for it. New deltas are merged into that slot (the last
+state of a player and the last clock time win), and the client's thread sends the slot at most every
+interval seconds. A slow tablet therefore never builds up a backlog and never slows down the dashboard:
+publiceer() only compares two small arrays and merges a dict per client.
+
+Run the dashboard with python main.py --stream and open http://<laptop>:8765/ on the tablet. To follow a
+stream from a terminal, e.g. to test it locally: python live_stream.py http://127.0.0.1:8765/stream '''
+import json
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+from metrics import gemeten
+
+
+STREAM_PORT = 8765
+INTERVAL = 0.5 # default minimum time between two messages to one client, in s
+KEEPALIVE = 15 # s without messages after which a comment keeps the connection open
+
+
+def toestand(spelers) -> np.ndarray:
+    # What a client needs per player, one row per player
+    return np.stack((spelers.status, spelers.spot, np.round(spelers.gespeeld), spelers.laatste_wijziging), axis=1)
+
+def rij(toestand) -> list:
+    # status, spot, seconds played, time of the last change (None before the first)
+    status, spot, gespeeld, laatste_wijziging = toestand
+    return [int(status), int(spot), int(gespeeld), round(float(laatste_wijziging), 3) if np.isfinite(laatste_wijziging) else None]
+
+
+class Abonnee:
+    ''' One connected client: the delta that waits to be sent, merged with every new delta. '''
+
+    def __init__(self):
+        self.conditie = threading.Condition()
+        self.wachtend = None
+        self.gesloten = False
+
+    def voeg_toe(self, delta:dict):
+        with self.conditie:
+            if self.wachtend is None:
+                self.wachtend = {"spelers": {}}
+            self.wachtend["spelers"].update(delta.get("spelers", {}))
+            self.wachtend.update({sleutel: waarde for sleutel, waarde in delta.items() if sleutel != "spelers"})
+            self.conditie.notify()
+
+    def volgende(self, timeout:float):
+        ''' The merged delta, or None after timeout or when the stream is closed. '''
+        with self.conditie:
+            self.conditie.wait_for(lambda: self.wachtend is not None or self.gesloten, timeout=timeout)
+            delta, self.wachtend = self.wachtend, None
+        if delta is not None and not delta["spelers"]:
+            del delta["spelers"]
+        return delta
+
+    def sluit(self):
+        with self.conditie:
+            self.gesloten = True
+            self.conditie.notify()
+
+
+class Kanaal:
+    ''' The stream of one court. publiceer() is called by the dashboard; the clients are served by the server threads. '''
+
+    def __init__(self, spelers, paused:bool=True):
+        self.namen = list(spelers.namen)
+        self.richttijd = [float(r) if np.isfinite(r) else None for r in spelers.richttijd]
+        self.lock = threading.Lock()
+        self.abonnees = []
+        self.toestand = toestand(spelers) # the state that was published last
+        self.paused = paused
+        self.t = None
+
+    @gemeten("live_stream.publiceer")
+    def publiceer(self, spelers, paused:bool, nu:float) -> dict:
+        # The players whose state changed since the previous call, and the clock time
+        nieuw = toestand(spelers)
+        with self.lock:
+            gewijzigd = np.flatnonzero(np.any(nieuw != self.toestand, axis=1))
+            delta = {"t": round(nu, 3)}
+            if paused != self.paused:
+                delta["paused"] = paused
+            if len(gewijzigd):
+                delta["spelers"] = {int(i): rij(nieuw[i]) for i in gewijzigd}
+            self.toestand, self.paused, self.t = nieuw, paused, nu
+            for abonnee in self.abonnees:
+                abonnee.voeg_toe(delta)
+        return delta
+
+    def abonneer(self) -> tuple:
+        ''' A new client and its snapshot, taken under the same lock so that no delta is missed or doubled. '''
+        abonnee = Abonnee()
+        with self.lock:
+            snapshot = {"namen": self.namen, "richttijd": self.richttijd, "paused": self.paused,
+                        "t": None if self.t is None else round(self.t, 3),
+                        "spelers": [rij(t) for t in self.toestand]}
+            self.abonnees.append(abonnee)
+        return abonnee, snapshot
+
+    def opzeggen(self, abonnee:Abonnee):
+        with self.lock:
+            self.abonnees.remove(abonnee)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        delen = [urllib.parse.unquote(deel) for deel in url.path.split("/") if deel]
+        kanalen = self.server.stream.kanalen
+        if delen[:1] == ["stream"] and len(delen) <= 2 and (naam := (delen[1:] or [None])[0]) in kanalen:
+            # ?interval=2 makes a slow tablet receive at most one message per 2 s
+            try:
+                interval = min(max(float(urllib.parse.parse_qs(url.query).get("interval", [INTERVAL])[0]), 0.1), 60)
+            except ValueError:
+                interval = INTERVAL
+            self.stream(kanalen[naam], interval)
+        elif len(delen) <= 1 and (naam := (delen or [None])[0]) in kanalen:
+            stream = "/stream" if naam is None else "/stream/" + urllib.parse.quote(naam)
+            self.stuur(200, "text/html; charset=utf-8", PAGINA.replace("{STREAM}", stream))
+        else:
+            self.stuur(404, "text/plain; charset=utf-8", "Niet gevonden")
+
+    def stuur(self, code:int, type:str, tekst:str):
+        body = tekst.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, kanaal:Kanaal, interval:float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        abonnee, snapshot = kanaal.abonneer()
+        self.server.stream.abonnees.add(abonnee)
+        try:
+            self.event("snapshot", snapshot)
+            verzonden = time.monotonic()
+            while not abonnee.gesloten:
+                # Throttle: whatever arrives in the meantime is merged into one message
+                time.sleep(max(0, verzonden + interval - time.monotonic()))
+                delta = abonnee.volgende(timeout=KEEPALIVE)
+                if delta is not None:
+                    self.event("delta", delta)
+                elif not abonnee.gesloten:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                verzonden = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            pass # the client went away
+        finally:
+            kanaal.opzeggen(abonnee)
+            self.server.stream.abonnees.discard(abonnee)
+
+    def event(self, naam:str, data:dict):
+        self.wfile.write(f"event: {naam}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass # no line per request on the console of the dashboard
+
+
+class DeltaStream:
+    ''' The HTTP server with one Kanaal per court, in a background thread. A single court is served at / and
+    /stream, the courts of several matches at /<court> and /stream/<court>. '''
+
+    def __init__(self, host:str="0.0.0.0", port:int=STREAM_PORT):
+        self.kanalen = {}
+        self.abonnees = set()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stream = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name="DeltaStream", daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def kanaal(self, naam:str, spelers, paused:bool=True) -> Kanaal:
+        self.kanalen[naam] = Kanaal(spelers, paused)
+        return self.kanalen[naam]
+
+    def close(self):
+        for abonnee in list(self.abonnees):
+            abonnee.sluit()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def volg(url:str):
+    ''' A minimal client: yields (event, data) for every message of the stream at url. '''
+    with urllib.request.urlopen(url) as antwoord:
+        event = None
+        for regel in antwoord:
+            regel = regel.decode("utf-8").rstrip("\r\n")
+            if regel.startswith("event: "):
+                event = regel[len("event: "):]
+            elif regel.startswith("data: "):
+                yield event, json.loads(regel[len("data: "):])
+
+
+# The page for the tablet: the names and timers of the field and the bench, computed from the snapshot and the deltas
+PAGINA = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Wedstrijd</title>
+<style>
+body { font-family: Helvetica, sans-serif; margin: 0; display: flex; gap: 1em; padding: 1em; }
+div.kolom { flex: 1; } h2 { text-align: center; }
+p { background: #ddd; margin: .3em 0; padding: .5em; white-space: pre-line; }
+span { float: right; }
+</style></head>
+<body><div class="kolom"><h2>Het veld</h2><div id="s0"></div></div><div class="kolom"><h2>De bank</h2><div id="s1"></div></div>
+<script>
+let staat = null;
+const tijd = (t) => { t = Math.round(t); return Math.floor(t / 60) + ":" + String(t % 60).padStart(2, "0"); };
+function toon() {
+  for (const status of [0, 1]) {
+    const spelers = staat.spelers.map((s, i) => [i, ...s]).filter((s) => s[1] == status).sort((a, b) => a[2] - b[2]);
+    document.getElementById("s" + status).innerHTML = spelers.map(([i, st, spot, gespeeld, wijziging]) => {
+      let tekst = "";
+      if (wijziging !== null && staat.t !== null) {
+        const t = Math.floor(staat.t) - Math.floor(wijziging);
+        if (st == 0 && !staat.paused) {
+          tekst = tijd(t);
+        } else {
+          const richttijd = staat.richttijd[i];
+          const perc = richttijd > 0 ? " (" + Math.round(100 * gespeeld / (60 * richttijd)) + "%)" : "";
+          tekst = "Recuperatie: " + tijd(t) + "\\nGespeeld: " + tijd(gespeeld) + perc;
+        }
+      }
+      return "<p>" + staat.namen[i] + "<span>" + tekst + "</span></p>";
+    }).join("");
+  }
+}
+const bron = new EventSource("{STREAM}");
+bron.addEventListener("snapshot", (e) => { staat = JSON.parse(e.data); toon(); });
+bron.addEventListener("delta", (e) => {
+  const delta = JSON.parse(e.data);
+  for (const [i, s] of Object.entries(delta.spelers || {})) staat.spelers[i] = s;
+  if ("paused" in delta) staat.paused = delta.paused;
+  staat.t = delta.t;
+  toon();
+});
+</script></body></html>
+'''
+
+
+if __name__ == '__main__':
+    for event, data in volg(sys.argv[1] if len(sys.argv) > 1 else f"http://127.0.0.1:{STREAM_PORT}/stream"):
+        print(event, json.dumps(data, separators=(',', ':')))
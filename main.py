@@ -1,29 +1,23 @@
 import tkinter as tk
+from tkinter import messagebox
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from copy import deepcopy as copy
-import time
+import argparse
+import os
 from os.path import exists
 from shutil import copyfile
-from win32api import GetSystemMetrics
-import itertools
+from player_state import ACTIEF, BANK, AFWEZIG
+from display import TickEngine
+from eerlijkheid import MIN_SPEELTIJD
+from recommender import Recommender
+from beheer import Wedstrijdbeheer, Planner
+from klok import VersneldeKlok
+from tegels import Tegels
+import metrics
+from metrics import gemeten, METRICS_FILE
 
 
 # Global variables
 time_ref = 4*60
-screen_size = np.array([GetSystemMetrics(0), GetSystemMetrics(1)], dtype=int)
-
-
-# Preparation
-if not exists('spelers.txt'):
-    # create spelers.txt as copy of spelers_voorbeeld.txt
-    copyfile('spelers_voorbeeld.txt', 'spelers.txt')
-    print("---------------------------------------------------------")
-    print("Please update the player names in the file 'spelers.txt'.")
-    print("---------------------------------------------------------")
-    print("Continuing with the default names.")
 
 
 def configure_grid_uniformly(root):
@@ -33,263 +27,57 @@ def configure_grid_uniformly(root):
     for i in range(root.grid_size()[1]):
         root.grid_rowconfigure(i, weight=1)
 
-def health_to_colour(health:float, low:str, high:str) -> str:
-    rgb = low + (high - low) * np.array([2*(1-health), 2*health, 0])
-    rgb = np.clip(np.asarray(rgb, dtype=int), low, high)
-    hex = f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
-    return hex
-
-def time_to_string(t:float) -> str:
-    # Convert time in seconds to a string in the format mm:ss (without leading zero).
-    t = np.round(t)
-    t_as_string = time.strftime("%M:%S", time.gmtime(t))
-    if t_as_string[0] == '0':
-        t_as_string = t_as_string[1:] # remove leading zero
-    return t_as_string
-
-
-class Wedstrijd:
-    def __init__(self, spelers, clear_history=True):
-        # Create a history list to keep track of the game
-        self.history = []
-        if clear_history:
-            with open("history.txt", "w") as file:
-                file.write("")
-    
-        # Create a DataFrame to keep track of the players
-        self.spelers = spelers
-        # self.spelers["Richttijd"] = # replace NaN values
-        # self.spelers["Richttijd"] *= (5*50 / self.spelers["Richttijd"].sum())
-        self.spelers["Status"] = np.concatenate((5*["Actief"], (len(spelers)-5)*["Bank"]))
-        self.spelers["Spot"] = np.concatenate((np.arange(5), np.arange(len(spelers)-5)))
-        self.spelers["Gespeeld"] = 0.0
-        self.spelers["Gespeeld%"] = 0.0
-        self.spelers["Laatste wijziging"] = -np.inf
-        
-        self.paused = True
-    
-    def unpause(self, tijdstip):
-        actieve_spelers = self.spelers.loc[self.spelers["Status"] == "Actief"].sort_values(by="Spot").index.values
-        self.history.append(HistoryItem(type='unpause', time=tijdstip, spelers=actieve_spelers))
-        self.paused = False
-        self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"] = tijdstip
-
-    def pause(self, tijdstip):
-        self.history.append(HistoryItem(type='pause', time=tijdstip))
-        self.paused = True
-        self.spelers.loc[self.spelers["Status"] == "Actief", "Gespeeld"] += tijdstip - self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"]
-        self.spelers["Gespeeld%"] = np.where(self.spelers["Richttijd"] > 0, self.spelers["Gespeeld"] / (60*self.spelers["Richttijd"]), 100 + self.spelers["Gespeeld"])
-        self.spelers.loc[self.spelers["Status"] == "Actief", "Laatste wijziging"] = tijdstip
-    
-    def wissel(self, speler_uit, speler_in, tijdstip):
-        if not self.paused:
-            self.history.append(HistoryItem(type='wissel', time=tijdstip, speler_uit=speler_uit, speler_in=speler_in))
-
-        # naar de bank
-        self.spelers.at[speler_uit, "Status"] = "Bank"
-        if not self.paused:
-            self.spelers.at[speler_uit, "Gespeeld"] += tijdstip - self.spelers.at[speler_uit, "Laatste wijziging"]
-            self.spelers.at[speler_uit, "Laatste wijziging"] = tijdstip
-
-        # van de bank
-        self.spelers.at[speler_in, "Status"] = "Actief"
-        if not self.paused:
-            self.spelers.at[speler_in, "Laatste wijziging"] = tijdstip
-
-        self.spelers.at[speler_in, 'Spot'], self.spelers.at[speler_uit, 'Spot'] = self.spelers.at[speler_uit, 'Spot'], self.spelers.at[speler_in, 'Spot']
-
-        # order de bankspelers
-        self.order_bench()
-
-    def order_bench(self):
-        # This function orders the bench players based on the time they have been active
-        self.spelers["Gespeeld%"] = np.where(self.spelers["Richttijd"] > 0, self.spelers["Gespeeld"] / (60*self.spelers["Richttijd"]), 100 + self.spelers["Gespeeld"])
-        bench = self.spelers.loc[self.spelers["Status"] == "Bank"]
-
-        argsort = bench["Gespeeld%"].argsort()
-        self.spelers.loc[bench.index[argsort], "Spot"] = np.arange(len(bench))
-
-    def report(self, save=False):
-        if not self.paused:
-            self_ = copy(self)
-            self_.pause(tijdstip=time.time())
-            return self_.report(save=save)
-
-        spelers = copy(self.spelers)
-        # Geef iedere speler een kleur en verwijder afwezige spelers.
-        if len(spelers) <= 20:
-            # Elke speler krijgt een unieke kleur. Die is onafhankelijk van wie aanwezig is, en dus zijn de kleuren in alle wedstrijden dezelfde.
-            kleuren = (plt.cm.tab10.colors + plt.cm.tab20.colors[1::2])[:len(spelers)]
-            spelers['Colour'] = kleuren
-            spelers = spelers.loc[spelers['Gespeeld'] > 0]
-        else:
-            # Er zijn meer spelers dan er kleuren zijn.
-            spelers = spelers.loc[spelers['Gespeeld'] > 0]
-            if len(spelers) <= 20:
-                # Elke speler krijgt voor deze wedstrijd een unieke kleur.
-                kleuren = (plt.cm.tab10.colors + plt.cm.tab20.colors[1::2])[:len(spelers)]
-                spelers['Colour'] = kleuren
-            else:
-                # In het onwaarschijnlijke geval dat er meer dan 20 spelers deelnamen aan deze wedstrijd, krijgen sommige spelers dezelfde kleur.
-                kleuren = list(itertools.islice(itertools.cycle(plt.cm.tab20.colors), len(spelers)))
-                spelers['Colour'] = kleuren
-        
-        spelers['Speelbeurten_begin'] = [[] for _ in range(len(spelers))]
-        spelers['Speelbeurten_einde'] = [[] for _ in range(len(spelers))]
-        spelers.sort_values(by='Gespeeld', inplace=True)
-
-        fig = plt.figure(dpi = 100 * screen_size[1] / 1080)
-        manager = plt.get_current_fig_manager()
-        manager.full_screen_toggle()
-
-        def draw_bar(idx, speler, start, end):
-            ax_history.barh(y = idx, 
-                            left = start, 
-                            width = end - start, 
-                            label = speler, 
-                            color = spelers.at[speler, 'Colour'])
-            ax_history.text(x = (start + end)/2, 
-                            y = idx, 
-                            s = f'{speler}\n{time_to_string(end - start)}', 
-                            ha = 'center', 
-                            va = 'center', 
-                            color = 'k')
-
-        def verwijder_keeper_outliers(spelers):
-            alle_speelduren = np.concatenate(spelers['Speelduren'].values)
-            
-            # Check for outliers using log-normal distribution
-            log_speelduren = np.log(alle_speelduren)
-            log_speelduren = np.delete(log_speelduren, np.argmax(log_speelduren)) # remove the largest element, as this must be a goalkeeper's turn
-            mu, sigma = np.mean(log_speelduren), np.std(log_speelduren, ddof=1)
-            inlier_bounds = [np.exp(mu - 5*sigma), # probably outliers due to incorrectly entered data
-                             np.exp(mu + 2*sigma)] # probably outliers from the goalkeeper
-            outliers_upper = alle_speelduren[alle_speelduren > inlier_bounds[1]]
-            if len(outliers_upper) > 2: # make sure to remove maximally 2 upper outliers, as only 2 are expected from the goalkeeper
-                outliers_upper = np.sort(outliers_upper, descending=True)
-                inlier_bounds[1] = np.mean(outliers_upper[[2,3]])
-
-            # remove outliers
-            for speler in spelers.index:
-                inliers = np.logical_and((spelers.at[speler,'Speelduren'] >= inlier_bounds[0]),
-                                         (spelers.at[speler,'Speelduren'] <= inlier_bounds[1]))
-                if np.all(inliers):
-                    continue
-                spelers.at[speler,'Speelbeurten_begin'] = np.array(spelers.at[speler,'Speelbeurten_begin'])[inliers]
-                spelers.at[speler,'Speelbeurten_einde'] = np.array(spelers.at[speler,'Speelbeurten_einde'])[inliers]
-                spelers.at[speler,'Speelduren'] = spelers.at[speler,'Speelduren'][inliers]
-                spelers.at[speler,'Gespeeld'] = np.sum(spelers.at[speler,'Speelduren'])
-            spelers["Gespeeld%"] = np.where(spelers["Richttijd"] > 0, spelers["Gespeeld"] / (60*spelers["Richttijd"]), 100 + spelers["Gespeeld"])
-
-        def hbar_total_time_per_player(spelers, ax):
-            ax.set_xlabel('Totale speeltijd per speler')
-            ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: time_to_string(x)))
-            ax.invert_yaxis()
-            ax.yaxis.set_visible(False)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_visible(False)
-            container = ax.barh(y = spelers.index, 
-                                width = spelers['Gespeeld'], 
-                                color = spelers['Colour'])
-            ax.bar_label(container, labels=[f'{speler} - {time_to_string(gespeeld)} ({gespeeld_perc:.0%})' if richttijd > 0
-                                        else f'{speler} - {time_to_string(gespeeld)}' for speler, gespeeld, gespeeld_perc, richttijd in zip(spelers.index, spelers['Gespeeld'], spelers['Gespeeld%'], spelers['Richttijd'])], label_type='center')
-
-        def hist_playtimes_per_player(spelers, ax):
-            ax.set_xlabel('Duur per speelbeurt')
-            ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: time_to_string(x)))
-            ax.yaxis.set_visible(False)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_visible(False)
-            _,bins,_ = ax.hist( x = spelers['Speelduren'].values, 
-                                bins = int(np.round(np.sqrt(np.sum([len(duren) for duren in spelers['Speelduren'].values])))), 
-                                color = spelers['Colour'], 
-                                stacked=True, density=True)
-            ax.set_xticks(bins) # Set the x-ticks at the bin edges
-
-        def scatter_playdur_evolution(spelers, ax):
-            ax.set_xlabel('Tijd')
-            ax.set_ylabel('Duur speelbeurt')
-
-            ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: time.strftime("%Hh%M", time.gmtime(np.round(x)))))
-            ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: time_to_string(y)))
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-
-            for speler in spelers.index:
-                ax.scatter( spelers.at[speler, 'Speelbeurten_begin'], 
-                            spelers.at[speler, 'Speelduren'], 
-                            color = spelers.at[speler, 'Colour'])
-
-        gs = fig.add_gridspec(3,2)
-        ax_history = fig.add_subplot(gs[0,:])
-        ax_time_per_player = fig.add_subplot(gs[1:,0])
-        ax_playdur_distr = fig.add_subplot(gs[1,1])
-        ax_playdur_evolution = fig.add_subplot(gs[2,1])
-        fig.tight_layout()
-
-        ax_history.invert_yaxis()
-        ax_history.set_xlim(self.history[0].time, self.history[-1].time)
-        ax_history.axis('off')
-
-        for HI in self.history:
-            if HI.type == 'unpause':
-                actieve_spelers = copy(HI.spelers)
-                tijden = np.repeat(HI.time, len(actieve_spelers))
-            elif HI.type == 'pause':
-                for idx, speler in enumerate(actieve_spelers):
-                    draw_bar(idx, speler, tijden[idx], HI.time)
-                    spelers.at[speler, 'Speelbeurten_begin'].append(tijden[idx])
-                    spelers.at[speler, 'Speelbeurten_einde'].append(HI.time)
-            elif HI.type == 'wissel':
-                speler = HI.speler_uit
-                idx = int(np.argwhere(actieve_spelers == speler)[0][0])
-                draw_bar(idx, speler, tijden[idx], HI.time)
-                spelers.at[speler, 'Speelbeurten_begin'].append(tijden[idx])
-                spelers.at[speler, 'Speelbeurten_einde'].append(HI.time)
-                actieve_spelers[idx] = HI.speler_in
-                tijden[idx] = HI.time
-
-        spelers['Speelduren'] = [np.array(einde) - np.array(begin) for begin, einde in zip(spelers['Speelbeurten_begin'], spelers['Speelbeurten_einde'])]
-        verwijder_keeper_outliers(spelers)
-        spelers = spelers.loc[spelers['Gespeeld'] > 0]
-
-        hbar_total_time_per_player(spelers=spelers, ax=ax_time_per_player)
-        hist_playtimes_per_player(spelers, ax=ax_playdur_distr)
-        scatter_playdur_evolution(spelers, ax=ax_playdur_evolution)
-
-        if save:
-            plt.show()
-            fig.savefig('wedstrijdoverzicht.png')
-        return fig
+def ask_resume(naam:str=None) -> bool:
+    root = tk.Tk()
+    root.withdraw()
+    vorige = "De vorige wedstrijd" if naam is None else f"De vorige wedstrijd op {naam}"
+    antwoord = messagebox.askyesno("Wedstrijd hervatten", f"{vorige} werd niet beëindigd. Wil je die hervatten?", parent=root)
+    root.destroy()
+    return antwoord
 
 
 class Dashboard():
-    def __init__(self):
+    def __init__(self, wedstrijd, root, planner:Planner, titel:str=None, kanaal=None):
+        # root is the Tk root for a single court, or a Toplevel of it when several courts are played
+        self.wedstrijd = wedstrijd
+        self.planner = planner
+        self.kanaal = kanaal # the live_stream.Kanaal that the tablets follow, if any
         self.active_selection = None
         self.bench_selection = None
         self.absent_selection = None
+        self.lijn = None # in line change mode, the selected spots per status, in the order of selection
+        self.tick_engine = TickEngine(time_ref=time_ref)
+        self.recommender = Recommender(time_ref=time_ref)
+        self.suggestie = None # the advised substitution, as (field player, bench player) indices
+        self.live_report = None
+        self.metrics_overlay = None
 
         # Create main window
-        self.root = tk.Tk()
+        self.root = root
+        if titel is not None:
+            self.root.title(titel)
         self.root.attributes("-fullscreen", True)
-        scale_factor = screen_size[1] / 1080  # Reference height is 1080px, adjust for others
+        self.root.protocol("WM_DELETE_WINDOW", self.sluit)
+        self.screen_size = np.array([self.root.winfo_screenwidth(), self.root.winfo_screenheight()], dtype=int)
+        scale_factor = self.screen_size[1] / 1080  # Reference height is 1080px, adjust for others
         self.font = ("Helvetica", int(14*scale_factor))
 
         # Full screen toggle using esc and f keys
         self.root.bind("<Escape>", lambda event: self.root.attributes("-fullscreen", False))
         self.root.bind("f", lambda event: self.root.attributes("-fullscreen", not self.root.attributes("-fullscreen")))
+        self.root.bind("<Control-z>", lambda event: self.undo())
+        self.root.bind("<Control-y>", lambda event: self.redo())
+        if metrics.actief is not None:
+            self.root.bind("m", lambda event: self.toggle_metrics_overlay())
 
         # Initialize the main frame and the extra frames
         self.init_main_frame()
         self.init_extra_frame_left()
         self.init_extra_frame_right()
 
-        # Initial display update and run the main loop
+        # Initial display update, the planner refreshes it from now on
         self.update_time_features()
-        self.refresh_dashboard()
-        self.root.mainloop()
+        self.planner.abonneer(self)
 
     def init_main_frame(self):
         # Create a frame to organize the layout
@@ -319,12 +107,15 @@ class Dashboard():
         bench_label.grid(row=0, column=1)
 
         # The active players
-        frame_active = tk.Frame(self.main_frame)
-        frame_active.grid(row=1, column=0, sticky="nsew")
-        self.field_buttons, self.field_labels = self.init_players(status="Actief", frame=frame_active, size = (70,4))
+        self.field = Tegels(self.main_frame, self.font, breedte=70, hoogte=lambda n: 4, select=lambda spot: self.select(ACTIEF, spot))
+        self.field.frame.grid(row=1, column=0, sticky="nsew")
+        self.update_field_names()
 
         # The bench players
-        self.create_bench()
+        self.bench = Tegels(self.main_frame, self.font, breedte=60, hoogte=lambda n: int(np.clip(27 // n, 1, 3)),
+                            select=lambda spot: self.select(BANK, spot))
+        self.bench.frame.grid(row=1, column=1, sticky="nsew")
+        self.update_bench_names()
 
         # Bottom frame
         bottom_frame = tk.Frame(self.main_frame)
@@ -334,13 +125,20 @@ class Dashboard():
         swap_button = tk.Button(bottom_frame, text="Wissel", command=self.wissel, font=self.font, width=30, height=2)
         swap_button.grid(row=0, column=1)
 
+        # Button to select several pairs and swap them at once
+        self.lijn_button = tk.Button(bottom_frame, text="Lijnwissel", command=self.wissel_lijn, font=self.font, width=15, height=2)
+        self.lijn_button.grid(row=0, column=2)
+
+        # Buttons to undo and redo a substitution, for mis-taps
+        undo_button = tk.Button(bottom_frame, text="↶ Ongedaan maken", command=self.undo, font=self.font, width=15, height=2)
+        undo_button.grid(row=0, column=0)
+        redo_button = tk.Button(bottom_frame, text="↷ Opnieuw", command=self.redo, font=self.font, width=15, height=2)
+        redo_button.grid(row=0, column=4)
+
         # Button to start/pause the game — label depends on current wedstrijd state
-        if 'wedstrijd' in globals() and hasattr(wedstrijd, 'history'):
-            had_unpause = any(getattr(item, 'type', None) == 'unpause' for item in wedstrijd.history)
-        else:
-            had_unpause = False
+        had_unpause = self.wedstrijd.gestart
 
-        if wedstrijd.paused:
+        if self.wedstrijd.paused:
             # If the match is paused: show "Start wedstrijd" only when it was never unpaused before
             if had_unpause:
                 start_text = "Hervat wedstrijd"
@@ -352,7 +150,7 @@ class Dashboard():
             start_cmd = self.pause
 
         self.start_stop_button = tk.Button(bottom_frame, text=start_text, command=start_cmd, font=self.font, width=30, height=2)
-        self.start_stop_button.grid(row=0, column=2)
+        self.start_stop_button.grid(row=0, column=3)
         configure_grid_uniformly(bottom_frame)
         
         self.open_left_button.lift() # make sure the open button is on top
@@ -393,7 +191,11 @@ class Dashboard():
         self.close_left_button.place(relx=1, rely=0.5, anchor='e')
 
         # The absent players
-        self.create_absent()
+        self.absent = Tegels(self.extra_frame_left, self.font, breedte=30, hoogte=lambda n: 2 if n < 13 else 1,
+                             select=lambda spot: self.select(AFWEZIG, spot), met_label=False, bg='lightgrey')
+        self.absent.frame.grid(row=1, column=0, sticky="nsew")
+        self.update_absent_names()
+        self.close_left_button.lift() # make sure the close button is on top
 
         self.extra_frame_left.lower()
 
@@ -410,6 +212,12 @@ class Dashboard():
         history_label = tk.Label(self.extra_frame_right, text="History", font=self.font, bg='lightgrey')
         history_label.grid(row=0, column=0, sticky="nsew")
 
+        # How fairly the playing time is divided, refreshed with the timers
+        self.eerlijkheid_label = tk.Label(self.extra_frame_right, font=self.font, bg='lightgrey', justify=tk.LEFT, anchor='nw',
+                                          wraplength=int(.2 * self.screen_size[0]))
+        self.eerlijkheid_label.grid(row=1, column=0, sticky="nsew", padx=(40, 10))
+        self.eerlijkheid_tekst = None
+
         # Report button
         extra_right_bottom_frame = tk.Frame(self.extra_frame_right, bg='lightgrey')
         extra_right_bottom_frame.grid(row=2, column=0, sticky="nsew")
@@ -428,144 +236,194 @@ class Dashboard():
 
         self.extra_frame_right.lower()
 
-    def create_bench(self):
-        if hasattr(self, 'frame_bench'):
-            self.frame_bench.destroy()
-        
-        self.frame_bench = tk.Frame(self.main_frame)
-        self.frame_bench.grid(row=1, column=1, sticky="nsew")
-        height = np.clip(27 // wedstrijd.spelers["Status"].eq("Bank").sum(), 1, 3)
-        self.bench_buttons, self.bench_labels = self.init_players(status="Bank", frame=self.frame_bench, size = (60,height))
-        self.open_right_button.lift() # make sure the open button is on top
-
-    def create_absent(self):
-        if hasattr(self, 'frame_absent'):
-            self.frame_absent.destroy
-
-        self.frame_absent = tk.Frame(self.extra_frame_left, bg='lightgrey')
-        self.frame_absent.grid(row=1, column=0, sticky="nsew")
-        height = 2 if wedstrijd.spelers["Status"].eq("Afwezig").sum() < 13 else 1
-        self.absent_buttons = self.init_players(status="Afwezig", frame=self.frame_absent, size = (30,height))
-        self.close_left_button.lift() # make sure the close button is on top
-
-    def init_players(self, status:str, frame:tk.Frame, size:tuple):
-        buttons = []
-        labels = []
-        spelers = wedstrijd.spelers.loc[wedstrijd.spelers["Status"] == status].sort_values(by="Spot")
-        for spot, name in zip(spelers["Spot"], spelers.index):
-            player_frame = tk.Frame(frame)
-            player_frame.grid(row=spot, column=0)
-            button = tk.Button( player_frame, 
-                                text=name, 
-                                font=self.font, 
-                                bg='grey', 
-                                width=size[0], 
-                                height=size[1], 
-                                relief=tk.FLAT, 
-                                command=lambda status=status, spot=spot: self.select(status, spot))
-            button.pack(expand=True, fill=tk.BOTH)
-            buttons.append(button)
-
-            if status != "Afwezig":
-                label = tk.Label(player_frame, font=self.font, anchor='w')
-                label.place(relx=.02, rely=.5, anchor='w')
-                labels.append(label)
-        configure_grid_uniformly(frame)
-
-        if status == "Afwezig":
-            return buttons
+    def refresh_dashboard(self, nu:float):
+        ''' Refresh the dashboard; called by the planner right after every whole second of the match clock '''
+        if metrics.actief is not None and self.metrics_overlay is not None:
+            self.metrics_overlay.config(text=metrics.actief.tekst())
+        self.update_time_features(nu)
+
+    def plan_refresh(self):
+        # The next refresh depends on whether the match runs; every PAUZE_INTERVAL while all are paused
+        self.planner.herplan()
+
+    def sluit(self):
+        # Close the window of this court; the last one ends the main loop
+        self.planner.opzeggen(self)
+        if self.live_report is not None and self.live_report.is_open():
+            self.live_report.sluit()
+        if self.planner.dashboards:
+            self.root.destroy()
         else:
-            return buttons, labels
-
-    def refresh_dashboard(self):
-        ''' Continuously refresh the dashboard every second '''
-        self.update_time_features()
-        self.root.after(1000, self.refresh_dashboard)  # Schedule the next refresh after 1 second
+            self.planner.root.destroy()
 
-    def update_time_features(self):
+    @gemeten("update_time_features")
+    def update_time_features(self, nu:float=None):
         ''' Update all time dependent features: time labels and colours '''
-        for speler, spot in zip(wedstrijd.spelers.index, wedstrijd.spelers['Spot']):
-            t = time.time() - wedstrijd.spelers.at[speler,"Laatste wijziging"]
-            if wedstrijd.spelers.at[speler,"Status"] == "Actief":
-                if t == np.inf:
-                    health = 1
-                    text = ''
-                elif wedstrijd.paused:
-                    health = 1 - 1 / (1 + (t/time_ref)**2)
-                    if wedstrijd.spelers.loc[speler,"Richttijd"] > 0:
-                        text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(wedstrijd.spelers.loc[speler,"Gespeeld"])} ({wedstrijd.spelers.loc[speler,"Gespeeld%"]:.0%})'
-                    else:
-                        text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(wedstrijd.spelers.loc[speler,"Gespeeld"])}'
-                else:
-                    health = 1 / (1 + (t/time_ref)**2)
-                    text = time_to_string(t)
-
-                colour = health_to_colour(health=health, low=144, high=238)
-                self.field_buttons[spot].config(bg=colour)
-                self.field_labels[spot].config(bg=colour, text=text)
-            elif wedstrijd.spelers.at[speler,"Status"] == "Bank":
-                health = 1 - 1 / (1 + (t/time_ref)**2)
-                if t == np.inf:
-                    text = ''
-                else:
-                    if wedstrijd.spelers.loc[speler,"Richttijd"] > 0:
-                        text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(wedstrijd.spelers.loc[speler,"Gespeeld"])} ({wedstrijd.spelers.loc[speler,"Gespeeld%"]:.0%})'
-                    else:
-                        text = f'Recuperatie: {time_to_string(t)}\nGespeeld: {time_to_string(wedstrijd.spelers.loc[speler,"Gespeeld"])}'
-                colour = health_to_colour(health=health, low=200, high=238)
-                self.bench_buttons[spot].config(bg=colour)
-                self.bench_labels[spot].config(bg=colour, text=text)
-    
+        nu = self.wedstrijd.klok.nu() if nu is None else nu
+        wijzigingen = self.tick_engine.tick(self.wedstrijd.spelers, paused=self.wedstrijd.paused, now=nu)
+        for status, tegels in ((ACTIEF, self.field), (BANK, self.bench)):
+            for spot, colour, text in wijzigingen[status]:
+                tegels.zet(spot, kleur=colour, tekst=text)
+        self.update_suggestie(nu)
+        self.update_eerlijkheid(nu)
+        if self.kanaal is not None:
+            self.kanaal.publiceer(self.wedstrijd.spelers, self.wedstrijd.paused, nu)
+
+    def update_eerlijkheid(self, nu:float):
+        # The label is only configured when its text changes, i.e. when a number changes by a whole percent
+        stand = self.wedstrijd.eerlijkheid.stand(nu)
+        namen = self.wedstrijd.spelers.namen
+        risico = ", ".join(namen[idx] for idx in stand["risico"]) or "-"
+        tekst = (f"Gespeeld%: gemiddeld {stand['gemiddeld']:.0%}, spreiding {stand['spreiding']:.0%}\n"
+                 f"Gini: {stand['gini']:.2f}\n"
+                 f"Risico: {risico}")
+        if self.wedstrijd.speeltijd_op(nu) >= MIN_SPEELTIJD:
+            # The projected deviation from the Richttijd at the end of the match, the players furthest behind first
+            projectie = self.wedstrijd.eerlijkheid.projectie(nu)
+            volgorde = [idx for idx in np.argsort(projectie, kind='stable') if projectie[idx] == projectie[idx]]
+            tekst += "\n\nEinde t.o.v. Richttijd:\n" + "\n".join(f"{namen[idx]}  {projectie[idx]:+.0%}" for idx in volgorde)
+        if tekst != self.eerlijkheid_tekst:
+            self.eerlijkheid_label.config(text=tekst)
+            self.eerlijkheid_tekst = tekst
+
+    @gemeten("update_suggestie")
+    def update_suggestie(self, nu:float):
+        ''' Mark the advised substitution with arrows next to the names '''
+        suggestie = None if self.wedstrijd.paused else self.recommender.beste(self.wedstrijd.spelers, paused=False, now=nu)
+        if suggestie == self.suggestie:
+            return
+        self.wis_suggestie()
+        self.suggestie = suggestie
+        if suggestie is not None:
+            uit, in_ = suggestie
+            self.player_tegels(uit).zet(self.wedstrijd.spelers.spot[uit], naam=f"{self.wedstrijd.spelers.namen[uit]}  ⇩")
+            self.player_tegels(in_).zet(self.wedstrijd.spelers.spot[in_], naam=f"{self.wedstrijd.spelers.namen[in_]}  ⇧")
+
+    def wis_suggestie(self):
+        # Remove the arrows, before the tiles are changed
+        for idx in self.suggestie or ():
+            self.player_tegels(idx).zet(self.wedstrijd.spelers.spot[idx], naam=self.wedstrijd.spelers.namen[idx])
+        self.suggestie = None
+
+    def player_tegels(self, idx:int) -> Tegels:
+        return self.field if self.wedstrijd.spelers.status[idx] == ACTIEF else self.bench
+
+    def namen(self, status:int) -> list:
+        # The names of the players with the given status, in the order of their spots
+        return [self.wedstrijd.spelers.namen[idx] for idx in self.wedstrijd.spelers.op_volgorde(status)]
+
+    def update_field_names(self):
+        self.field.toon(self.namen(ACTIEF))
+
+    @gemeten("update_bench_names")
     def update_bench_names(self):
-        inactief = wedstrijd.spelers.loc[wedstrijd.spelers["Status"] == "Bank"]
-        for spot, name in zip(inactief["Spot"], inactief.index):
-            self.bench_buttons[spot].config(text=name)
+        # The tiles are reused: only the spots whose player changed are configured
+        self.bench.toon(self.namen(BANK))
+
+    @gemeten("update_absent_names")
+    def update_absent_names(self):
+        self.absent.toon(self.namen(AFWEZIG))
 
     # Function to handle player swapping logic
+    @gemeten("wissel")
     def wissel(self):
+        if self.lijn is not None:
+            return self.lijnwissel()
         if self.active_selection is not None and self.bench_selection is not None:
-            speler_uit = wedstrijd.spelers.loc[(wedstrijd.spelers["Status"] == "Actief") & (wedstrijd.spelers['Spot'] == self.active_selection)].index[0]
-            speler_in = wedstrijd.spelers.loc[(wedstrijd.spelers["Status"] == "Bank") & (wedstrijd.spelers['Spot'] == self.bench_selection)].index[0]
-            wedstrijd.wissel(speler_uit = speler_uit, 
+            speler_uit = self.wedstrijd.spelers.namen[self.wedstrijd.spelers.speler_op(ACTIEF, self.active_selection)]
+            speler_in = self.wedstrijd.spelers.namen[self.wedstrijd.spelers.speler_op(BANK, self.bench_selection)]
+            self.wis_suggestie()
+            self.wedstrijd.wissel(speler_uit = speler_uit, 
                              speler_in = speler_in, 
-                             tijdstip = time.time())
+                             tijdstip = self.wedstrijd.klok.nu())
 
             # interchange names
-            self.field_buttons[self.active_selection].config(text=speler_in)
+            self.field.zet(self.active_selection, naam=speler_in)
             self.update_bench_names() # all need to be updated as the bench was reordered
             self.update_time_features()
 
             # unselect both
             self.reset_selections()
     
-    def move_to_absent(self):
-        speler_mask = (wedstrijd.spelers["Status"] == "Bank") & (wedstrijd.spelers['Spot'] == self.bench_selection)
+    def wissel_lijn(self):
+        # Switch the line change mode on or off; the selections of either mode are dropped
+        aan = self.lijn is None
+        self.reset_selections()
+        if aan:
+            self.lijn = {ACTIEF: [], BANK: []}
+            self.lijn_button.config(relief=tk.SUNKEN)
+
+    @gemeten("lijnwissel")
+    def lijnwissel(self):
+        # The i'th selected field player is swapped for the i'th selected bench player, all at the same time
+        field, bench = self.lijn[ACTIEF], self.lijn[BANK]
+        if len(field) == 0 or len(field) != len(bench):
+            return
+        spelers = self.wedstrijd.spelers
+        spelers_uit = [spelers.namen[spelers.speler_op(ACTIEF, spot)] for spot in field]
+        spelers_in = [spelers.namen[spelers.speler_op(BANK, spot)] for spot in bench]
+        self.wis_suggestie()
+        self.wedstrijd.lijnwissel(spelers_uit, spelers_in, tijdstip=self.wedstrijd.klok.nu())
 
-        wedstrijd.spelers.loc[speler_mask, "Status"] = "Afwezig"
-        wedstrijd.spelers.loc[speler_mask, "Spot"] = len(self.absent_buttons)
-        wedstrijd.spelers.loc[(wedstrijd.spelers["Status"] == "Bank") & (wedstrijd.spelers["Spot"] > self.bench_selection), "Spot"] -= 1
+        # One refresh for the whole line
         self.reset_selections()
-        self.create_bench()
-        self.create_absent()
+        self.update_field_names()
+        self.update_bench_names()
         self.update_time_features()
 
+    @gemeten("move_to_absent")
+    def move_to_absent(self):
+        self.wis_suggestie()
+        self.wedstrijd.naar_afwezig(self.wedstrijd.spelers.namen[self.wedstrijd.spelers.speler_op(BANK, self.bench_selection)])
+        self.reset_selections()
+        self.update_bench_names()
+        self.update_absent_names()
+        self.update_time_features()
+
+    @gemeten("move_to_bench")
     def move_to_bench(self):
-        speler_mask = (wedstrijd.spelers["Status"] == "Afwezig") & (wedstrijd.spelers['Spot'] == self.absent_selection)
+        self.wis_suggestie()
+        self.wedstrijd.naar_bank(self.wedstrijd.spelers.namen[self.wedstrijd.spelers.speler_op(AFWEZIG, self.absent_selection)])
+        self.reset_selections()
+        self.update_bench_names()
+        self.update_absent_names()
+        self.update_time_features()
 
-        wedstrijd.spelers.loc[speler_mask, "Status"] = "Bank"
-        wedstrijd.order_bench()
-        wedstrijd.spelers.loc[(wedstrijd.spelers["Status"] == "Afwezig") & (wedstrijd.spelers["Spot"] > self.absent_selection), "Spot"] -= 1
+    @gemeten("undo")
+    def undo(self):
+        self.wis_suggestie()
         self.reset_selections()
-        self.create_bench()
-        self.create_absent()
+        if self.wedstrijd.undo():
+            self.show_players()
+
+    @gemeten("redo")
+    def redo(self):
+        self.wis_suggestie()
+        self.reset_selections()
+        if self.wedstrijd.redo():
+            self.show_players()
+
+    def show_players(self):
+        # Show the field, the bench and the absent players as they are after an undo or a redo
+        self.update_field_names()
+        self.update_bench_names()
+        self.update_absent_names()
         self.update_time_features()
 
     # Function to select a player when clicked
-    def select(self, status:str, spot:int):
-        if status == "Actief":
+    def select(self, status:int, spot:int):
+        if self.lijn is not None and status in self.lijn:
+            # Line change mode: a click adds the player to the line, or takes them out again
+            gekozen = self.lijn[status]
+            if spot in gekozen:
+                gekozen.remove(spot)
+            else:
+                gekozen.append(spot)
+            (self.field if status == ACTIEF else self.bench).markeer(spot, spot in gekozen)
+        elif status == ACTIEF:
             # Unhighlight the previous selection
             if self.active_selection is not None:
-                self.set_highlight(button=self.field_buttons[self.active_selection], highlight=False)
+                self.field.markeer(self.active_selection, False)
             # Store the new selection
             if spot == self.active_selection:
                 self.active_selection = None
@@ -573,11 +431,11 @@ class Dashboard():
                 self.active_selection = spot
             # Highlight the new selection
             if self.active_selection is not None:
-                self.set_highlight(button=self.field_buttons[spot], highlight=True)
-        elif status == "Bank":
+                self.field.markeer(spot, True)
+        elif status == BANK:
             # Unhighlight the previous selection
             if self.bench_selection is not None:
-                self.set_highlight(button=self.bench_buttons[self.bench_selection], highlight=False)
+                self.bench.markeer(self.bench_selection, False)
             # Store the new selection
             if spot == self.bench_selection:
                 self.bench_selection = None
@@ -585,11 +443,11 @@ class Dashboard():
                 self.bench_selection = spot
             # Highlight the new selection
             if self.bench_selection is not None:
-                self.set_highlight(button=self.bench_buttons[spot], highlight=True)
-        elif status == "Afwezig":
+                self.bench.markeer(spot, True)
+        elif status == AFWEZIG:
             # Unhighlight the previous selection
             if self.absent_selection is not None:
-                self.set_highlight(button=self.absent_buttons[self.absent_selection], highlight=False)
+                self.absent.markeer(self.absent_selection, False)
             # Store the new selection
             if spot == self.absent_selection:
                 self.absent_selection = None
@@ -597,41 +455,45 @@ class Dashboard():
                 self.absent_selection = spot
             # Highlight the new selection
             if self.absent_selection is not None:
-                self.set_highlight(button=self.absent_buttons[spot], highlight=True)
-
-    # Function to highlight selected player with the appropriate tag
-    def set_highlight(self, button, highlight:bool):
-        if highlight:
-            button.config(relief=tk.SOLID)
-        else:
-            button.config(relief=tk.FLAT)
+                self.absent.markeer(spot, True)
 
     # Reset selections after swapping
     def reset_selections(self):
         if self.active_selection is not None:
-            self.set_highlight(button=self.field_buttons[self.active_selection], highlight=False)
+            self.field.markeer(self.active_selection, False)
             self.active_selection = None
         if self.bench_selection is not None:
-            self.set_highlight(button=self.bench_buttons[self.bench_selection], highlight=False)
+            self.bench.markeer(self.bench_selection, False)
             self.bench_selection = None
         if self.absent_selection is not None:
-            self.set_highlight(button=self.absent_buttons[self.absent_selection], highlight=False)
+            self.absent.markeer(self.absent_selection, False)
             self.absent_selection = None
-
+        if self.lijn is not None:
+            for spot in self.lijn[ACTIEF]:
+                self.field.markeer(spot, False)
+            for spot in self.lijn[BANK]:
+                self.bench.markeer(spot, False)
+            self.lijn = None
+            self.lijn_button.config(relief=tk.RAISED)
+
+    @gemeten("unpause")
     def unpause(self):
-        wedstrijd.unpause(time.time())
+        self.wedstrijd.unpause(self.wedstrijd.klok.nu())
         self.update_time_features()
+        self.plan_refresh() # from the slow refresh of the pause to every second
 
         # make the start button a pause button
         self.start_stop_button.config(text="Pauzeer / Beëindig wedstrijd", command=self.pause)
 
     def pause(self):
-        tijdstip = time.time()
+        tijdstip = self.wedstrijd.klok.nu()
 
+        @gemeten("pause")
         def _pause():
-            wedstrijd.pause(tijdstip)
+            self.wedstrijd.pause(tijdstip)
             self.open_report()
             self.update_time_features()
+            self.plan_refresh()
             popup.destroy()
             
             # make the pause button a start button
@@ -641,7 +503,7 @@ class Dashboard():
             popup.destroy()
         
         # pop up window asking for confirmation
-        popup = tk.Tk()
+        popup = tk.Toplevel(self.root)
         popup.wm_title("Pauze")
         label = tk.Label(popup, text="De wedstrijd is gepauzeerd.", font=self.font)
         label.pack(side="top", fill="x", pady=10)
@@ -656,61 +518,92 @@ class Dashboard():
         popup.destroy()
         
         def end_game():
-            wedstrijd.pause(tijdstip)
+            self.wedstrijd.beeindig(tijdstip)
             popup.destroy()
-            self.root.destroy()
-            self.root.quit()
+            self.sluit()
         
         # pop up window asking for confirmation
-        popup = tk.Tk()
+        popup = tk.Toplevel(self.root)
         popup.wm_title("Einde wedstrijd")
         label = tk.Label(popup, text="Wedstrijd beëindigen?", font=self.font)
         label.pack(side="top", fill="x", pady=10)
         tk.Button(popup, text="Ja", command=end_game, font=self.font).pack()
         tk.Button(popup, text="Nee", command=popup.destroy, font=self.font).pack()
 
+    @gemeten("open_report")
     def open_report(self):
-        if wedstrijd.paused and wedstrijd.spelers["Gespeeld"].sum() == 0:
+        # The live report stays open and follows the match, e.g. on a second screen
+        if len(self.wedstrijd.history) == 0:
             return
-        fig = wedstrijd.report()
-        root = tk.Tk()
-        root.geometry(f"{root.winfo_screenwidth()}x{root.winfo_screenheight()}+0+0")
-        canvas = FigureCanvasTkAgg(fig, master=root)
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        plt.close()
-
-
-class HistoryItem:
-    def __init__(self, type:str, time, spelers=None, speler_uit=None, speler_in=None):
-        if type == 'unpause':
-            assert (spelers is not None) and (speler_uit is None) and (speler_in is None)
-            self.spelers = spelers
-        elif type == 'pause':
-            assert (spelers is None) and (speler_uit is None) and (speler_in is None)
-        elif type == 'wissel':
-            assert (spelers is None) and (speler_uit is not None) and (speler_in is not None)
-            self.speler_uit = speler_uit
-            self.speler_in = speler_in
-        else:
-            raise ValueError(f"Invalid type. Type should be 'Wissel', 'pause' or 'unpause', not {type}.")
-        self.type = type
-        self.time = time
-        self.log()
-
-    def log(self):
-        with open("history.txt", "a") as file:
-            datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
-            if self.type == 'unpause':
-                file.write(f"{datetime}: unpause(spelers = {', '.join(self.spelers)})\n")
-            elif self.type == 'pause':
-                file.write(f"{datetime}: pause\n")
-            elif self.type == 'wissel':
-                file.write(f"{datetime}: wissel(speler_uit={self.speler_uit}, speler_in={self.speler_in})\n")
+        if self.live_report is None or not self.live_report.is_open():
+            from live_report import LiveReport # matplotlib and pandas are only loaded when the first report is opened
+            self.live_report = LiveReport(self.root, self.wedstrijd, dpi=100 * self.screen_size[1] / 1080)
+        self.live_report.toon()
+
+    def toggle_metrics_overlay(self):
+        # Small panel with the latency histograms and the tick drift, on top of the dashboard
+        if self.metrics_overlay is not None:
+            self.metrics_overlay.destroy()
+            self.metrics_overlay = None
+            return
+        self.metrics_overlay = tk.Label(self.root, text=metrics.actief.tekst(), font=("Courier", self.font[1] * 2 // 3),
+                                        justify=tk.LEFT, anchor='nw', bg='black', fg='lightgreen')
+        self.metrics_overlay.place(relx=.5, rely=0, anchor='n')
 
 
 if __name__ == '__main__':
-    # Example usage
-    spelers = pd.read_csv('spelers.txt', index_col='Naam')
-    wedstrijd = Wedstrijd(spelers)
-    dashboard = Dashboard()
-    wedstrijd.report(save=True)
+    parser = argparse.ArgumentParser(description="Dashboard to manage the lineup during a match.")
+    parser.add_argument("--spelers", nargs="+", default=["spelers.txt"], metavar="FILE",
+                        help="the roster of every court; one file is one match on its own, several files are played at the same time, each in its own window")
+    parser.add_argument("--metrics", nargs="?", const=METRICS_FILE, metavar="FILE",
+                        help=f"record the latency of the handlers and the drift of the clock tick in FILE (default {METRICS_FILE}); press m to show them")
+    parser.add_argument("--stream", nargs="?", type=int, const=True, metavar="PORT",
+                        help="publish the timers on the local network at http://<this computer>:PORT/ (default 8765), e.g. for a tablet")
+    parser.add_argument("--versneld", type=float, metavar="FACTOR",
+                        help="run the match clock FACTOR times faster than real time, for a demo")
+    args = parser.parse_args()
+
+    # Preparation
+    if not exists('spelers.txt'):
+        # create spelers.txt as copy of spelers_voorbeeld.txt
+        copyfile('spelers_voorbeeld.txt', 'spelers.txt')
+        print("---------------------------------------------------------")
+        print("Please update the player names in the file 'spelers.txt'.")
+        print("---------------------------------------------------------")
+        print("Continuing with the default names.")
+    if args.metrics is not None:
+        metrics.actief = metrics.Metrics(path=args.metrics)
+
+    # One match per court; a single court keeps the file names of before. Continue the matches that were interrupted.
+    beheer = Wedstrijdbeheer(klok=None if args.versneld is None else VersneldeKlok(args.versneld))
+    stream = None
+    try:
+        if len(args.spelers) == 1:
+            beheer.open(None, args.spelers[0], hervat=ask_resume)
+        else:
+            for path in args.spelers:
+                beheer.open(os.path.splitext(os.path.basename(path))[0], path, hervat=ask_resume)
+
+        kanalen = dict.fromkeys(beheer.wedstrijden)
+        if args.stream is not None:
+            from live_stream import DeltaStream # the HTTP server is only loaded when it is used
+            stream = DeltaStream() if args.stream is True else DeltaStream(port=args.stream)
+            kanalen = {naam: stream.kanaal(naam, wedstrijd.spelers, wedstrijd.paused) for naam, wedstrijd in beheer.wedstrijden.items()}
+            print(f"The timers are published at http://<this computer>:{stream.port}/" + ("" if None in kanalen else f"<court>, with <court> one of {', '.join(kanalen)}"))
+
+        root = tk.Tk()
+        planner = Planner(root, beheer.klok)
+        if len(beheer.wedstrijden) == 1:
+            dashboards = [Dashboard(beheer.wedstrijden[None], root, planner, kanaal=kanalen[None])]
+        else:
+            root.withdraw() # every court gets a window of its own
+            dashboards = [Dashboard(wedstrijd, tk.Toplevel(root), planner, titel=naam, kanaal=kanalen[naam]) for naam, wedstrijd in beheer.wedstrijden.items()]
+        dpi = 100 * dashboards[0].screen_size[1] / 1080
+        root.mainloop()
+        beheer.report(dpi=dpi)
+    finally:
+        if stream is not None:
+            stream.close()
+        beheer.close()
+        if metrics.actief is not None:
+            metrics.actief.exporteer()
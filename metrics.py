@@ -0,0 +1,115 @@
+''' Opt-in instrumentation of the dashboard: latency histograms per handler and the drift of the tick.
+
+Switched off by default. main.py --metrics sets the module variable actief to a Metrics object; from then on
+every method decorated with @gemeten records its duration and the Planner of the dashboards records how late
+every tick fires. The histograms are written to a JSON file every EXPORT_INTERVAL and at the end of the
+match, and the overlay in the dashboard (key m) shows them live. When switched off, @gemeten costs one
+global lookup per call. '''
+import bisect
+import functools
+import json
+import os
+import time
+
+
+METRICS_FILE = "metrics.json"
+EXPORT_INTERVAL = 60 # seconds between two exports of the metrics file
+
+# Bucket edges of the histograms in ms: 0.05 ms to about 30 s, 4 buckets per doubling
+GRENZEN = [0.05 * 2**(k/4) for k in range(80)]
+
+actief = None # the Metrics object while the instrumentation is switched on
+
+
+class Histogram:
+    ''' Counts per logarithmic bucket, so recording is one bisection and the memory does not grow. '''
+
+    def __init__(self):
+        self.aantallen = [0] * (len(GRENZEN) + 1)
+        self.n = 0
+        self.totaal = 0.0
+        self.max = 0.0
+
+    def voeg_toe(self, ms:float):
+        self.aantallen[bisect.bisect_right(GRENZEN, ms)] += 1
+        self.n += 1
+        self.totaal += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentiel(self, p:float) -> float:
+        # Upper edge of the bucket that holds the p-th percentile, in ms
+        if self.n == 0:
+            return float('nan')
+        rang = p / 100 * self.n
+        cumulatief = 0
+        for k, aantal in enumerate(self.aantallen):
+            cumulatief += aantal
+            if cumulatief >= rang and aantal > 0:
+                return min(GRENZEN[k], self.max) if k < len(GRENZEN) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"n": self.n, "gemiddelde_ms": self.totaal / self.n if self.n else None, "max_ms": self.max,
+                "p50_ms": self.percentiel(50), "p95_ms": self.percentiel(95), "p99_ms": self.percentiel(99),
+                "grenzen_ms": GRENZEN, "aantallen": self.aantallen}
+
+
+class Metrics:
+    def __init__(self, path:str=METRICS_FILE):
+        self.path = path
+        self.latenties = {}
+        self.drift = Histogram() # how much later than scheduled a tick fired, in ms
+        self.start = time.time()
+        self.vorige_export = time.perf_counter()
+
+    def latentie(self, naam:str, seconden:float):
+        histogram = self.latenties.get(naam)
+        if histogram is None:
+            histogram = self.latenties[naam] = Histogram()
+        histogram.voeg_toe(1000 * seconden)
+
+    def tick(self, te_laat:float):
+        ''' Called at the start of every tick, with the time in s since the moment it was scheduled for. '''
+        self.drift.voeg_toe(max(0.0, 1000 * te_laat)) # a tick that fires early counts as no drift
+        if time.perf_counter() - self.vorige_export > EXPORT_INTERVAL:
+            self.exporteer()
+
+    def to_dict(self) -> dict:
+        return {"start": self.start, "einde": time.time(),
+                "tick_drift": self.drift.to_dict(),
+                "latentie": {naam: histogram.to_dict() for naam, histogram in sorted(self.latenties.items())}}
+
+    def exporteer(self):
+        self.vorige_export = time.perf_counter()
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def tekst(self) -> str:
+        # Summary for the overlay
+        regels = [f"{'':<22}{'n':>6}{'p50':>8}{'p95':>8}{'max':>8}  [ms]"]
+        for naam, histogram in [("tick drift", self.drift)] + sorted(self.latenties.items()):
+            if histogram.n:
+                regels.append(f"{naam:<22}{histogram.n:>6}{histogram.percentiel(50):>8.1f}{histogram.percentiel(95):>8.1f}{histogram.max:>8.1f}")
+        return '\n'.join(regels)
+
+
+def gemeten(naam:str):
+    ''' Decorator that records the duration of every call in the histogram naam, if the metrics are switched on. '''
+    def decorator(functie):
+        @functools.wraps(functie)
+        def wrapper(*args, **kwargs):
+            metrics = actief
+            if metrics is None:
+                return functie(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return functie(*args, **kwargs)
+            finally:
+                metrics.latentie(naam, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,209 @@
+''' The match engine without the dashboard: events in, state and statistics out, as JSON lines.
+
+Motor plays a match on Wedstrijd with a virtual clock that follows the times of the events. It keeps no
+history and logs nothing; the memory only grows with the match in two places: the seconds per lineup, one
+entry for every lineup that was on the field (at most one per combination of the roster), and what is
+needed to undo the substitutions of the current period of play, which is dropped at every pause and
+unpause. Every event gives a line with the state after it; the end of the input gives a line with the
+statistics of the match. An event is a JSON object:
+
+    {"type": "unpause", "time": 1700000000.0}
+    {"type": "wissel", "time": 1700000060.5, "speler_uit": "Speler01", "speler_in": "Speler06"}
+    {"type": "lijnwissel", "time": ..., "speler_uit": ["Speler01", "Speler02"], "speler_in": ["Speler06", "Speler07"]}
+    {"type": "pause", "time": ...}
+    {"type": "undo"}, {"type": "redo"}
+    {"type": "afwezig", "speler": "Speler09"}, {"type": "bank", "speler": "Speler09"}
+    {"type": "stand", "time": ...}    (no change, only the state at that time)
+
+The time is in epoch seconds or a date like "2023-11-14 22:32:21.000"; without a time, the event happens at
+the time of the previous one. Lines of history.txt are accepted as well. An event that cannot be applied
+gives a line with "fout" and is skipped.
+
+Usage from the repository folder:
+    python motor.py --spelers spelers.txt < events.jsonl > stand.jsonl
+    python motor.py --spelers spelers.txt history.txt --alleen-einde
+'''
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from event_store import EventStore
+from history import HistoryItem
+from klok import VirtueleKlok
+from player_state import PlayerState, ACTIEF, BANK, AFWEZIG
+from wedstrijd import Wedstrijd
+
+
+N_OPSTELLINGEN = 5 # the longest lineups in the statistics
+
+
+def tijd(waarde) -> float:
+    if isinstance(waarde, str):
+        return datetime.fromisoformat(waarde).timestamp()
+    return float(waarde)
+
+
+class Motor:
+    ''' One match, fed one event at a time. verwerk() returns the state after the event as a dict, statistieken()
+    the statistics of the match so far. '''
+
+    def __init__(self, spelers:PlayerState):
+        self.klok = VirtueleKlok(start=0.0)
+        self.wedstrijd = Wedstrijd(spelers, clear_history=False, store=EventStore(path=None, text_log=None),
+                                   klok=self.klok, bewaar_history=False)
+        self.wedstrijd.logging = False
+        self.seq = 0
+        self.wissels = 0 # substitutions that were not undone, a line change counts per pair
+
+    @property
+    def spelers(self) -> PlayerState:
+        return self.wedstrijd.spelers
+
+    def verwerk(self, event:dict) -> dict:
+        ''' Apply event; raises ValueError or KeyError when it cannot be applied. '''
+        type = event["type"]
+        nu = tijd(event["time"]) if event.get("time") is not None else self.klok.nu()
+        if nu < self.klok.nu():
+            raise ValueError("The time of the event lies before that of the previous event.")
+        self.klok.naar(nu)
+        wedstrijd = self.wedstrijd
+        if type == 'unpause':
+            if not wedstrijd.paused:
+                raise ValueError("The match is already running.")
+            wedstrijd.unpause(nu)
+        elif type == 'pause':
+            if wedstrijd.paused:
+                raise ValueError("The match is already paused.")
+            wedstrijd.pause(nu)
+        elif type in ('wissel', 'lijnwissel'):
+            spelers_uit, spelers_in = event["speler_uit"], event["speler_in"]
+            if type == 'wissel':
+                spelers_uit, spelers_in = [spelers_uit], [spelers_in]
+            self.controleer(spelers_uit, ACTIEF)
+            self.controleer(spelers_in, BANK)
+            wedstrijd.lijnwissel(spelers_uit, spelers_in, nu)
+            if not wedstrijd.paused:
+                self.wissels += len(spelers_uit)
+        elif type == 'undo':
+            item = wedstrijd.undo_stack[-1].item if wedstrijd.undo_stack else None
+            if not wedstrijd.undo():
+                raise ValueError("There is nothing to undo.")
+            self.wissels -= len(item.paren()) if item is not None else 0
+        elif type == 'redo':
+            item = wedstrijd.redo_stack[-1].item if wedstrijd.redo_stack else None
+            if not wedstrijd.redo():
+                raise ValueError("There is nothing to redo.")
+            self.wissels += len(item.paren()) if item is not None else 0
+        elif type == 'afwezig':
+            self.controleer([event["speler"]], BANK)
+            wedstrijd.naar_afwezig(event["speler"])
+        elif type == 'bank':
+            self.controleer([event["speler"]], AFWEZIG)
+            wedstrijd.naar_bank(event["speler"])
+        elif type != 'stand':
+            raise ValueError(f"Unknown event type {type}.")
+        self.seq += 1
+        return self.stand(nu, type)
+
+    def controleer(self, namen, status:int):
+        # Raise when a player is unknown or does not have the status the event needs
+        for naam in namen:
+            if naam not in self.spelers.index:
+                raise KeyError(f"Unknown player {naam}.")
+            if self.spelers.status[self.spelers.index[naam]] != status:
+                raise ValueError(f"{naam} is not {('on the field', 'on the bench', 'absent')[status]}.")
+
+    def gespeeld(self, nu:float) -> list:
+        # The seconds played per player, up to nu
+        gespeeld = self.spelers.gespeeld.copy()
+        if not self.wedstrijd.paused:
+            actief = self.spelers.status == ACTIEF
+            gespeeld[actief] += nu - self.spelers.laatste_wijziging[actief]
+        return gespeeld.tolist()
+
+    def eerlijkheid(self, nu:float) -> dict:
+        stand = self.wedstrijd.eerlijkheid.stand(nu)
+        return {"gemiddeld": round(stand["gemiddeld"], 4), "spreiding": round(stand["spreiding"], 4),
+                "gini": round(stand["gini"], 4), "risico": [self.spelers.namen[idx] for idx in stand["risico"]]}
+
+    def stand(self, nu:float, type:str=None) -> dict:
+        namen = self.spelers.namen
+        return {"seq": self.seq, "type": type, "time": nu, "paused": self.wedstrijd.paused,
+                "veld": [namen[idx] for idx in self.spelers.op_volgorde(ACTIEF)],
+                "bank": [namen[idx] for idx in self.spelers.op_volgorde(BANK)],
+                "afwezig": [namen[idx] for idx in self.spelers.op_volgorde(AFWEZIG)],
+                "gespeeld": {naam: round(seconden, 1) for naam, seconden in zip(namen, self.gespeeld(nu))},
+                "eerlijkheid": self.eerlijkheid(nu)}
+
+    def statistieken(self) -> dict:
+        ''' The totals per player, the fairness, the substitutions and the longest lineups, at the last event. '''
+        nu = self.klok.nu()
+        spelers = self.spelers
+        projectie = self.wedstrijd.eerlijkheid.projectie(nu)
+        samenspel = self.wedstrijd.samenspel
+        opstellingen = sorted(samenspel.opstellingen_tot(nu).items(), key=lambda item: -item[1])[:N_OPSTELLINGEN]
+        return {"einde": True, "events": self.seq, "time": nu,
+                "speeltijd": round(self.wedstrijd.speeltijd_op(nu), 1),
+                "wissels": self.wissels,
+                "spelers": [{"naam": naam,
+                             "status": ("actief", "bank", "afwezig")[spelers.status[idx]],
+                             "gespeeld": round(gespeeld, 1),
+                             "richttijd": float(spelers.richttijd[idx]) if spelers.richttijd[idx] > 0 else None,
+                             "projectie": round(float(projectie[idx]), 4) if projectie[idx] == projectie[idx] else None}
+                            for idx, (naam, gespeeld) in enumerate(zip(spelers.namen, self.gespeeld(nu)))],
+                "eerlijkheid": self.eerlijkheid(nu),
+                "opstellingen": [{"spelers": samenspel.opstelling(masker), "seconden": round(seconden, 1)} for masker, seconden in opstellingen]}
+
+    def close(self):
+        self.wedstrijd.store.close()
+
+
+def lees_event(regel:str) -> dict:
+    # A JSON object, or a line of history.txt
+    if regel.startswith("{"):
+        return json.loads(regel)
+    item = HistoryItem.from_line(regel + "\n")
+    if item is None:
+        raise ValueError(f"Not an event: {regel}")
+    event = {"type": item.type, "time": item.time}
+    if item.type in ('wissel', 'lijnwissel'):
+        event.update(speler_uit=item.speler_uit, speler_in=item.speler_in)
+    return event
+
+
+def verwerk_stroom(motor:Motor, regels, uit, alleen_einde:bool=False):
+    ''' Feed the lines of regels to motor and write the state after every event, and the statistics at the
+    end, as JSON lines to uit. '''
+    for nummer, regel in enumerate(regels, start=1):
+        regel = regel.strip()
+        if not regel:
+            continue
+        try:
+            stand = motor.verwerk(lees_event(regel))
+        except (ValueError, KeyError, TypeError) as fout:
+            uit.write(json.dumps({"regel": nummer, "fout": fout.args[0] if fout.args else str(fout)}, ensure_ascii=False) + "\n")
+            continue
+        if not alleen_einde:
+            uit.write(json.dumps(stand, ensure_ascii=False) + "\n")
+            uit.flush()
+    uit.write(json.dumps(motor.statistieken(), ensure_ascii=False) + "\n")
+    uit.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play a match from a stream of events without the dashboard, with JSON lines out.")
+    parser.add_argument("events", nargs="?", help="file with one event per line, JSON or history.txt (default: standard input)")
+    parser.add_argument("--spelers", default="spelers.txt", help="the roster, like spelers.txt; the first five start")
+    parser.add_argument("--alleen-einde", action="store_true", help="only write the statistics at the end")
+    args = parser.parse_args()
+
+    motor = Motor(PlayerState.from_csv(args.spelers))
+    try:
+        if args.events is None:
+            verwerk_stroom(motor, sys.stdin, sys.stdout, alleen_einde=args.alleen_einde)
+        else:
+            with open(args.events, encoding="utf-8") as file:
+                verwerk_stroom(motor, file, sys.stdout, alleen_einde=args.alleen_einde)
+    finally:
+        motor.close()
@@ -0,0 +1,185 @@
+import csv
+import numpy as np
+
+
+# Status codes
+ACTIEF = 0
+BANK = 1
+AFWEZIG = 2
+STATUS_NAMEN = ("Actief", "Bank", "Afwezig")
+TOESTAND = ("status", "spot", "gespeeld", "gespeeld_perc", "laatste_wijziging") # the arrays that change during a match
+
+
+def gespeeld_percentage(gespeeld, richttijd):
+    # Players without a Richttijd are put at the back of the bench order (100 + seconds played).
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(richttijd > 0, gespeeld / (60*richttijd), 100 + gespeeld)
+
+
+class PlayerState:
+    ''' Array-backed store of the player state of a match.
+
+    Every column of the former DataFrame (Status, Spot, Gespeeld, Gespeeld% and Laatste wijziging) is a
+    fixed-size NumPy array indexed by player number. The names are kept in a list together with a
+    name-to-index map, so that all operations are a handful of vectorized array operations. '''
+
+    def __init__(self, namen, richttijd, n_actief:int=5):
+        self.namen = list(namen)
+        self.index = {naam: idx for idx, naam in enumerate(self.namen)}
+        n = len(self.namen)
+        n_actief = min(n_actief, n)
+
+        self.richttijd = np.asarray(richttijd, dtype=float)
+        self.status = np.concatenate((np.full(n_actief, ACTIEF), np.full(n - n_actief, BANK))).astype(np.int8)
+        self.spot = np.concatenate((np.arange(n_actief), np.arange(n - n_actief)))
+        self.gespeeld = np.zeros(n)
+        self.gespeeld_perc = np.zeros(n)
+        self.laatste_wijziging = np.full(n, -np.inf)
+
+    @classmethod
+    def from_frame(cls, spelers, n_actief:int=5):
+        # spelers is the DataFrame read from spelers.txt, indexed by 'Naam'
+        return cls(namen=spelers.index, richttijd=spelers["Richttijd"].to_numpy(dtype=float), n_actief=n_actief)
+
+    @classmethod
+    def from_csv(cls, path:str, n_actief:int=5):
+        ''' Read a roster like spelers.txt (columns Naam and Richttijd, an empty Richttijd is NaN) without pandas. '''
+        with open(path, newline='', encoding="utf-8-sig") as file:
+            rijen = list(csv.DictReader(file))
+        richttijd = [float(rij["Richttijd"]) if rij.get("Richttijd") else np.nan for rij in rijen]
+        return cls(namen=[rij["Naam"] for rij in rijen], richttijd=richttijd, n_actief=n_actief)
+
+    def to_dict(self, snapshot:tuple=None) -> dict:
+        # With snapshot, the state in the snapshot instead of the current one
+        status, spot, gespeeld, _, laatste_wijziging = snapshot if snapshot is not None else (getattr(self, veld) for veld in TOESTAND)
+        return {"namen": self.namen, 
+                "richttijd": self.richttijd.tolist(), 
+                "status": status.tolist(), 
+                "spot": spot.tolist(), 
+                "gespeeld": gespeeld.tolist(), 
+                "laatste_wijziging": laatste_wijziging.tolist()}
+
+    @classmethod
+    def from_dict(cls, data:dict):
+        spelers = cls(namen=data["namen"], richttijd=data["richttijd"])
+        spelers.status = np.asarray(data["status"], dtype=np.int8)
+        spelers.spot = np.asarray(data["spot"], dtype=spelers.spot.dtype)
+        spelers.gespeeld = np.asarray(data["gespeeld"], dtype=float)
+        spelers.laatste_wijziging = np.asarray(data["laatste_wijziging"], dtype=float)
+        spelers.update_gespeeld_perc()
+        return spelers
+
+    def __len__(self):
+        return len(self.namen)
+
+    def aantal(self, status:int) -> int:
+        return int(np.count_nonzero(self.status == status))
+
+    def op_volgorde(self, status:int) -> np.ndarray:
+        # Indices of the players with the given status, sorted by spot
+        idx = np.flatnonzero(self.status == status)
+        return idx[np.argsort(self.spot[idx], kind='stable')]
+
+    def actieve_spelers(self) -> np.ndarray:
+        # Names of the active players, sorted by spot
+        return np.array(self.namen, dtype=object)[self.op_volgorde(ACTIEF)]
+
+    def speler_op(self, status:int, spot:int) -> int:
+        # Index of the player at the given spot
+        return int(np.flatnonzero((self.status == status) & (self.spot == spot))[0])
+
+    def snapshot(self) -> tuple:
+        # Copies of the arrays that change; the names and the Richttijd are shared
+        return tuple(getattr(self, veld).copy() for veld in TOESTAND)
+
+    def ruil(self, snapshot:tuple) -> tuple:
+        ''' Make snapshot the current state and return the current state in its place. Nothing is copied:
+        every array has exactly one owner, so later changes in place never reach a snapshot. '''
+        huidig = tuple(getattr(self, veld) for veld in TOESTAND)
+        for veld, array in zip(TOESTAND, snapshot):
+            setattr(self, veld, array)
+        return huidig
+
+    def gewijzigd(self, snapshot:tuple) -> np.ndarray:
+        # Indices of the players whose status or time played differs from snapshot
+        status, _, gespeeld, _, laatste_wijziging = snapshot
+        return np.flatnonzero((self.status != status) | (self.gespeeld != gespeeld) | (self.laatste_wijziging != laatste_wijziging))
+
+    def update_gespeeld_perc(self):
+        self.gespeeld_perc = gespeeld_percentage(self.gespeeld, self.richttijd)
+
+    def unpause(self, tijdstip:float):
+        self.laatste_wijziging[self.status == ACTIEF] = tijdstip
+
+    def pause(self, tijdstip:float):
+        actief = self.status == ACTIEF
+        self.gespeeld[actief] += tijdstip - self.laatste_wijziging[actief]
+        self.laatste_wijziging[actief] = tijdstip
+        self.update_gespeeld_perc()
+
+    def wissel(self, uit:int, in_:int, tijdstip:float, running:bool):
+        # naar de bank
+        self.status[uit] = BANK
+        if running:
+            self.gespeeld[uit] += tijdstip - self.laatste_wijziging[uit]
+            self.laatste_wijziging[uit] = tijdstip
+
+        # van de bank
+        self.status[in_] = ACTIEF
+        if running:
+            self.laatste_wijziging[in_] = tijdstip
+
+        self.spot[uit], self.spot[in_] = self.spot[in_], self.spot[uit]
+        self.order_bench()
+
+    def lijnwissel(self, uit, in_, tijdstip:float, running:bool):
+        # Swap the players uit[i] and in_[i] (arrays of indices) at once, with a single bench reorder
+        uit, in_ = np.asarray(uit), np.asarray(in_)
+        self.status[uit] = BANK
+        self.status[in_] = ACTIEF
+        if running:
+            self.gespeeld[uit] += tijdstip - self.laatste_wijziging[uit]
+            self.laatste_wijziging[uit] = tijdstip
+            self.laatste_wijziging[in_] = tijdstip
+
+        self.spot[uit], self.spot[in_] = self.spot[in_], self.spot[uit]
+        self.order_bench()
+
+    def order_bench(self):
+        # Order the bench players based on the time they have been active
+        self.update_gespeeld_perc()
+        bench = np.flatnonzero(self.status == BANK)
+        self.spot[bench[np.argsort(self.gespeeld_perc[bench], kind='stable')]] = np.arange(len(bench))
+
+    def naar_afwezig(self, idx:int):
+        # Move a bench player to the end of the absent list and close the gap on the bench
+        bench_spot = self.spot[idx]
+        self.spot[idx] = self.aantal(AFWEZIG)
+        self.status[idx] = AFWEZIG
+        self.spot[(self.status == BANK) & (self.spot > bench_spot)] -= 1
+
+    def naar_bank(self, idx:int):
+        # Move an absent player to the bench and close the gap in the absent list
+        absent_spot = self.spot[idx]
+        self.status[idx] = BANK
+        self.order_bench()
+        self.spot[(self.status == AFWEZIG) & (self.spot > absent_spot)] -= 1
+
+    def to_frame(self, tot:float=None):
+        ''' Export to a DataFrame with the original column names, for reporting. With tot, the stints on the
+        field count up to tot, as if the match was paused then; the state itself is not changed. '''
+        import pandas as pd
+        gespeeld, laatste_wijziging = self.gespeeld, self.laatste_wijziging
+        if tot is not None:
+            actief = self.status == ACTIEF
+            gespeeld = np.where(actief, gespeeld + tot - laatste_wijziging, gespeeld)
+            laatste_wijziging = np.where(actief, tot, laatste_wijziging)
+        # The DataFrame copies the arrays
+        frame = pd.DataFrame({"Richttijd": self.richttijd,
+                              "Status": np.array(STATUS_NAMEN, dtype=object)[self.status],
+                              "Spot": self.spot,
+                              "Gespeeld": gespeeld,
+                              "Gespeeld%": gespeeld_percentage(gespeeld, self.richttijd),
+                              "Laatste wijziging": laatste_wijziging},
+                             index=pd.Index(self.namen, name="Naam"))
+        return frame
@@ -0,0 +1,53 @@
+''' Substitution advice: every (field player, bench player) pair is scored in one vectorized pass, cheap
+enough to be repeated on every tick of the dashboard. '''
+import numpy as np
+
+from player_state import ACTIEF, BANK
+from display import health
+
+
+DREMPEL = 0.5 # minimal score of an advice: e.g. a stint of time_ref against a fully rested bench player
+
+
+class Recommender:
+    ''' The score of substituting field player i by bench player j is
+
+        gewicht_health * (health[j] - health[i]) + gewicht_richttijd * (Gespeeld%[i] - Gespeeld%[j])
+
+    with the health model of the dashboard: the field player gets tired with the length of the stint, the
+    bench player recovers with the time on the bench. The second term favours the players that are behind
+    on their Richttijd; it is left out for players without a Richttijd. '''
+
+    def __init__(self, time_ref:float, gewicht_health:float=1.0, gewicht_richttijd:float=1.0, drempel:float=DREMPEL):
+        self.time_ref = time_ref
+        self.gewicht_health = gewicht_health
+        self.gewicht_richttijd = gewicht_richttijd
+        self.drempel = drempel
+
+    def scores(self, spelers, paused:bool, now:float) -> tuple:
+        ''' Returns the indices of the field players, of the bench players and the matrix of their scores. '''
+        uit, in_ = np.flatnonzero(spelers.status == ACTIEF), np.flatnonzero(spelers.status == BANK)
+        h = health(spelers, paused, now, self.time_ref)
+
+        # Gespeeld% including the running stints
+        gespeeld = spelers.gespeeld.copy()
+        if not paused:
+            lopend = uit[np.isfinite(spelers.laatste_wijziging[uit])]
+            gespeeld[lopend] += now - spelers.laatste_wijziging[lopend]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc = np.where(spelers.richttijd > 0, gespeeld / (60*spelers.richttijd), np.nan)
+
+        verschil = perc[uit][:, None] - perc[in_][None, :]
+        score = self.gewicht_health * (h[in_][None, :] - h[uit][:, None]) \
+              + self.gewicht_richttijd * np.where(np.isnan(verschil), 0.0, verschil)
+        return uit, in_, score
+
+    def beste(self, spelers, paused:bool, now:float):
+        ''' The best substitution as (field player, bench player) indices, or None if no pair reaches the drempel. '''
+        uit, in_, score = self.scores(spelers, paused, now)
+        if score.size == 0:
+            return None
+        i, j = np.unravel_index(np.argmax(score), score.shape)
+        if score[i, j] < self.drempel:
+            return None
+        return int(uit[i]), int(in_[j])
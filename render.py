@@ -0,0 +1,96 @@
+''' Headless rendering of match overviews (wedstrijdoverzicht.png) for many matches at once.
+
+The overviews are drawn on the Agg backend with a fixed size and DPI, in parallel worker processes, and
+saved without time-dependent metadata, so the same history always gives the same PNG.
+
+Usage from the repository folder:
+    python render.py archief/*.txt --db wedstrijden.sqlite --spelers spelers.txt --out rapporten
+'''
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from history import HistoryItem
+from player_state import gespeeld_percentage
+from report import teken_overzicht
+from season import database_bronnen, lees_bron
+from stints import speelbeurten
+
+
+RENDER_DPI = 100
+RENDER_SIZE = (19.2, 10.8) # inches, 1920x1080 pixels at RENDER_DPI
+
+
+def spelers_uit_history(history, roster=None):
+    ''' The spelers frame for the report, rebuilt from the history. roster (the DataFrame of spelers.txt)
+    fixes the order of the players, and thereby their colours, and provides the Richttijd. '''
+    import pandas as pd
+    beurten = speelbeurten(history)
+    namen = list(roster.index) if roster is not None else []
+    for speler in beurten.speler:
+        if speler not in namen:
+            namen.append(speler)
+    spelers = pd.DataFrame(index=pd.Index(namen, name="Naam"))
+    spelers["Richttijd"] = roster["Richttijd"].reindex(namen).to_numpy(dtype=float) if roster is not None else np.nan
+    spelers["Gespeeld"] = pd.Series(beurten.duur, index=beurten.speler).groupby(level=0).sum().reindex(namen, fill_value=0.0).to_numpy()
+    spelers["Gespeeld%"] = gespeeld_percentage(spelers["Gespeeld"].to_numpy(), spelers["Richttijd"].to_numpy())
+    return spelers
+
+
+def render_history(history, out_path:str, roster=None, dpi:int=RENDER_DPI, size:tuple=RENDER_SIZE) -> str:
+    history = list(history)
+    if not history:
+        raise ValueError("The history has no events, there is no overview to render.")
+    if history[-1].type != 'pause':
+        history.append(HistoryItem(type='pause', time=history[-1].time)) # close the running stints
+
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    teken_overzicht(fig, spelers=spelers_uit_history(history, roster), history=history)
+    fig.savefig(out_path, dpi=dpi, metadata={'Software': None})
+    return out_path
+
+def render_bron(bron, out_path:str, roster=None, dpi:int=RENDER_DPI, size:tuple=RENDER_SIZE) -> str:
+    # Runs in a worker process; a match without events gives no overview (None)
+    history = lees_bron(bron)
+    if not history:
+        return None
+    return render_history(history, out_path, roster=roster, dpi=dpi, size=size)
+
+
+def uitvoer_naam(bron) -> str:
+    if isinstance(bron, tuple):
+        return f"wedstrijd_{bron[1]}.png"
+    return os.path.splitext(os.path.basename(bron))[0] + ".png"
+
+def render_matches(bronnen, out_dir:str, roster=None, workers:int=None, dpi:int=RENDER_DPI, size:tuple=RENDER_SIZE) -> list:
+    ''' Render the overview of every source (history file or (database, wedstrijd_id)) into out_dir. Returns
+    the path of every overview, None for a source without events, which is skipped. '''
+    os.makedirs(out_dir, exist_ok=True)
+    bronnen = list(bronnen)
+    out_paths = [os.path.join(out_dir, uitvoer_naam(bron)) for bron in bronnen]
+    if workers == 1 or len(bronnen) <= 1:
+        return [render_bron(bron, out_path, roster, dpi, size) for bron, out_path in zip(bronnen, out_paths)]
+    n = len(bronnen)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_bron, bronnen, out_paths, [roster]*n, [dpi]*n, [size]*n))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render the overview of many matches without a display.")
+    parser.add_argument("logs", nargs="*", help="archived history files")
+    parser.add_argument("--db", help="event database (all matches in it are rendered)")
+    parser.add_argument("--spelers", help="roster like spelers.txt, for consistent colours and the Richttijd")
+    parser.add_argument("--out", default="rapporten")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    import pandas as pd
+    roster = pd.read_csv(args.spelers, index_col='Naam') if args.spelers else None
+    bronnen = list(args.logs) + (database_bronnen(args.db) if args.db else [])
+    for bron, out_path in zip(bronnen, render_matches(bronnen, args.out, roster=roster, workers=args.workers)):
+        print(out_path if out_path is not None else f"{bron}: no events, skipped")
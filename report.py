@@ -0,0 +1,219 @@
+''' The match overview (wedstrijdoverzicht): timeline of the stints, total time per player, distribution
+and evolution of the stint durations.
+
+Only the matplotlib object API is used here, so the overview can be drawn on any figure: the interactive
+one of the dashboard or a headless Agg figure (see render.py). '''
+import itertools
+import time
+import numpy as np
+import matplotlib
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba, to_rgba_array
+from matplotlib.font_manager import FontProperties
+from matplotlib.ticker import FuncFormatter
+
+from display import time_to_string
+from stints import speelbeurten, inlier_bounds, inliers
+
+
+def kleuren(n:int) -> list:
+    # Up to 20 distinct colours
+    return list(matplotlib.colormaps['tab10'].colors + matplotlib.colormaps['tab20'].colors[1::2])[:n]
+
+def cyclische_kleuren(n:int) -> list:
+    return list(itertools.islice(itertools.cycle(matplotlib.colormaps['tab20'].colors), n))
+
+
+class StintLabels(Artist):
+    ''' The labels of all stints of the timeline as one artist, drawn in a single pass over the renderer,
+    centered on (x, y) like ax.text(ha='center', va='center') would. '''
+
+    def __init__(self, x, y, teksten, color='k', linespacing:float=1.2):
+        super().__init__()
+        self.set_data(x, y, teksten)
+        self.color = color
+        self.linespacing = linespacing
+        self.fontproperties = FontProperties()
+        self.set_zorder(3)
+
+    def set_data(self, x, y, teksten):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.teksten = [tekst.split('\n') for tekst in teksten]
+        self.stale = True
+
+    def voeg_toe(self, x, y, teksten):
+        self.x = np.append(self.x, x)
+        self.y = np.append(self.y, y)
+        self.teksten += [tekst.split('\n') for tekst in teksten]
+        self.stale = True
+
+    def kort_in(self, n:int):
+        # Keep only the first n labels
+        self.x, self.y, self.teksten = self.x[:n], self.y[:n], self.teksten[:n]
+        self.stale = True
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible() or len(self.teksten) == 0:
+            return
+        renderer.open_group('stint_labels', self.get_gid())
+        gc = renderer.new_gc()
+        gc.set_foreground(to_rgba(self.color), isRGBA=True)
+        gc.set_alpha(self.get_alpha())
+
+        _, lp_h, lp_d = renderer.get_text_width_height_descent("lp", self.fontproperties, ismath=False)
+        ascent = lp_h - lp_d
+        dy = ascent * self.linespacing + lp_d # baseline to baseline, as in Text
+        _, canvash = renderer.get_canvas_width_height()
+        posities = self.axes.transData.transform(np.column_stack((self.x, self.y)))
+        breedtes = {} # names and durations repeat, measure each line once
+        for (posx, posy), regels in zip(posities, self.teksten):
+            hoogte = ascent + (len(regels) - 1)*dy + lp_d
+            baseline = posy + hoogte/2 - ascent
+            for regel in regels:
+                if regel not in breedtes:
+                    breedtes[regel] = renderer.get_text_width_height_descent(regel, self.fontproperties, ismath=False)[0]
+                breedte = breedtes[regel]
+                renderer.draw_text(gc, posx - breedte/2, canvash - baseline if renderer.flipy() else baseline, 
+                                   regel, self.fontproperties, 0, ismath=False)
+                baseline -= dy
+
+        gc.restore()
+        renderer.close_group('stint_labels')
+        self.stale = False
+
+
+def stint_vertices(beurten, height:float=0.8) -> np.ndarray:
+    # One rectangle per stint, shape (n, 4, 2)
+    links, rechts = beurten.begin, beurten.einde
+    onder, boven = beurten.lane - height/2, beurten.lane + height/2
+    return np.stack((np.column_stack((links, onder)), np.column_stack((links, boven)), 
+                     np.column_stack((rechts, boven)), np.column_stack((rechts, onder))), axis=1).reshape(-1, 4, 2)
+
+def stint_teksten(beurten) -> list:
+    return [f'{speler}\n{time_to_string(duur)}' for speler, duur in zip(beurten.speler, beurten.duur)]
+
+def draw_stints(ax, beurten, colours, height:float=0.8):
+    ''' The timeline: all stints as one PolyCollection and their labels as one StintLabels artist. '''
+    collection = ax.add_collection(PolyCollection(stint_vertices(beurten, height), facecolors=colours, edgecolors='none'))
+    ax.autoscale_view(scalex=False)
+    labels = ax.add_artist(StintLabels(x = (beurten.begin + beurten.einde)/2, 
+                                       y = beurten.lane, 
+                                       teksten = stint_teksten(beurten)))
+    return collection, labels
+
+def verwijder_keeper_outliers(spelers):
+    bounds = inlier_bounds(np.concatenate(spelers['Speelduren'].values))
+
+    # remove outliers
+    for speler in spelers.index:
+        mask = inliers(spelers.at[speler,'Speelduren'], bounds)
+        if np.all(mask):
+            continue
+        spelers.at[speler,'Speelbeurten_begin'] = np.array(spelers.at[speler,'Speelbeurten_begin'])[mask]
+        spelers.at[speler,'Speelbeurten_einde'] = np.array(spelers.at[speler,'Speelbeurten_einde'])[mask]
+        spelers.at[speler,'Speelduren'] = spelers.at[speler,'Speelduren'][mask]
+        spelers.at[speler,'Gespeeld'] = np.sum(spelers.at[speler,'Speelduren'])
+    spelers["Gespeeld%"] = np.where(spelers["Richttijd"] > 0, spelers["Gespeeld"] / (60*spelers["Richttijd"]), 100 + spelers["Gespeeld"])
+
+def hbar_total_time_per_player(spelers, ax):
+    ax.set_xlabel('Totale speeltijd per speler')
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: time_to_string(x)))
+    ax.invert_yaxis()
+    ax.yaxis.set_visible(False)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    container = ax.barh(y = spelers.index,
+                        width = spelers['Gespeeld'],
+                        color = spelers['Colour'])
+    ax.bar_label(container, labels=[f'{speler} - {time_to_string(gespeeld)} ({gespeeld_perc:.0%})' if richttijd > 0
+                                else f'{speler} - {time_to_string(gespeeld)}' for speler, gespeeld, gespeeld_perc, richttijd in zip(spelers.index, spelers['Gespeeld'], spelers['Gespeeld%'], spelers['Richttijd'])], label_type='center')
+
+def hist_playtimes_per_player(spelers, ax):
+    ax.set_xlabel('Duur per speelbeurt')
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: time_to_string(x)))
+    ax.yaxis.set_visible(False)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    _,bins,_ = ax.hist( x = spelers['Speelduren'].values,
+                        bins = int(np.round(np.sqrt(np.sum([len(duren) for duren in spelers['Speelduren'].values])))),
+                        color = spelers['Colour'],
+                        stacked=True, density=True)
+    ax.set_xticks(bins) # Set the x-ticks at the bin edges
+
+def scatter_playdur_evolution(spelers, ax):
+    ax.set_xlabel('Tijd')
+    ax.set_ylabel('Duur speelbeurt')
+
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: time.strftime("%Hh%M", time.gmtime(np.round(x)))))
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda y, _: time_to_string(y)))
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    aantal = [len(duren) for duren in spelers['Speelduren']]
+    return ax.scatter(np.concatenate([np.asarray(begin, dtype=float) for begin in spelers['Speelbeurten_begin']]),
+                      np.concatenate([np.asarray(duren, dtype=float) for duren in spelers['Speelduren']]),
+                      color = np.repeat(np.asarray(to_rgba_array(spelers['Colour'])), aantal, axis=0))
+
+
+def overzicht_assen(fig) -> tuple:
+    # The timeline on top, the total time per player bottom left, the stint durations bottom right
+    gs = fig.add_gridspec(3,2)
+    ax_history = fig.add_subplot(gs[0,:])
+    ax_time_per_player = fig.add_subplot(gs[1:,0])
+    ax_playdur_distr = fig.add_subplot(gs[1,1])
+    ax_playdur_evolution = fig.add_subplot(gs[2,1])
+    fig.tight_layout()
+
+    ax_history.invert_yaxis()
+    ax_history.axis('off')
+    return ax_history, ax_time_per_player, ax_playdur_distr, ax_playdur_evolution
+
+def teken_overzicht(fig, spelers, history, beurten=None, tot:float=None):
+    ''' Draw the overview of a match on fig, up to tot or, by default, up to the last item of the history.
+
+    spelers is the DataFrame of PlayerState.to_frame() (or at least its Richttijd and Gespeeld columns) for
+    the whole roster, history the list of HistoryItems. beurten are its stints, when they are already known
+    (Wedstrijd.stints); otherwise the history is replayed. '''
+    spelers = spelers.copy()
+    # Geef iedere speler een kleur en verwijder afwezige spelers.
+    if len(spelers) <= 20:
+        # Elke speler krijgt een unieke kleur. Die is onafhankelijk van wie aanwezig is, en dus zijn de kleuren in alle wedstrijden dezelfde.
+        spelers['Colour'] = kleuren(len(spelers))
+        spelers = spelers.loc[spelers['Gespeeld'] > 0]
+    else:
+        # Er zijn meer spelers dan er kleuren zijn.
+        spelers = spelers.loc[spelers['Gespeeld'] > 0]
+        if len(spelers) <= 20:
+            # Elke speler krijgt voor deze wedstrijd een unieke kleur.
+            spelers['Colour'] = kleuren(len(spelers))
+        else:
+            # In het onwaarschijnlijke geval dat er meer dan 20 spelers deelnamen aan deze wedstrijd, krijgen sommige spelers dezelfde kleur.
+            spelers['Colour'] = cyclische_kleuren(len(spelers))
+
+    spelers['Speelbeurten_begin'] = [[] for _ in range(len(spelers))]
+    spelers['Speelbeurten_einde'] = [[] for _ in range(len(spelers))]
+    spelers.sort_values(by='Gespeeld', inplace=True)
+
+    ax_history, ax_time_per_player, ax_playdur_distr, ax_playdur_evolution = overzicht_assen(fig)
+    ax_history.set_xlim(history[0].time, history[-1].time if tot is None else tot)
+
+    if beurten is None:
+        beurten = speelbeurten(history, tot=tot)
+    draw_stints(ax_history, beurten, colours=spelers.loc[beurten.speler, 'Colour'].tolist())
+    for speler, start, end in zip(beurten.speler, beurten.begin, beurten.einde):
+        spelers.at[speler, 'Speelbeurten_begin'].append(start)
+        spelers.at[speler, 'Speelbeurten_einde'].append(end)
+
+    spelers['Speelduren'] = [np.array(einde) - np.array(begin) for begin, einde in zip(spelers['Speelbeurten_begin'], spelers['Speelbeurten_einde'])]
+    verwijder_keeper_outliers(spelers)
+    spelers = spelers.loc[spelers['Gespeeld'] > 0]
+
+    hbar_total_time_per_player(spelers=spelers, ax=ax_time_per_player)
+    hist_playtimes_per_player(spelers, ax=ax_playdur_distr)
+    scatter_playdur_evolution(spelers, ax=ax_playdur_evolution)
+    return fig
@@ -0,0 +1,139 @@
+''' Which players played together: the time on the field per pair of players and per lineup.
+
+Samenspel follows the history of a match one item at a time, like SpeelbeurtenIndex. It keeps
+
+- paren: a matrix with, per pair of players, the seconds they were on the field together;
+- opstellingen: per lineup, the seconds it was on the field, keyed by a bitmask of the players on the field
+  (bit i is the i'th player of the roster).
+
+A pair is only updated when it ends: when a player leaves the field, the time together with each of the
+others on the field is added, so a substitution costs O(k) for k players on the field and a lineup costs one
+dict update. The pairs and the lineup that are still on the field are added when they are queried, so the
+tables can be read at any moment of the match, and undoing a substitution subtracts exactly what it added. '''
+import csv
+import numpy as np
+
+
+PAREN_FILE = "samenspel.csv"
+OPSTELLINGEN_FILE = "opstellingen.csv"
+
+
+class Samenspel:
+    def __init__(self, namen):
+        self.namen = list(namen)
+        self.index = {naam: idx for idx, naam in enumerate(self.namen)}
+        self.paren = np.zeros((len(self.namen), len(self.namen)))
+        self.opstellingen = {} # bitmask -> seconds
+
+        self.op_het_veld = {} # player index -> time the player came on the field
+        self.masker = 0 # the lineup on the field
+        self.sinds = None # the time the lineup came on the field
+        self.running = False
+        self.wissels = [] # per substitution of the current period: (uit, its time on the field, previous lineup, since)
+
+    @classmethod
+    def uit_history(cls, namen, history):
+        samenspel = cls(namen)
+        for HI in history:
+            samenspel.voeg_toe(HI)
+        return samenspel
+
+    def voeg_toe(self, HI):
+        if HI.type == 'unpause':
+            self.op_het_veld = {self.index[speler]: HI.time for speler in HI.spelers}
+            self.masker = sum(1 << idx for idx in self.op_het_veld)
+            self.sinds = HI.time
+            self.running = True
+            self.wissels.clear()
+        elif HI.type == 'pause':
+            if self.running:
+                self.sluit_opstelling(HI.time)
+                for idx in list(self.op_het_veld):
+                    self.verlaat(idx, HI.time)
+            self.running = False
+            self.wissels.clear()
+        elif HI.type in ('wissel', 'lijnwissel'):
+            # The pairs of a line change one after the other; the lineups in between last zero seconds
+            for speler_uit, speler_in in HI.paren():
+                uit, in_ = self.index[speler_uit], self.index[speler_in]
+                self.wissels.append((uit, self.op_het_veld[uit], self.masker, self.sinds))
+                self.sluit_opstelling(HI.time)
+                self.verlaat(uit, HI.time)
+                self.op_het_veld[in_] = HI.time
+                self.masker ^= (1 << uit) | (1 << in_)
+                self.sinds = HI.time
+
+    def verwijder(self, HI):
+        ''' Undo voeg_toe(HI) for the last item, a substitution or a line change. '''
+        if HI.type not in ('wissel', 'lijnwissel'):
+            raise ValueError(f"Only a substitution can be removed, not {HI.type}.")
+        for _, speler_in in reversed(HI.paren()):
+            uit, begin, masker, sinds = self.wissels.pop()
+            del self.op_het_veld[self.index[speler_in]]
+            for idx, begin_idx in self.op_het_veld.items():
+                samen = HI.time - max(begin, begin_idx)
+                self.paren[uit, idx] -= samen
+                self.paren[idx, uit] -= samen
+            self.op_het_veld[uit] = begin
+            if HI.time > sinds:
+                self.opstellingen[masker] -= HI.time - sinds
+                if self.opstellingen[masker] == 0:
+                    del self.opstellingen[masker]
+            self.masker, self.sinds = masker, sinds
+
+    def verlaat(self, idx:int, tijd:float):
+        # Player idx leaves the field: the pairs with the players that stay end
+        begin = self.op_het_veld.pop(idx)
+        for ander, begin_ander in self.op_het_veld.items():
+            samen = tijd - max(begin, begin_ander)
+            self.paren[idx, ander] += samen
+            self.paren[ander, idx] += samen
+
+    def sluit_opstelling(self, tijd:float):
+        if tijd > self.sinds:
+            self.opstellingen[self.masker] = self.opstellingen.get(self.masker, 0.0) + tijd - self.sinds
+
+    def samen(self, speler_a, speler_b, tot:float=None) -> float:
+        ''' The seconds speler_a and speler_b were on the field together; pairs on the field count up to tot. '''
+        a, b = self.index[speler_a], self.index[speler_b]
+        samen = self.paren[a, b]
+        if tot is not None and self.running and a in self.op_het_veld and b in self.op_het_veld and a != b:
+            samen += tot - max(self.op_het_veld[a], self.op_het_veld[b])
+        return float(samen)
+
+    def paren_tot(self, tot:float=None) -> np.ndarray:
+        # A copy of the matrix with the pairs that are on the field counted up to tot
+        paren = self.paren.copy()
+        if tot is not None and self.running:
+            idx = np.fromiter(self.op_het_veld, dtype=np.int64)
+            begin = np.fromiter(self.op_het_veld.values(), dtype=float)
+            samen = tot - np.maximum.outer(begin, begin)
+            np.fill_diagonal(samen, 0)
+            paren[np.ix_(idx, idx)] += samen
+        return paren
+
+    def opstellingen_tot(self, tot:float=None) -> dict:
+        # A copy of the lineup table with the lineup on the field counted up to tot
+        opstellingen = dict(self.opstellingen)
+        if tot is not None and self.running and tot > self.sinds:
+            opstellingen[self.masker] = opstellingen.get(self.masker, 0.0) + tot - self.sinds
+        return opstellingen
+
+    def opstelling(self, masker:int) -> list:
+        # The names of the players of a lineup, in the order of the roster
+        return [naam for idx, naam in enumerate(self.namen) if masker >> idx & 1]
+
+    def exporteer(self, paren_path:str=PAREN_FILE, opstellingen_path:str=OPSTELLINGEN_FILE, tot:float=None):
+        ''' Write the minutes per pair, for the players that played, and the minutes per lineup, longest first. '''
+        paren = self.paren_tot(tot) / 60
+        gespeeld = np.flatnonzero(paren.any(axis=1))
+        with open(paren_path, "w", newline='', encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Naam"] + [self.namen[idx] for idx in gespeeld])
+            for idx in gespeeld:
+                writer.writerow([self.namen[idx]] + [f"{paren[idx, ander]:.1f}" for ander in gespeeld])
+        with open(opstellingen_path, "w", newline='', encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Minuten", "Opstelling"])
+            for masker, seconden in sorted(self.opstellingen_tot(tot).items(), key=lambda item: -item[1]):
+                writer.writerow([f"{seconden / 60:.1f}", ", ".join(self.opstelling(masker))])
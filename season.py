@@ -0,0 +1,219 @@
+''' Season analytics: statistics over many matches.
+
+Every match history (an archived history.txt or a match in wedstrijden.sqlite) is replayed into stints
+once, by a pool of worker processes, and cached as one .npy file per column. Later runs memory-map the
+cached columns and only process the matches that are new or changed.
+
+Usage from the repository folder:
+    python season.py archief/*.txt --db wedstrijden.sqlite --spelers spelers.txt
+'''
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from history import read_history, zonder_undo
+from event_store import read_events
+from stints import speelbeurten, inlier_bounds, inliers
+
+
+CACHE_DIR = "seizoen_cache"
+KOLOMMEN = ("speler", "lane", "begin", "einde", "inlier")
+CACHE_VERSIE = 1
+
+
+def database_bronnen(path:str) -> list:
+    # All matches with events in the database, as (path, wedstrijd_id)
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [(path, wedstrijd_id) for (wedstrijd_id,) in connection.execute("SELECT DISTINCT wedstrijd FROM events ORDER BY wedstrijd")]
+    finally:
+        connection.close()
+
+def bron_sleutel(bron) -> str:
+    if isinstance(bron, tuple):
+        tekst = f"db:{os.path.abspath(bron[0])}#{bron[1]}"
+    else:
+        tekst = f"log:{os.path.abspath(bron)}"
+    return hashlib.sha1(tekst.encode("utf-8")).hexdigest()[:16]
+
+def bron_versie(bron) -> list:
+    # Changes whenever the source changes
+    if isinstance(bron, tuple):
+        connection = sqlite3.connect(f"file:{bron[0]}?mode=ro", uri=True)
+        try:
+            return list(connection.execute("SELECT COUNT(*), MAX(tijd) FROM events WHERE wedstrijd = ?", (bron[1],)).fetchone())
+        finally:
+            connection.close()
+    stat = os.stat(bron)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def lees_bron(bron) -> list:
+    # The history without the items that were undone
+    if isinstance(bron, tuple):
+        return zonder_undo(read_events(path=bron[0], wedstrijd_id=bron[1]))
+    return zonder_undo(read_history(path=bron))
+
+
+def verwerk_bron(bron, cache_dir:str) -> str:
+    ''' Replay one match into stints and write them to the cache. Runs in a worker process. '''
+    versie = bron_versie(bron)
+    history = lees_bron(bron)
+    beurten = speelbeurten(history, tot=history[-1].time if history else None)
+    beurten = beurten.select(beurten.duur > 0)
+
+    namen, codes = np.unique(beurten.speler.astype(str), return_inverse=True)
+    kolommen = {"speler": codes.astype(np.int32),
+                "lane": beurten.lane.astype(np.int8),
+                "begin": beurten.begin,
+                "einde": beurten.einde,
+                "inlier": inliers(beurten.duur, inlier_bounds(beurten.duur))}
+
+    # Write into a temporary folder and rename it, so that an interrupted run leaves no half-written match behind
+    sleutel = bron_sleutel(bron)
+    folder = os.path.join(cache_dir, sleutel)
+    tmp_folder = folder + ".tmp"
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+    for kolom, waarden in kolommen.items():
+        np.save(os.path.join(tmp_folder, f"{kolom}.npy"), waarden)
+    with open(os.path.join(tmp_folder, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump({"cache_versie": CACHE_VERSIE, "bron": bron, "versie": versie, "namen": namen.tolist()}, file)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(tmp_folder, folder)
+    return sleutel
+
+
+class Seizoen:
+    def __init__(self, bronnen, cache_dir:str=CACHE_DIR, workers:int=None):
+        self.bronnen = list(bronnen)
+        self.cache_dir = cache_dir
+        self.workers = workers
+
+    def verouderd(self) -> list:
+        # The sources of which the cache is missing or outdated
+        verouderd = []
+        for bron in self.bronnen:
+            meta_path = os.path.join(self.cache_dir, bron_sleutel(bron), "meta.json")
+            try:
+                with open(meta_path, encoding="utf-8") as file:
+                    meta = json.load(file)
+                if meta["cache_versie"] == CACHE_VERSIE and meta["versie"] == bron_versie(bron):
+                    continue
+            except (OSError, ValueError, KeyError):
+                pass
+            verouderd.append(bron)
+        return verouderd
+
+    def ingest(self) -> int:
+        ''' Bring the cache up to date. Returns the number of matches that were (re)processed. '''
+        verouderd = self.verouderd()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if len(verouderd) <= 1 or self.workers == 1:
+            for bron in verouderd:
+                verwerk_bron(bron, self.cache_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(verwerk_bron, verouderd, [self.cache_dir]*len(verouderd), chunksize=max(1, len(verouderd) // (4*(self.workers or os.cpu_count() or 1)))))
+        return len(verouderd)
+
+    def laad(self) -> dict:
+        ''' All stints of the season in columnar form. The cached columns are memory-mapped, only the
+        concatenation is held in memory. '''
+        self.ingest()
+        namen, kolommen = {}, {kolom: [] for kolom in KOLOMMEN + ("wedstrijd",)}
+        for wedstrijd, bron in enumerate(self.bronnen):
+            folder = os.path.join(self.cache_dir, bron_sleutel(bron))
+            with open(os.path.join(folder, "meta.json"), encoding="utf-8") as file:
+                lokale_namen = json.load(file)["namen"]
+            globale_codes = np.array([namen.setdefault(naam, len(namen)) for naam in lokale_namen], dtype=np.int32)
+            for kolom in KOLOMMEN:
+                waarden = np.load(os.path.join(folder, f"{kolom}.npy"), mmap_mode='r')
+                kolommen[kolom].append(globale_codes[waarden] if kolom == "speler" else waarden)
+            kolommen["wedstrijd"].append(np.full(len(kolommen["begin"][-1]), wedstrijd, dtype=np.int32))
+
+        seizoen = {kolom: np.concatenate(waarden) if waarden else np.empty(0) for kolom, waarden in kolommen.items()}
+        seizoen["speler"] = seizoen["speler"].astype(np.int64)
+        seizoen["wedstrijd"] = seizoen["wedstrijd"].astype(np.int64)
+        seizoen["inlier"] = seizoen["inlier"].astype(bool)
+        seizoen["duur"] = seizoen["einde"] - seizoen["begin"]
+        seizoen["namen"] = np.array(list(namen), dtype=object)
+        return seizoen
+
+    def totalen(self, richttijd:dict=None, tolerantie:float=0.1):
+        ''' Per player: matches, total time (with and without the keeper outliers), stints, the stint length
+        distribution and how well the Richttijd (in minutes per match) was met. '''
+        import pandas as pd
+        s = self.laad()
+        n_spelers, n_wedstrijden = len(s["namen"]), len(self.bronnen)
+
+        # Time per (player, match), keeper outliers excluded, as in the match report
+        paar = s["speler"] * n_wedstrijden + s["wedstrijd"]
+        gespeeld_per_wedstrijd = np.bincount(paar, weights=s["duur"] * s["inlier"], minlength=n_spelers*n_wedstrijden).reshape(n_spelers, n_wedstrijden)
+        meegespeeld = np.bincount(paar, minlength=n_spelers*n_wedstrijden).reshape(n_spelers, n_wedstrijden) > 0
+
+        inlier_duur = s["duur"][s["inlier"]]
+        inlier_speler = s["speler"][s["inlier"]]
+        volgorde = np.argsort(inlier_speler, kind='stable')
+        per_speler = np.split(inlier_duur[volgorde], np.cumsum(np.bincount(inlier_speler, minlength=n_spelers))[:-1])
+
+        totalen = pd.DataFrame({
+            "Wedstrijden": meegespeeld.sum(axis=1),
+            "Gespeeld": np.bincount(s["speler"], weights=s["duur"], minlength=n_spelers),
+            "Gespeeld zonder uitschieters": gespeeld_per_wedstrijd.sum(axis=1),
+            "Speelbeurten": np.array([len(duren) for duren in per_speler]),
+            "Gem. speelbeurt": [np.mean(duren) if len(duren) else np.nan for duren in per_speler],
+            "Mediaan speelbeurt": [np.median(duren) if len(duren) else np.nan for duren in per_speler],
+            "P90 speelbeurt": [np.percentile(duren, 90) if len(duren) else np.nan for duren in per_speler],
+        }, index=pd.Index(s["namen"], name="Naam"))
+
+        if richttijd is not None:
+            doel = np.array([richttijd.get(naam, np.nan) for naam in s["namen"]], dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = gespeeld_per_wedstrijd / (60*doel[:, None])
+            ratio = np.where(meegespeeld & (doel[:, None] > 0), ratio, np.nan)
+            with np.errstate(invalid='ignore'):
+                binnen = np.abs(ratio - 1) <= tolerantie
+            aantal = np.sum(~np.isnan(ratio), axis=1)
+            totalen["Richttijd"] = doel
+            # NaN for a player without matches with a Richttijd, like the other averages
+            totalen["Gem. Gespeeld%"] = np.where(aantal > 0, np.nansum(ratio, axis=1) / np.maximum(aantal, 1), np.nan)
+            totalen["Binnen Richttijd"] = np.where(aantal > 0, np.sum(binnen, axis=1) / np.maximum(aantal, 1), np.nan)
+        return totalen.sort_values("Gespeeld", ascending=False)
+
+    def speelduur_verdeling(self, bins=None, zonder_uitschieters:bool=True):
+        ''' Histogram of the stint lengths per player (rows) on common bins (columns: left bin edges in seconds). '''
+        import pandas as pd
+        s = self.laad()
+        mask = s["inlier"] if zonder_uitschieters else np.ones(len(s["duur"]), dtype=bool)
+        duur, speler = s["duur"][mask], s["speler"][mask]
+        if bins is None:
+            bins = np.histogram_bin_edges(duur, bins='auto')
+        bins = np.asarray(bins, dtype=float)
+        bin_idx = np.clip(np.searchsorted(bins, duur, side='right') - 1, 0, len(bins) - 2)
+        tellingen = np.bincount(speler * (len(bins) - 1) + bin_idx, minlength=len(s["namen"]) * (len(bins) - 1))
+        return pd.DataFrame(tellingen.reshape(len(s["namen"]), len(bins) - 1),
+                            index=pd.Index(s["namen"], name="Naam"), columns=bins[:-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Season statistics over many matches.")
+    parser.add_argument("logs", nargs="*", help="archived history files")
+    parser.add_argument("--db", help="event database (all matches in it are included)")
+    parser.add_argument("--spelers", help="file with the Richttijd per player, like spelers.txt")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    bronnen = list(args.logs) + (database_bronnen(args.db) if args.db else [])
+    richttijd = None
+    if args.spelers:
+        import pandas as pd
+        richttijd = pd.read_csv(args.spelers, index_col='Naam')["Richttijd"].to_dict()
+    seizoen = Seizoen(bronnen, workers=args.workers)
+    print(f"{seizoen.ingest()} van {len(bronnen)} wedstrijden verwerkt.")
+    print(seizoen.totalen(richttijd=richttijd).to_string(na_rep="-"))
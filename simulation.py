@@ -0,0 +1,300 @@
+''' Monte Carlo simulation of matches, to compare rotation policies before they are used in a real match.
+
+Thousands of matches are simulated at once. The state of PlayerState (status, laatste_wijziging and
+gespeeld) gets a leading axis for the match, and every time step is a handful of array operations over all
+matches. A substitution is only possible at a stoppage of play, which happens at random moments; players
+are absent at random. A policy decides which players are substituted at a stoppage, for all matches at once.
+
+Usage from the repository folder:
+    python simulation.py --spelers spelers.txt --wedstrijden 2000
+'''
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from history import HistoryItem
+from player_state import ACTIEF, BANK, AFWEZIG
+from stints import inlier_bounds
+
+
+HELFT = 20*60 # s, running time of a half
+RUST = 10*60 # s, half-time break
+DT = 5.0 # s, time step
+STOPPAGE = 45.0 # s, mean time between two stoppages of play
+N_ACTIEF = 5
+
+
+class Simulatie:
+    ''' The state of n_wedstrijden matches of the same roster, one row per match. '''
+
+    def __init__(self, richttijd, n_wedstrijden:int, rng, p_afwezig:float=0.1, keeper:int=None, log:bool=False):
+        self.richttijd = np.asarray(richttijd, dtype=float)
+        M, n = n_wedstrijden, len(self.richttijd)
+        self.rotatie = np.ones(n, dtype=bool) # the players that are substituted
+        aanwezig = rng.random((M, n)) >= p_afwezig
+        if keeper is not None:
+            self.rotatie[keeper] = False
+            aanwezig[:, keeper] = True
+
+        # The first five present players start, the keeper first, as the first rows of spelers.txt do
+        volgorde = np.arange(n) if keeper is None else np.concatenate(([keeper], np.delete(np.arange(n), keeper)))
+        start = np.zeros((M, n), dtype=bool)
+        start[:, volgorde] = aanwezig[:, volgorde] & (np.cumsum(aanwezig[:, volgorde], axis=1) <= N_ACTIEF)
+        self.status = np.where(start, ACTIEF, np.where(aanwezig, BANK, AFWEZIG)).astype(np.int8)
+        self.start = start
+        self.laatste_wijziging = np.full((M, n), -np.inf)
+        self.gespeeld = np.zeros((M, n))
+        self.wissels = np.zeros(M, dtype=np.int64)
+        self.speelduren = []
+        self.log = [] if log else None # (tijd, type, wedstrijd, uit, in) of every event, to rebuild the histories
+
+    @property
+    def rijen(self) -> np.ndarray:
+        return np.arange(len(self.status))
+
+    def unpause(self, tijdstip:float):
+        self.laatste_wijziging[self.status == ACTIEF] = tijdstip
+        if self.log is not None:
+            self.log.append((tijdstip, 'unpause', None, None, None))
+
+    def pause(self, tijdstip:float):
+        actief = self.status == ACTIEF
+        self.speelduren.append(tijdstip - self.laatste_wijziging[actief])
+        self.gespeeld[actief] += tijdstip - self.laatste_wijziging[actief]
+        self.laatste_wijziging[actief] = tijdstip
+        if self.log is not None:
+            self.log.append((tijdstip, 'pause', None, None, None))
+
+    def wissel(self, tijdstip:float, uit, in_):
+        ''' uit and in_ have a row per match and a column per substitution; -1 is no substitution. '''
+        m, k = np.nonzero(uit >= 0)
+        u, i = uit[m, k], in_[m, k]
+        duur = tijdstip - self.laatste_wijziging[m, u]
+        self.speelduren.append(duur)
+        self.gespeeld[m, u] += duur
+        self.status[m, u] = BANK
+        self.laatste_wijziging[m, u] = tijdstip
+        self.status[m, i] = ACTIEF
+        self.laatste_wijziging[m, i] = tijdstip
+        self.wissels += np.bincount(m, minlength=len(self.wissels))
+        if self.log is not None and len(m):
+            self.log.append((tijdstip, 'wissel', m, u, i))
+
+    def stint(self, tijdstip:float) -> np.ndarray:
+        # Length of the running stint of the players that can be substituted, -inf for the others
+        return np.where((self.status == ACTIEF) & self.rotatie, tijdstip - self.laatste_wijziging, -np.inf)
+
+    def recuperatie(self, tijdstip:float) -> np.ndarray:
+        # Time on the bench (inf if not played yet), -inf for the players that are not on the bench
+        return np.where(self.status == BANK, tijdstip - self.laatste_wijziging, -np.inf)
+
+    def history(self, wedstrijd:int, namen) -> list:
+        ''' The HistoryItems of one simulated match (only if the simulation was logged). '''
+        history, actief = [], list(np.flatnonzero(self.start[wedstrijd]))
+        for tijdstip, type, m, u, i in self.log:
+            if type == 'unpause':
+                history.append(HistoryItem(type='unpause', time=tijdstip, spelers=[namen[idx] for idx in actief]))
+            elif type == 'pause':
+                history.append(HistoryItem(type='pause', time=tijdstip))
+            else:
+                for uit, in_ in zip(u[m == wedstrijd], i[m == wedstrijd]):
+                    history.append(HistoryItem(type='wissel', time=tijdstip, speler_uit=namen[uit], speler_in=namen[in_]))
+                    actief[actief.index(uit)] = in_
+        return history
+
+    def resultaat(self):
+        return Resultaat(self.richttijd, self.gespeeld, self.status != AFWEZIG, np.concatenate(self.speelduren), self.wissels)
+
+
+class Resultaat:
+    ''' Time played per (match, player), the lengths of all stints and the number of substitutions per match. '''
+
+    def __init__(self, richttijd, gespeeld, aanwezig, speelduren, wissels):
+        self.richttijd = richttijd
+        self.gespeeld = gespeeld
+        self.aanwezig = aanwezig
+        self.speelduren = speelduren
+        self.wissels = wissels
+
+    @classmethod
+    def samenvoegen(cls, resultaten):
+        resultaten = list(resultaten)
+        return cls(resultaten[0].richttijd,
+                   np.concatenate([r.gespeeld for r in resultaten]),
+                   np.concatenate([r.aanwezig for r in resultaten]),
+                   np.concatenate([r.speelduren for r in resultaten]),
+                   np.concatenate([r.wissels for r in resultaten]))
+
+    def gespeeld_perc(self) -> np.ndarray:
+        # Gespeeld / Richttijd per (match, player); nan for absent players and players without a Richttijd
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc = self.gespeeld / (60*self.richttijd)
+        return np.where(self.aanwezig & (self.richttijd > 0), perc, np.nan)
+
+    def samenvatting(self, tolerantie:float=0.1) -> dict:
+        perc = self.gespeeld_perc()
+        perc = perc[~np.isnan(perc)]
+        duren = self.speelduren[self.speelduren > 0]
+        bounds = inlier_bounds(duren)
+        return {"Gespeeld% P10": np.percentile(perc, 10) if len(perc) else np.nan,
+                "Gespeeld% mediaan": np.median(perc) if len(perc) else np.nan,
+                "Gespeeld% P90": np.percentile(perc, 90) if len(perc) else np.nan,
+                "Gem. afwijking Richttijd": np.mean(np.abs(perc - 1)) if len(perc) else np.nan,
+                "Binnen Richttijd": np.mean(np.abs(perc - 1) <= tolerantie) if len(perc) else np.nan,
+                "Speelbeurt P10": np.percentile(duren, 10),
+                "Speelbeurt mediaan": np.median(duren),
+                "Speelbeurt P90": np.percentile(duren, 90),
+                "Uitschieters": np.mean((duren < bounds[0]) | (duren > bounds[1])),
+                "Wissels per wedstrijd": np.mean(self.wissels)}
+
+    def verdeling(self, bins) -> tuple:
+        ''' Histograms (density) of Gespeeld% and of the stint lengths, on the given pair of bins. '''
+        perc = self.gespeeld_perc()
+        perc = perc[~np.isnan(perc)]
+        return np.histogram(perc, bins=bins[0], density=True)[0], np.histogram(self.speelduren, bins=bins[1], density=True)[0]
+
+
+# Policies: called at every time step as policy(sim, tijdstip, stoppage), with stoppage the matches in which
+# play is stopped. They return uit and in_ for Simulatie.wissel. start(sim) is called before the match.
+
+class LangsteUit:
+    ''' At a stoppage, the player with the longest stint is replaced by the player that rested longest, once
+    the stint is longer than max_stint. '''
+
+    def __init__(self, max_stint:float=4*60):
+        self.max_stint = max_stint
+
+    def start(self, sim):
+        pass
+
+    def __call__(self, sim, tijdstip:float, stoppage):
+        stint, recuperatie = sim.stint(tijdstip), sim.recuperatie(tijdstip)
+        uit, in_ = np.argmax(stint, axis=1), np.argmax(recuperatie, axis=1)
+        rijen = sim.rijen
+        geldig = stoppage & (stint[rijen, uit] >= self.max_stint) & (recuperatie[rijen, in_] > -np.inf)
+        return np.where(geldig, uit, -1)[:, None], in_[:, None]
+
+    def __repr__(self):
+        return f"LangsteUit({self.max_stint/60:g} min)"
+
+
+class Lijnwissel:
+    ''' Every interval (at the first stoppage after it), the whole line is changed: the lijn players that
+    play longest are replaced by the lijn players that rested longest. '''
+
+    def __init__(self, interval:float=4*60, lijn:int=4):
+        self.interval = interval
+        self.lijn = lijn
+
+    def start(self, sim):
+        self.vorige = np.zeros(len(sim.status))
+
+    def __call__(self, sim, tijdstip:float, stoppage):
+        stint, recuperatie = sim.stint(tijdstip), sim.recuperatie(tijdstip)
+        uit = np.argsort(-stint, axis=1, kind='stable')[:, :self.lijn]
+        in_ = np.argsort(-recuperatie, axis=1, kind='stable')[:, :self.lijn]
+        nu = stoppage & (tijdstip - self.vorige >= self.interval)
+        geldig = nu[:, None] & (np.take_along_axis(stint, uit, axis=1) > -np.inf) & (np.take_along_axis(recuperatie, in_, axis=1) > -np.inf)
+        self.vorige = np.where(nu, tijdstip, self.vorige)
+        return np.where(geldig, uit, -1), in_
+
+    def __repr__(self):
+        return f"Lijnwissel({self.interval/60:g} min, {self.lijn})"
+
+
+class Advies:
+    ''' Follows the advice of the dashboard (recommender.py): at a stoppage, the best pair is substituted
+    when its score reaches the drempel. '''
+
+    def __init__(self, time_ref:float=4*60, drempel:float=0.5):
+        self.time_ref = time_ref
+        self.drempel = drempel
+
+    def start(self, sim):
+        pass
+
+    def __call__(self, sim, tijdstip:float, stoppage):
+        t = tijdstip - sim.laatste_wijziging
+        vermoeidheid = 1 / (1 + (t/self.time_ref)**2)
+        actief = (sim.status == ACTIEF) & sim.rotatie
+        health = np.where(actief, vermoeidheid, 1 - vermoeidheid)
+        gespeeld = sim.gespeeld + np.where(actief, t, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc = np.where(sim.richttijd > 0, gespeeld / (60*sim.richttijd), np.nan)
+
+        verschil = perc[:, :, None] - perc[:, None, :]
+        score = health[:, None, :] - health[:, :, None] + np.where(np.isnan(verschil), 0.0, verschil)
+        score = np.where(actief[:, :, None] & (sim.status == BANK)[:, None, :], score, -np.inf)
+        n = score.shape[1]
+        beste = np.argmax(score.reshape(len(score), -1), axis=1)
+        uit, in_ = beste // n, beste % n
+        geldig = stoppage & (score.reshape(len(score), -1)[sim.rijen, beste] >= self.drempel)
+        return np.where(geldig, uit, -1)[:, None], in_[:, None]
+
+    def __repr__(self):
+        return f"Advies({self.drempel:g})"
+
+
+def simuleer_blok(policy, richttijd, n_wedstrijden:int, seed, p_afwezig:float=0.1, keeper:int=None,
+                  stoppage:float=STOPPAGE, dt:float=DT, log:bool=False) -> Simulatie:
+    ''' Simulate n_wedstrijden matches with one policy. Runs in a worker process. '''
+    rng = np.random.default_rng(seed)
+    sim = Simulatie(richttijd, n_wedstrijden, rng, p_afwezig=p_afwezig, keeper=keeper, log=log)
+    policy.start(sim)
+    for helft in range(2):
+        begin = helft * (HELFT + RUST)
+        sim.unpause(begin)
+        for tijdstip in begin + np.arange(dt, HELFT, dt):
+            stop = rng.random(n_wedstrijden) < dt / stoppage
+            uit, in_ = policy(sim, tijdstip, stop)
+            sim.wissel(tijdstip, uit, in_)
+        sim.pause(begin + HELFT)
+    return sim
+
+def simuleer_resultaat(*args, **kwargs) -> Resultaat:
+    return simuleer_blok(*args, **kwargs).resultaat()
+
+def simuleer(policy, richttijd, n_wedstrijden:int=1000, workers:int=None, seed:int=0, blok:int=500, **opties) -> Resultaat:
+    ''' Simulate n_wedstrijden matches in blocks of blok matches, in parallel when workers is not 1. '''
+    aantallen = [min(blok, n_wedstrijden - start) for start in range(0, n_wedstrijden, blok)]
+    seeds = np.random.SeedSequence(seed).spawn(len(aantallen))
+    if workers == 1 or len(aantallen) == 1:
+        return Resultaat.samenvoegen(simuleer_resultaat(policy, richttijd, n, s, **opties) for n, s in zip(aantallen, seeds))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(simuleer_resultaat, policy, richttijd, n, s, **opties) for n, s in zip(aantallen, seeds)]
+        return Resultaat.samenvoegen(future.result() for future in futures)
+
+def vergelijk(policies, richttijd, n_wedstrijden:int=1000, workers:int=None, seed:int=0, **opties):
+    ''' One row of Resultaat.samenvatting() per policy, all simulated with the same random matches. '''
+    import pandas as pd
+    rijen = {repr(policy): simuleer(policy, richttijd, n_wedstrijden, workers=workers, seed=seed, **opties).samenvatting()
+             for policy in policies}
+    return pd.DataFrame.from_dict(rijen, orient='index')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare rotation policies on simulated matches.")
+    parser.add_argument("--spelers", default="spelers.txt", help="roster with the Richttijd, like spelers.txt")
+    parser.add_argument("--wedstrijden", type=int, default=2000)
+    parser.add_argument("--afwezig", type=float, default=0.1, help="probability that a player is absent")
+    parser.add_argument("--keeper", help="name of the goalkeeper, who plays the whole match")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import pandas as pd
+    spelers = pd.read_csv(args.spelers if os.path.exists(args.spelers) else 'spelers_voorbeeld.txt', index_col='Naam')
+    richttijd = spelers["Richttijd"].to_numpy(dtype=float)
+    keeper = list(spelers.index).index(args.keeper) if args.keeper else None
+    if not np.any(richttijd > 0):
+        # Without a Richttijd, every field player's target is an equal share of the field time
+        veld, n_veld = N_ACTIEF - (keeper is not None), (1 - args.afwezig) * (len(richttijd) - (keeper is not None))
+        richttijd = np.full(len(richttijd), veld * 2*HELFT/60 / n_veld)
+        if keeper is not None:
+            richttijd[keeper] = 2*HELFT/60
+
+    policies = [LangsteUit(3*60), LangsteUit(4*60), Lijnwissel(3*60), Lijnwissel(4*60), Advies()]
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 2):
+        print(vergelijk(policies, richttijd, args.wedstrijden, workers=args.workers, seed=args.seed, p_afwezig=args.afwezig, keeper=keeper))
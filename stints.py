@@ -0,0 +1,204 @@
+from bisect import bisect_right
+import numpy as np
+
+
+class Speelbeurten:
+    ''' The stints of a match in columnar form: one entry per stint, in the order in which they ended. '''
+
+    def __init__(self, speler, lane, begin, einde):
+        self.speler = np.asarray(speler, dtype=object)
+        self.lane = np.asarray(lane, dtype=np.int64)
+        self.begin = np.asarray(begin, dtype=float)
+        self.einde = np.asarray(einde, dtype=float)
+
+    def __len__(self):
+        return len(self.speler)
+
+    @property
+    def duur(self) -> np.ndarray:
+        return self.einde - self.begin
+
+    def select(self, mask):
+        return Speelbeurten(self.speler[mask], self.lane[mask], self.begin[mask], self.einde[mask])
+
+
+class SpeelbeurtenReplay:
+    ''' The replay of speelbeurten(), fed one history item at a time. The stints that ended are kept in
+    lists, so new items only cost the work for themselves. '''
+
+    def __init__(self):
+        self.spelers, self.lanes, self.begin, self.einde = [], [], [], []
+        self.actieve_spelers, self.tijden = [], []
+        self.running = False
+        self.tijd = None # time of the last item
+
+    def __len__(self):
+        return len(self.spelers)
+
+    def voeg_toe(self, HI):
+        if HI.type == 'unpause':
+            self.actieve_spelers = list(HI.spelers)
+            self.tijden = [HI.time] * len(self.actieve_spelers)
+            self.running = True
+        elif HI.type == 'pause':
+            for idx, speler in enumerate(self.actieve_spelers):
+                self.sluit(speler, idx, self.tijden[idx], HI.time)
+            self.running = False
+        elif HI.type in ('wissel', 'lijnwissel'):
+            for speler_uit, speler_in in HI.paren():
+                idx = self.actieve_spelers.index(speler_uit)
+                self.sluit(speler_uit, idx, self.tijden[idx], HI.time)
+                self.actieve_spelers[idx] = speler_in
+                self.tijden[idx] = HI.time
+        self.tijd = HI.time
+
+    def sluit(self, speler, lane:int, begin:float, einde:float):
+        self.spelers.append(speler); self.lanes.append(lane); self.begin.append(begin); self.einde.append(einde)
+
+    def verwijder(self, HI, tijd:float):
+        ''' Undo voeg_toe(HI) for the last item, a substitution or a line change; tijd is the time of the item before it. '''
+        if HI.type not in ('wissel', 'lijnwissel'):
+            raise ValueError(f"Only a substitution can be removed, not {HI.type}.")
+        for _ in HI.paren():
+            speler, lane, begin = self.heropen()
+            self.actieve_spelers[lane] = speler
+            self.tijden[lane] = begin
+        self.tijd = tijd
+
+    def heropen(self) -> tuple:
+        # Remove the stint that ended last, as (speler, lane, begin)
+        self.einde.pop()
+        return self.spelers.pop(), self.lanes.pop(), self.begin.pop()
+
+    def gesloten(self, vanaf:int=0) -> Speelbeurten:
+        # The stints that ended, from the vanaf'th on
+        return Speelbeurten(self.spelers[vanaf:], self.lanes[vanaf:], self.begin[vanaf:], self.einde[vanaf:])
+
+    def lopend(self, tot:float) -> Speelbeurten:
+        # The stints that are still running, closed at tot
+        if not self.running:
+            return Speelbeurten([], [], [], [])
+        return Speelbeurten(self.actieve_spelers, range(len(self.actieve_spelers)), self.tijden, [tot] * len(self.actieve_spelers))
+
+    def tot(self, tot:float=None) -> Speelbeurten:
+        # All stints, those that are still running closed at tot (left out without tot)
+        if not self.running or tot is None:
+            return self.gesloten()
+        lopend = self.lopend(tot)
+        return Speelbeurten(self.spelers + list(lopend.speler), self.lanes + list(lopend.lane),
+                            self.begin + list(lopend.begin), self.einde + list(lopend.einde))
+
+
+class SpeelbeurtenIndex(SpeelbeurtenReplay):
+    ''' The replay, with the stints that ended also indexed per lane and per player.
+
+    The stints of one lane, and those of one player, never overlap and end in chronological order, so
+    sorted lists with bisect answer the queries in logarithmic time. The per-player lists carry the
+    cumulative time played, from which the time played in any interval follows in O(log n). '''
+
+    def __init__(self):
+        super().__init__()
+        self.per_lane = {} # lane -> ([begin], [einde], [speler])
+        self.per_speler = {} # speler -> ([begin], [einde], [cumulatieve speeltijd], [index])
+
+    @classmethod
+    def uit_history(cls, history):
+        index = cls()
+        for HI in history:
+            index.voeg_toe(HI)
+        return index
+
+    def sluit(self, speler, lane:int, begin:float, einde:float):
+        begins, eindes, spelers = self.per_lane.setdefault(lane, ([], [], []))
+        begins.append(begin); eindes.append(einde); spelers.append(speler)
+        begins, eindes, cumulatief, indices = self.per_speler.setdefault(speler, ([], [], [0.0], []))
+        begins.append(begin); eindes.append(einde); cumulatief.append(cumulatief[-1] + einde - begin); indices.append(len(self.spelers))
+        super().sluit(speler, lane, begin, einde)
+
+    def heropen(self) -> tuple:
+        speler, lane, begin = super().heropen()
+        for lijst in self.per_lane[lane]:
+            lijst.pop()
+        begins, eindes, cumulatief, indices = self.per_speler[speler]
+        begins.pop(); eindes.pop(); cumulatief.pop(); indices.pop()
+        return speler, lane, begin
+
+    def op_het_veld(self, t:float) -> list:
+        ''' The players on the field at time t, by lane. '''
+        per_lane = {}
+        for lane, (begins, eindes, spelers) in self.per_lane.items():
+            k = bisect_right(begins, t) - 1
+            if k >= 0 and t < eindes[k]:
+                per_lane[lane] = spelers[k]
+        if self.running:
+            for lane, (speler, begin) in enumerate(zip(self.actieve_spelers, self.tijden)):
+                if t >= begin:
+                    per_lane[lane] = speler
+        return [per_lane[lane] for lane in sorted(per_lane)]
+
+    def van_speler(self, speler, tot:float=None) -> Speelbeurten:
+        ''' The stints of one player. When tot is given, a running stint is included, closed at tot. '''
+        begins, eindes, _, indices = self.per_speler.get(speler, ([], [], [0.0], []))
+        lanes = [self.lanes[i] for i in indices]
+        if tot is not None and self.running and speler in self.actieve_spelers:
+            lane = self.actieve_spelers.index(speler)
+            return Speelbeurten([speler]*(len(indices) + 1), lanes + [lane], begins + [self.tijden[lane]], eindes + [tot])
+        return Speelbeurten([speler]*len(indices), lanes, begins, eindes)
+
+    def gespeeld_tot(self, speler, t:float, tot:float=None) -> float:
+        ''' The time speler played before t. A running stint counts up to tot (default: the last item). '''
+        gespeeld = 0.0
+        if speler in self.per_speler:
+            begins, eindes, cumulatief, _ = self.per_speler[speler]
+            k = bisect_right(begins, t)
+            if k > 0:
+                gespeeld = cumulatief[k-1] + min(t, eindes[k-1]) - begins[k-1]
+        if self.running and speler in self.actieve_spelers:
+            begin = self.tijden[self.actieve_spelers.index(speler)]
+            gespeeld += max(0.0, min(t, self.tijd if tot is None else tot) - begin)
+        return gespeeld
+
+    def overlap(self, speler_a, speler_b, tot:float=None) -> float:
+        ''' The time speler_a and speler_b were on the field together. Walks the stints of the player with
+        the fewest stints and looks up the time played by the other one in each of them. '''
+        tot = self.tijd if tot is None else tot
+        if tot is None:
+            return 0.0
+        beurten_a, beurten_b = self.van_speler(speler_a, tot=tot), self.van_speler(speler_b, tot=tot)
+        if len(beurten_a) > len(beurten_b):
+            beurten_a, speler_b = beurten_b, speler_a
+        return float(sum(self.gespeeld_tot(speler_b, einde, tot) - self.gespeeld_tot(speler_b, begin, tot) 
+                         for begin, einde in zip(beurten_a.begin, beurten_a.einde)))
+
+
+def speelbeurten(history, tot:float=None) -> Speelbeurten:
+    ''' Replay the history into stints. The lane is the spot on the field.
+    When tot is given, the stints that are still running are closed at that time. '''
+    replay = SpeelbeurtenReplay()
+    for HI in history:
+        replay.voeg_toe(HI)
+    return replay.tot(tot)
+
+
+def inlier_bounds(alle_speelduren) -> tuple:
+    ''' Bounds on the stint durations outside of which a stint is considered an outlier: a stint that was
+    entered incorrectly (lower bound) or a goalkeeper's turn (upper bound). '''
+    alle_speelduren = np.asarray(alle_speelduren, dtype=float)
+    if len(alle_speelduren) < 3:
+        return -np.inf, np.inf # too few stints to estimate a distribution
+
+    # Check for outliers using log-normal distribution
+    log_speelduren = np.log(alle_speelduren)
+    log_speelduren = np.delete(log_speelduren, np.argmax(log_speelduren)) # remove the largest element, as this must be a goalkeeper's turn
+    mu, sigma = np.mean(log_speelduren), np.std(log_speelduren, ddof=1)
+    inlier_bounds = [np.exp(mu - 5*sigma), # probably outliers due to incorrectly entered data
+                     np.exp(mu + 2*sigma)] # probably outliers from the goalkeeper
+    if np.count_nonzero(alle_speelduren > inlier_bounds[1]) > 2: # make sure to remove maximally 2 upper outliers, as only 2 are expected from the goalkeeper
+        gesorteerd = np.sort(alle_speelduren)[::-1]
+        inlier_bounds[1] = np.mean(gesorteerd[2:4])
+    return tuple(inlier_bounds)
+
+
+def inliers(duren, bounds:tuple) -> np.ndarray:
+    duren = np.asarray(duren, dtype=float)
+    return (duren >= bounds[0]) & (duren <= bounds[1])
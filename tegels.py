@@ -0,0 +1,157 @@
+''' Pooled player tiles for the dashboard.
+
+A Tegels is a column of player tiles (a button with the name, and a label with the timers on top of it) for
+one status. The tiles are created once and never destroyed: when players move between the field, the bench
+and the absent list, only the names, colours and texts of the tiles are set again. What every spot shows is
+kept in a small model, and a tile is only configured when what it shows changes.
+
+More players than MAX_RIJEN do not fit on the screen. The column then shows MAX_RIJEN tiles and a scrollbar,
+and scrolling binds the tiles to other spots. The number of widgets, and the number of .config() calls for a
+move or a tick, is therefore bounded by the visible rows, whatever the size of the roster. '''
+import tkinter as tk
+
+
+MAX_RIJEN = 27 # the tiles of height 1 that fit on a 1080 px screen; longer lists scroll
+
+
+class Tegels:
+    def __init__(self, master, font, breedte:int, hoogte, select, met_label:bool=True, max_rijen:int=MAX_RIJEN, bg=None):
+        ''' hoogte(n) is the height of the tiles when there are n players, select(spot) is called on a click. '''
+        self.font = font
+        self.breedte = breedte
+        self.hoogte = hoogte
+        self.select = select
+        self.met_label = met_label
+        self.max_rijen = max_rijen
+
+        self.frame = tk.Frame(master, bg=bg)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.scroll)
+
+        # The model, per spot
+        self.naam = []
+        self.kleur = []
+        self.tekst = []
+        self.geselecteerd = []
+
+        # The pool, per visible row: the widgets and what they show
+        self.tegels = []
+        self.getoond = []
+        self.n_rijen = 0 # rows in use
+        self.tegel_hoogte = None
+        self.offset = 0 # the spot shown in the first row
+
+    def __len__(self):
+        return len(self.naam)
+
+    def maak_tegel(self, rij:int):
+        player_frame = tk.Frame(self.frame)
+        button = tk.Button(player_frame,
+                           font=self.font,
+                           bg='grey',
+                           width=self.breedte,
+                           height=self.tegel_hoogte,
+                           relief=tk.FLAT,
+                           command=lambda rij=rij: self.select(self.offset + rij))
+        button.pack(expand=True, fill=tk.BOTH)
+        label = None
+        if self.met_label:
+            label = tk.Label(player_frame, font=self.font, anchor='w', bg='grey')
+            label.place(relx=.02, rely=.5, anchor='w')
+        for widget in (button, label):
+            if widget is not None:
+                widget.bind("<MouseWheel>", self.wiel) # Windows and macOS
+                widget.bind("<Button-4>", self.wiel) # Linux
+                widget.bind("<Button-5>", self.wiel)
+        self.tegels.append((player_frame, button, label))
+        self.getoond.append((None, 'grey', '', False))
+
+    def toon(self, namen):
+        ''' Show the players namen, in the order of their spots. Reuses the tiles; new spots start grey and empty. '''
+        n = len(namen)
+        del self.kleur[n:], self.tekst[n:], self.geselecteerd[n:]
+        extra = n - len(self.kleur)
+        self.kleur += ['grey'] * extra
+        self.tekst += [''] * extra
+        self.geselecteerd += [False] * extra
+        self.naam = list(namen)
+
+        # Rows in use, and their height
+        n_rijen = min(n, self.max_rijen)
+        hoogte = self.hoogte(n) if n_rijen == n else 1
+        while len(self.tegels) < n_rijen:
+            self.maak_tegel(len(self.tegels))
+        if hoogte != self.tegel_hoogte:
+            self.tegel_hoogte = hoogte
+            for _, button, _ in self.tegels:
+                button.config(height=hoogte)
+        for rij in range(n_rijen, self.n_rijen):
+            self.tegels[rij][0].grid_remove()
+            self.frame.grid_rowconfigure(rij, weight=0)
+        for rij in range(self.n_rijen, n_rijen):
+            self.tegels[rij][0].grid(row=rij, column=0)
+            self.frame.grid_rowconfigure(rij, weight=1)
+        self.n_rijen = n_rijen
+
+        if n > n_rijen:
+            self.scrollbar.grid(row=0, column=1, rowspan=n_rijen, sticky="ns")
+        else:
+            self.scrollbar.grid_remove()
+        self.verschuif(self.offset, altijd=True)
+
+    def zet(self, spot:int, naam:str=None, kleur:str=None, tekst:str=None):
+        # Change what a spot shows; None leaves it as it is
+        if naam is not None:
+            self.naam[spot] = naam
+        if kleur is not None:
+            self.kleur[spot] = kleur
+        if tekst is not None:
+            self.tekst[spot] = tekst
+        self.teken(spot)
+
+    def markeer(self, spot:int, geselecteerd:bool):
+        self.geselecteerd[spot] = geselecteerd
+        self.teken(spot)
+
+    def teken(self, spot:int):
+        # Configure the tile of spot, if it is visible, with what changed
+        rij = spot - self.offset
+        if not 0 <= rij < self.n_rijen:
+            return
+        naam, kleur, tekst, geselecteerd = nieuw = (self.naam[spot], self.kleur[spot], self.tekst[spot], self.geselecteerd[spot])
+        oud = self.getoond[rij]
+        if nieuw == oud:
+            return
+        _, button, label = self.tegels[rij]
+        opties = {}
+        if naam != oud[0]:
+            opties["text"] = naam
+        if kleur != oud[1]:
+            opties["bg"] = kleur
+        if geselecteerd != oud[3]:
+            opties["relief"] = tk.SOLID if geselecteerd else tk.FLAT
+        if opties:
+            button.config(**opties)
+        if label is not None and (kleur != oud[1] or tekst != oud[2]):
+            label.config(bg=kleur, text=tekst)
+        self.getoond[rij] = nieuw
+
+    def verschuif(self, offset:int, altijd:bool=False):
+        offset = max(0, min(offset, len(self) - self.n_rijen))
+        if offset == self.offset and not altijd:
+            return
+        self.offset = offset
+        for spot in range(offset, offset + self.n_rijen):
+            self.teken(spot)
+        if len(self) > 0:
+            self.scrollbar.set(offset / len(self), (offset + self.n_rijen) / len(self))
+
+    def scroll(self, *args):
+        # The command of the scrollbar: ('moveto', fraction) or ('scroll', n, 'units' or 'pages')
+        if args[0] == 'moveto':
+            self.verschuif(round(float(args[1]) * len(self)))
+        else:
+            self.verschuif(self.offset + int(args[1]) * (self.n_rijen if args[2] == 'pages' else 1))
+
+    def wiel(self, event):
+        self.verschuif(self.offset + (-1 if event.num == 4 or event.delta > 0 else 1))
@@ -0,0 +1,354 @@
+''' The match engine: the player state, the history and its logging, without any user interface. '''
+from collections import deque
+
+from player_state import PlayerState, ACTIEF, BANK
+from history import HistoryItem, read_history, HISTORY_FILE
+from checkpoint import checkpoint_data, save_checkpoint, load_checkpoint, load_history, remove_checkpoint, CHECKPOINT_FILE, CHECKPOINT_INTERVAL
+from event_store import EventStore, read_events, EVENT_DB
+from stints import SpeelbeurtenIndex
+from samenspel import Samenspel
+from eerlijkheid import Eerlijkheid
+from klok import Wedstrijdklok
+
+
+UNDO_DIEPTE = 50 # number of actions that can be undone
+OVERZICHT_FILE = "wedstrijdoverzicht.png"
+
+
+class Actie:
+    ''' An action that can be undone: the state of the players before it (after it, once it was undone)
+    and its history item, if it has one. '''
+
+    def __init__(self, snapshot:tuple, item:HistoryItem=None):
+        self.snapshot = snapshot
+        self.item = item
+        self.seq = None # the sequence number of the logged item, None when it was not logged
+
+
+class Wedstrijd:
+    def __init__(self, spelers, clear_history=True, store=None, klok=None, checkpoint_path:str=CHECKPOINT_FILE, bewaar_history:bool=True):
+        # The history is kept in memory and logged to the event store, its stints are indexed as they end.
+        # Without bewaar_history neither is kept, so that the memory does not grow with the match (no report).
+        # After a resume, the first self.basis items are only read when they are needed, see laad().
+        self._history = []
+        self._stints = SpeelbeurtenIndex()
+        self.bewaar_history = bewaar_history
+        self.basis = 0
+        self.eerder = None # reads the items before the checkpoint of a resumed match, until laad() did
+        self.store = store if store is not None else EventStore()
+        self.checkpoint_path = checkpoint_path
+        if clear_history:
+            if self.store.text_log is not None:
+                with open(self.store.text_log, "w", encoding="utf-8") as file:
+                    file.write("")
+            remove_checkpoint(checkpoint_path)
+    
+        # Keep track of the players in an array-backed store
+        if isinstance(spelers, PlayerState):
+            self.spelers = spelers
+        else:
+            self.spelers = PlayerState.from_frame(spelers)
+        self._samenspel = Samenspel(self.spelers.namen) # the time on the field per pair and per lineup, like the stints
+        self.eerlijkheid = Eerlijkheid(self.spelers) # the spread of Gespeeld% and the players at risk, live
+        
+        self.paused = True
+        self.speeltijd = 0.0 # the running time of the match up to the last pause
+        self.sinds = None # the time of the last unpause, while running
+        self.klok = klok if klok is not None else Wedstrijdklok() # the time of every action of the user interface
+
+        # Logging and checkpointing are switched off while replaying and for throwaway copies
+        self.logging = True
+        self.herhaald = None # while resuming: the sequence number of the next replayed event
+        self.events_since_checkpoint = 0
+        self.checkpoint_seq = 0 # the first event that is not in the last checkpoint
+        self.bewaard = 0 # the items of the history that are in the history file of the checkpoint
+        self.opgeslagen = None # the length of the history in the last checkpoint
+
+        # Callbacks that receive every new HistoryItem, like the live report
+        self.luisteraars = []
+
+        # The substitutions of the current period that can be undone, and those that were undone
+        self.undo_stack = deque(maxlen=UNDO_DIEPTE)
+        self.redo_stack = []
+
+    @classmethod
+    def resume(cls, checkpoint_path:str=CHECKPOINT_FILE, klok=None):
+        ''' Rebuild the match from the last checkpoint and the events that were logged after it. '''
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint is None:
+            return None
+        store = EventStore(path=checkpoint.get("path", EVENT_DB), wedstrijd_id=checkpoint["wedstrijd_id"], text_log=checkpoint.get("text_log", HISTORY_FILE))
+        wedstrijd = cls(PlayerState.from_dict(checkpoint["spelers"]), clear_history=False, store=store, klok=klok, checkpoint_path=checkpoint_path)
+        wedstrijd.paused = checkpoint["paused"]
+        wedstrijd.speeltijd, wedstrijd.sinds = checkpoint["speeltijd"], checkpoint["sinds"]
+        # The history before the checkpoint, with its stints and minutes per pair, waits until it is needed
+        wedstrijd.basis = wedstrijd.bewaard = wedstrijd.opgeslagen = checkpoint["lengte"]
+        if wedstrijd.basis > 0:
+            namen, offset = wedstrijd.spelers.namen, checkpoint["history_offset"]
+            wedstrijd.eerder = lambda: load_history(checkpoint_path, offset, namen)
+
+        if checkpoint["log_offset"] is not None:
+            tail = read_history(path=store.text_log, offset=checkpoint["log_offset"])
+        elif store.path is not None:
+            tail = read_events(path=store.path, wedstrijd_id=store.wedstrijd_id, start=checkpoint["seq"])
+        else:
+            tail = [] # nothing was logged, the checkpoint is all there is
+
+        # The replayed events keep the sequence numbers they were logged with, so that they can be undone
+        wedstrijd.logging = False
+        wedstrijd.herhaald = checkpoint["seq"]
+        for item in tail:
+            wedstrijd.pas_toe(item)
+        store.seq = max(store.seq, wedstrijd.herhaald)
+        wedstrijd.herhaald = None
+        wedstrijd.logging = True
+        nu = wedstrijd.klok.nu()
+        wedstrijd.eerlijkheid.herbouw(wedstrijd.spelers, running=not wedstrijd.paused, tijd=nu, speeltijd=wedstrijd.speeltijd_op(nu))
+
+        wedstrijd.checkpoint() # the replayed tail is now part of the checkpoint
+        return wedstrijd
+
+    def laad(self):
+        ''' Read the history before the checkpoint of a resumed match and rebuild its stints and minutes per
+        pair, once. Until then, only the items since the resume are kept. '''
+        if self.eerder is None:
+            return
+        self._history = self.eerder() + self._history
+        self.eerder = None
+        self.basis = 0
+        self._stints = SpeelbeurtenIndex.uit_history(self._history)
+        self._samenspel = Samenspel.uit_history(self.spelers.namen, self._history)
+
+    @property
+    def history(self) -> list:
+        self.laad()
+        return self._history
+
+    @property
+    def stints(self) -> SpeelbeurtenIndex:
+        self.laad()
+        return self._stints
+
+    @property
+    def samenspel(self) -> Samenspel:
+        self.laad()
+        return self._samenspel
+
+    @property
+    def gestart(self) -> bool:
+        # Whether the match was unpaused before
+        return self.sinds is not None or self.speeltijd > 0
+
+    def speeltijd_op(self, tijd:float) -> float:
+        # The running time of the match at tijd
+        return self.speeltijd + (tijd - self.sinds if self.sinds is not None else 0.0)
+
+    def pas_toe(self, item:HistoryItem):
+        ''' Do what item records, at its time, as the dashboard would have done it. '''
+        if item.type == 'unpause':
+            self.unpause(item.time)
+        elif item.type == 'pause':
+            self.pause(item.time)
+        elif item.type == 'wissel':
+            self.wissel(item.speler_uit, item.speler_in, item.time)
+        elif item.type == 'lijnwissel':
+            self.lijnwissel(item.speler_uit, item.speler_in, item.time)
+        elif item.type == 'undo':
+            self.undo()
+
+    def record(self, item:HistoryItem) -> int:
+        # Until laad(), the stints and the minutes per pair are rebuilt from the whole history when needed
+        if self.bewaar_history:
+            self._history.append(item)
+            if self.eerder is None:
+                self._stints.voeg_toe(item)
+        if self.eerder is None:
+            self._samenspel.voeg_toe(item)
+        return self.log(item)
+
+    def log(self, item:HistoryItem, ongedaan:int=None) -> int:
+        # Returns the sequence number of the event, None when it is not logged
+        seq = None
+        if self.logging:
+            seq = self.store.append(item, ongedaan=ongedaan)
+        elif self.herhaald is not None:
+            seq, self.herhaald = self.herhaald, self.herhaald + 1
+        for luisteraar in self.luisteraars:
+            luisteraar(item)
+        return seq
+
+    def checkpoint(self):
+        if self.logging:
+            # Only the items since the last checkpoint are handed over, after a cut when some were undone
+            lengte = self.basis + len(self._history)
+            kap = self.bewaard if self.opgeslagen is None or self.bewaard < self.opgeslagen else None
+            data = checkpoint_data(self, kap=kap, nieuw=self._history[self.bewaard - self.basis:], lengte=lengte)
+            self.store.submit(lambda: save_checkpoint(data, path=self.checkpoint_path, log_path=self.store.text_log))
+            self.events_since_checkpoint = 0
+            self.checkpoint_seq = self.store.seq
+            self.bewaard = self.opgeslagen = lengte
+
+    def event_logged(self):
+        self.events_since_checkpoint += 1
+        if self.events_since_checkpoint >= CHECKPOINT_INTERVAL:
+            self.checkpoint()
+    
+    def unpause(self, tijdstip):
+        self.nieuwe_periode()
+        actieve_spelers = self.spelers.actieve_spelers()
+        self.record(HistoryItem(type='unpause', time=tijdstip, spelers=actieve_spelers))
+        self.paused = False
+        self.sinds = tijdstip
+        self.spelers.unpause(tijdstip)
+        self.eerlijkheid.bijwerken(self.spelers, self.spelers.op_volgorde(ACTIEF), tijdstip, running=True)
+        self.event_logged()
+
+    def pause(self, tijdstip):
+        self.nieuwe_periode()
+        self.record(HistoryItem(type='pause', time=tijdstip))
+        self.paused = True
+        if self.sinds is not None:
+            self.speeltijd += tijdstip - self.sinds
+            self.sinds = None
+        self.spelers.pause(tijdstip)
+        self.eerlijkheid.bijwerken(self.spelers, self.spelers.op_volgorde(ACTIEF), tijdstip, running=False)
+        self.checkpoint()
+    
+    def wissel(self, speler_uit, speler_in, tijdstip):
+        actie = self.nieuwe_actie()
+        if not self.paused:
+            actie.item = HistoryItem(type='wissel', time=tijdstip, speler_uit=speler_uit, speler_in=speler_in)
+            actie.seq = self.record(actie.item)
+
+        # wissel en order de bankspelers
+        uit, in_ = self.spelers.index[speler_uit], self.spelers.index[speler_in]
+        self.spelers.wissel(uit=uit, 
+                            in_=in_, 
+                            tijdstip=tijdstip, 
+                            running=not self.paused)
+        self.eerlijkheid.bijwerken(self.spelers, (uit, in_), tijdstip, running=not self.paused)
+
+        if self.paused:
+            self.checkpoint() # swaps during a pause are not in the log
+        else:
+            self.event_logged()
+
+    def lijnwissel(self, spelers_uit, spelers_in, tijdstip):
+        ''' Swap spelers_uit[i] for spelers_in[i], all at tijdstip, as one action: one history item, one
+        bench reorder and one undo. A line change of a single pair is an ordinary wissel. '''
+        if len(spelers_uit) != len(spelers_in) or len(spelers_uit) == 0:
+            raise ValueError("A line change needs as many players out as players in.")
+        if len(spelers_uit) == 1:
+            return self.wissel(spelers_uit[0], spelers_in[0], tijdstip)
+        uit = [self.spelers.index[speler] for speler in spelers_uit]
+        in_ = [self.spelers.index[speler] for speler in spelers_in]
+        if len(set(uit)) != len(uit) or len(set(in_)) != len(in_):
+            raise ValueError("A player can only be in a line change once.")
+        if (self.spelers.status[uit] != ACTIEF).any() or (self.spelers.status[in_] != BANK).any():
+            raise ValueError("A line change swaps players on the field for players on the bench.")
+
+        actie = self.nieuwe_actie()
+        if not self.paused:
+            actie.item = HistoryItem(type='lijnwissel', time=tijdstip, speler_uit=list(spelers_uit), speler_in=list(spelers_in))
+            actie.seq = self.record(actie.item)
+
+        self.spelers.lijnwissel(uit=uit, in_=in_, tijdstip=tijdstip, running=not self.paused)
+        self.eerlijkheid.bijwerken(self.spelers, uit + in_, tijdstip, running=not self.paused)
+
+        if self.paused:
+            self.checkpoint()
+        else:
+            self.event_logged()
+
+    def naar_afwezig(self, speler):
+        self.nieuwe_actie()
+        self.spelers.naar_afwezig(self.spelers.index[speler])
+        self.eerlijkheid.bijwerken(self.spelers, (self.spelers.index[speler],), self.klok.nu(), running=not self.paused)
+        self.checkpoint()
+
+    def naar_bank(self, speler):
+        self.nieuwe_actie()
+        self.spelers.naar_bank(self.spelers.index[speler])
+        self.eerlijkheid.bijwerken(self.spelers, (self.spelers.index[speler],), self.klok.nu(), running=not self.paused)
+        self.checkpoint()
+
+    def nieuwe_actie(self) -> Actie:
+        # Called before a substitution or a move to or from the absent players
+        actie = Actie(self.spelers.snapshot())
+        self.undo_stack.append(actie)
+        self.redo_stack.clear()
+        return actie
+
+    def nieuwe_periode(self):
+        # Substitutions are undone within a period of play or a pause, never across an unpause or a pause
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def undo(self) -> bool:
+        ''' Undo the last substitution or move to or from the absent players. The state of the players is swapped
+        back in without copying and the substitution leaves the history and the stints; the log only grows,
+        with an 'undo' item. Returns False when there is nothing to undo. '''
+        if not self.undo_stack:
+            return False
+        actie = self.undo_stack.pop()
+        actie.snapshot = self.spelers.ruil(actie.snapshot)
+        self.eerlijkheid.bijwerken(self.spelers, self.spelers.gewijzigd(actie.snapshot), self.klok.nu(), running=not self.paused)
+        self.redo_stack.append(actie)
+        if actie.item is None:
+            self.checkpoint()
+            return True
+
+        # Resuming replays the substitution and its undo from the log, if it was logged after the last checkpoint
+        na_checkpoint = actie.seq is not None and actie.seq >= self.checkpoint_seq
+        if self.bewaar_history:
+            self._history.pop()
+            self.bewaard = min(self.bewaard, self.basis + len(self._history))
+            if self.eerder is None:
+                self._stints.verwijder(actie.item, tijd=self._history[-1].time if self._history else None)
+        if self.eerder is None:
+            self._samenspel.verwijder(actie.item)
+        self.log(HistoryItem(type='undo', time=self.klok.nu()), ongedaan=actie.seq)
+        if na_checkpoint:
+            self.event_logged()
+        else:
+            self.checkpoint()
+        return True
+
+    def redo(self) -> bool:
+        ''' Do the last undone action again, with its original time. '''
+        if not self.redo_stack:
+            return False
+        actie = self.redo_stack.pop()
+        actie.snapshot = self.spelers.ruil(actie.snapshot)
+        self.eerlijkheid.bijwerken(self.spelers, self.spelers.gewijzigd(actie.snapshot), self.klok.nu(), running=not self.paused)
+        self.undo_stack.append(actie)
+        if actie.item is None:
+            self.checkpoint()
+        else:
+            actie.seq = self.record(actie.item)
+            self.event_logged()
+        return True
+
+    def beeindig(self, tijdstip):
+        self.pause(tijdstip)
+        self.store.submit(lambda: remove_checkpoint(self.checkpoint_path)) # a finished match is not resumed
+
+    def order_bench(self):
+        # This function orders the bench players based on the time they have been active
+        self.spelers.order_bench()
+
+    def report(self, save=False, dpi:float=100, path:str=OVERZICHT_FILE):
+        # While the match runs, the report shows it as if it was paused now, without changing or copying the match
+        tot = None if self.paused else self.klok.nu()
+
+        import matplotlib.pyplot as plt # matplotlib and pandas are only loaded once a report is made
+        from report import teken_overzicht
+        fig = plt.figure(dpi=dpi)
+        manager = plt.get_current_fig_manager()
+        manager.full_screen_toggle()
+        teken_overzicht(fig, spelers=self.spelers.to_frame(tot=tot), history=self.history, beurten=self.stints.tot(tot), tot=tot)
+
+        if save:
+            plt.show()
+            fig.savefig(path)
+        return fig